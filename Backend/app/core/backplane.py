@@ -0,0 +1,256 @@
+"""
+Backplane de notificaciones WebSocket entre workers
+Con `uvicorn --workers N` cada proceso tiene su propio ConnectionManager y
+solo conoce a los clientes conectados a él. El backplane reparte cada
+notificación a los demás workers para que la entreguen a sus clientes:
+- local: un solo proceso, no reparte nada (por defecto)
+- memoria: entre managers del mismo proceso; sirve para pruebas y como
+  sustituto local del broker
+- unix: datagramas por sockets Unix, uno por worker, en un directorio
+  compartido; sin dependencias, para varios workers en la misma máquina
+- redis: pub/sub de Redis, para workers en varias máquinas (requiere el
+  paquete `redis`, que no es dependencia obligatoria)
+Cada worker entrega primero a sus propios clientes y luego publica; al
+recibir ignora lo que publicó él mismo. Se publica el mensaje ya serializado,
+así que ningún worker lo vuelve a codificar.
+Además de notificaciones se publican invalidaciones de las cachés en memoria
+de cada worker (tipo "invalidacion", destinatario: nombre de la caché).
+"""
+import asyncio
+import json
+import os
+import socket
+import uuid
+from typing import Any, Callable, List, Optional
+
+from app.core.config import settings
+from app.utils.logger import logger
+
+# (tipo de destino, destinatario, mensaje JSON); tipo: usuario, rol, todos o invalidacion
+AlRecibir = Callable[[str, Any, str], None]
+
+BACKPLANES = ("local", "memoria", "unix", "redis")
+
+# Tamaño máximo de una notificación por socket Unix (un datagrama)
+MAX_DATAGRAMA = 64 * 1024
+
+
+class Backplane:
+    """Publica notificaciones a los demás workers y entrega las que ellos publican"""
+
+    nombre = "local"
+
+    def __init__(self):
+        # Identifica a este worker en los mensajes publicados
+        self.origen = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.publicados = 0
+        self.recibidos = 0
+        self.errores = 0
+        self._al_recibir: Optional[AlRecibir] = None
+
+    async def iniciar(self, al_recibir: AlRecibir):
+        self._al_recibir = al_recibir
+
+    async def publicar(self, tipo: str, destinatario: Any, texto: str):
+        """Un solo proceso: no hay a quién publicar"""
+
+    async def detener(self):
+        self._al_recibir = None
+
+    def _codificar(self, tipo: str, destinatario: Any, texto: str) -> bytes:
+        """Cabecera JSON en una línea seguida del mensaje tal cual (sin escaparlo otra vez)"""
+        cabecera = json.dumps({"origen": self.origen, "tipo": tipo, "destinatario": destinatario})
+        return f"{cabecera}\n{texto}".encode()
+
+    def _recibir(self, datos: bytes):
+        try:
+            cabecera, texto = datos.decode().split("\n", 1)
+            evento = json.loads(cabecera)
+        except ValueError:
+            self.errores += 1
+            return
+        if evento.get("origen") == self.origen or self._al_recibir is None:
+            return
+        self.recibidos += 1
+        self._al_recibir(evento["tipo"], evento["destinatario"], texto)
+
+    def estadisticas(self) -> dict:
+        return {
+            "tipo": self.nombre,
+            "origen": self.origen,
+            "publicados": self.publicados,
+            "recibidos": self.recibidos,
+            "errores": self.errores,
+        }
+
+
+class CanalMemoria:
+    """Backplanes en memoria suscritos entre sí"""
+
+    def __init__(self):
+        self.suscritos: List["BackplaneMemoria"] = []
+
+
+_canal_memoria = CanalMemoria()
+
+
+class BackplaneMemoria(Backplane):
+    """Reparte entre los managers del mismo proceso que comparten canal"""
+
+    nombre = "memoria"
+
+    def __init__(self, canal: Optional[CanalMemoria] = None):
+        super().__init__()
+        self.canal = canal or _canal_memoria
+
+    async def iniciar(self, al_recibir: AlRecibir):
+        await super().iniciar(al_recibir)
+        self.canal.suscritos.append(self)
+
+    async def publicar(self, tipo: str, destinatario: Any, texto: str):
+        # Se serializa igual que los demás para detectar mensajes que no viajarían
+        datos = self._codificar(tipo, destinatario, texto)
+        for backplane in list(self.canal.suscritos):
+            if backplane is not self:
+                backplane._recibir(datos)
+        self.publicados += 1
+
+    async def detener(self):
+        if self in self.canal.suscritos:
+            self.canal.suscritos.remove(self)
+        await super().detener()
+
+
+class BackplaneUnix(Backplane):
+    """
+    Un socket Unix de datagramas por worker en `directorio`. Publicar es enviar
+    el datagrama a cada socket del directorio (sin esperar); los sockets de
+    workers que ya no existen se borran al fallar el envío.
+    """
+
+    nombre = "unix"
+
+    def __init__(self, directorio: str):
+        super().__init__()
+        self.directorio = directorio
+        self.ruta = os.path.join(directorio, f"{self.origen}.sock")
+        self._socket: Optional[socket.socket] = None
+        self.descartados = 0
+
+    async def iniciar(self, al_recibir: AlRecibir):
+        await super().iniciar(al_recibir)
+        os.makedirs(self.directorio, exist_ok=True)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+        # Margen para ráfagas mientras el event loop está ocupado
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024 * 1024)
+        self._socket.bind(self.ruta)
+        asyncio.get_running_loop().add_reader(self._socket.fileno(), self._leer)
+
+    def _leer(self):
+        while True:
+            try:
+                datos = self._socket.recv(MAX_DATAGRAMA)
+            except (BlockingIOError, InterruptedError):
+                return
+            self._recibir(datos)
+
+    async def publicar(self, tipo: str, destinatario: Any, texto: str):
+        datos = self._codificar(tipo, destinatario, texto)
+        if len(datos) > MAX_DATAGRAMA:
+            self.errores += 1
+            logger.warning(f"Notificación de {len(datos)} bytes demasiado grande para el backplane")
+            return
+        for nombre in os.listdir(self.directorio):
+            ruta = os.path.join(self.directorio, nombre)
+            if not nombre.endswith(".sock") or ruta == self.ruta:
+                continue
+            try:
+                self._socket.sendto(datos, ruta)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Worker terminado sin limpiar su socket
+                try:
+                    os.remove(ruta)
+                except OSError:
+                    pass
+            except BlockingIOError:
+                # El otro worker no da abasto: se pierde para sus clientes
+                self.descartados += 1
+        self.publicados += 1
+
+    async def detener(self):
+        if self._socket:
+            asyncio.get_running_loop().remove_reader(self._socket.fileno())
+            self._socket.close()
+            self._socket = None
+            try:
+                os.remove(self.ruta)
+            except OSError:
+                pass
+        await super().detener()
+
+    def estadisticas(self) -> dict:
+        return {**super().estadisticas(), "directorio": self.directorio, "descartados": self.descartados}
+
+
+class BackplaneRedis(Backplane):
+    """Pub/sub sobre un canal de Redis"""
+
+    nombre = "redis"
+
+    def __init__(self, url: str, canal: str):
+        super().__init__()
+        self.url = url
+        self.canal = canal
+        self._cliente = None
+        self._tarea: Optional[asyncio.Task] = None
+
+    async def iniciar(self, al_recibir: AlRecibir):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("WS_BACKPLANE=redis requiere el paquete redis (pip install redis)")
+        await super().iniciar(al_recibir)
+        self._cliente = redis.from_url(self.url)
+        self._tarea = asyncio.get_running_loop().create_task(self._escuchar())
+
+    async def _escuchar(self):
+        while True:
+            try:
+                pubsub = self._cliente.pubsub()
+                await pubsub.subscribe(self.canal)
+                async for mensaje in pubsub.listen():
+                    if mensaje["type"] == "message":
+                        self._recibir(mensaje["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errores += 1
+                logger.error(f"Backplane Redis desconectado, reintentando: {e}")
+                await asyncio.sleep(1)
+
+    async def publicar(self, tipo: str, destinatario: Any, texto: str):
+        await self._cliente.publish(self.canal, self._codificar(tipo, destinatario, texto))
+        self.publicados += 1
+
+    async def detener(self):
+        if self._tarea:
+            self._tarea.cancel()
+        if self._cliente:
+            await self._cliente.close()
+        await super().detener()
+
+
+def crear_backplane(tipo: str) -> Backplane:
+    """Backplane configurado en WS_BACKPLANE"""
+    if tipo == "local":
+        return Backplane()
+    if tipo == "memoria":
+        return BackplaneMemoria()
+    if tipo == "unix":
+        return BackplaneUnix(settings.WS_BACKPLANE_DIR)
+    if tipo == "redis":
+        if not settings.WS_BACKPLANE_URL:
+            raise ValueError("WS_BACKPLANE=redis requiere WS_BACKPLANE_URL")
+        return BackplaneRedis(settings.WS_BACKPLANE_URL, settings.WS_BACKPLANE_CANAL)
+    raise ValueError(f"WS_BACKPLANE inválido: {tipo} (opciones: {', '.join(BACKPLANES)})")
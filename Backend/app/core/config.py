@@ -1,5 +1,7 @@
 from pydantic import BaseSettings
 from typing import Optional
+import os
+import tempfile
 
 class Settings(BaseSettings):
     # Database Configuration
@@ -8,11 +10,70 @@ class Settings(BaseSettings):
     DB_HOST: str
     DB_PORT: int
     DB_NAME: str
+    # URL del motor asíncrono; por defecto MySQL con aiomysql.
+    # Para pruebas locales: sqlite+aiosqlite:///./local.db
+    ASYNC_DATABASE_URL: Optional[str] = None
+
+    # Pool de conexiones (se aplica al motor síncrono y al asíncrono)
+    DB_POOL_SIZE: int = 10
+    DB_POOL_MAX_OVERFLOW: int = 20
+    DB_POOL_RECYCLE: int = 1800  # segundos antes de reemplazar una conexión
+    DB_POOL_TIMEOUT: int = 30  # segundos esperando una conexión libre
+    DB_POOL_PRE_PING: str = "inactiva"  # siempre | inactiva | nunca
+    DB_POOL_PING_INACTIVIDAD: int = 30  # con "inactiva": segundos ociosa antes de verificarla
 
     # JWT Configuration
     JWT_SECRET: str
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    TOKEN_CACHE_MAX: int = 10000  # tokens verificados que se recuerdan
+    PRINCIPAL_CACHE_TTL: int = 600  # segundos que se recuerda el medico_id de un empleado
+
+    # Hash de contraseñas
+    BCRYPT_ROUNDS: int = 12  # costo; los hashes con menos rondas se rehacen al iniciar sesión
+    LOGIN_HASH_PROCESOS: int = 2  # procesos dedicados a verificar contraseñas
+    LOGIN_HASH_COLA_MAX: int = 32  # verificaciones en curso o en espera antes de responder 503
+
+    # PDFs de recetas
+    PDF_PROCESOS: int = 2  # procesos que generan PDFs
+    PDF_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # PDFs generados que se guardan en memoria
+    PDF_CACHE_DIR: Optional[str] = None  # directorio para los PDFs desalojados de memoria
+    PDF_CACHE_DISCO_MAX_BYTES: int = 512 * 1024 * 1024
+
+    # Notificaciones
+    NOTIFICACIONES_CACHE_TTL: int = 15  # segundos que se reutilizan los contadores por rol
+    NOTIFICACIONES_PUSH_INTERVAL: int = 10  # segundos entre publicaciones por WebSocket
+    NOTIFICACIONES_VENTANA_MS: int = 50  # espera para agrupar eventos del mismo destinatario
+    NOTIFICACIONES_COLA_MAX: int = 10000  # eventos pendientes antes de descartar
+    WS_COLA_MAX: int = 256  # mensajes pendientes por conexión WebSocket
+    WS_POLITICA_LENTO: str = "descartar_antiguo"  # descartar_antiguo | desconectar, con la cola llena
+    WS_ENVIO_TIMEOUT: float = 10.0  # segundos que puede tardar un envío antes de cerrar la conexión (se revisa con los latidos)
+    WS_HEARTBEAT_INTERVALO: float = 25.0  # segundos entre pings a los clientes
+    WS_HEARTBEAT_TIMEOUT: float = 75.0  # segundos sin recibir nada del cliente antes de cerrarla
+    WS_COMPRESION: bool = True  # permitir que el cliente pida tramas comprimidas (?compresion=deflate)
+    WS_COMPRESION_MIN_BYTES: int = 1024  # los mensajes más cortos se envían sin comprimir
+    WS_COMPRESION_NIVEL: int = 6
+    # Reparto de notificaciones entre workers: local | memoria | unix | redis
+    # Por el mismo canal se invalidan en los demás workers los tokens revocados,
+    # los médicos en caché, los contadores de notificaciones y el índice de agenda.
+    # Siguen siendo de cada worker: el índice de búsqueda de pacientes (recoge los
+    # cambios de otros workers al reconstruirse cada BUSQUEDA_INDICE_TTL) y el
+    # progreso de las importaciones (solo lo conoce el worker que recibió el archivo).
+    WS_BACKPLANE: str = "local"
+    WS_BACKPLANE_DIR: str = os.path.join(tempfile.gettempdir(), "gestion_medica_ws")  # sockets del backplane unix
+    WS_BACKPLANE_URL: Optional[str] = None  # redis://host:6379/0
+    WS_BACKPLANE_CANAL: str = "gestion_medica:ws"
+
+    # Agenda de médicos
+    JORNADA_INICIO: str = "08:00"
+    JORNADA_FIN: str = "17:00"
+    DURACION_CITA_DEFECTO: int = 30  # minutos, cuando la cita no tiene hora_fin
+    DISPONIBILIDAD_INDICE_TTL: int = 300  # segundos antes de releer un día del índice
+    RESERVA_SLOT_TTL: int = 120  # segundos que se aparta un horario antes de confirmarlo
+    RESERVA_REINTENTOS: int = 3  # reintentos al encontrar una reserva vencida
+
+    # Búsqueda de pacientes
+    BUSQUEDA_INDICE_TTL: int = 600  # segundos antes de reconstruir el índice en segundo plano
 
     # Email Configuration (opcional)
     SMTP_HOST: Optional[str] = None
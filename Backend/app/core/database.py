@@ -1,21 +1,67 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.core.config import settings
+from app.core.pool import MetricasPool, opciones_pool, instalar_ping_inactiva
 
 DATABASE_URL = (
     f"mysql+pymysql://{settings.DB_USER}:{settings.DB_PASSWORD}"
     f"@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
 )
 
+# Métricas de checkout de cada pool (expuestas en /sistema/pool)
+metricas_pool = MetricasPool()
+metricas_pool_async = MetricasPool()
+
 # Engine & session (sync)
-engine = create_engine(DATABASE_URL, pool_pre_ping=True, echo=False)
+engine = create_engine(DATABASE_URL, echo=False, **opciones_pool(QueuePool, metricas_pool))
+instalar_ping_inactiva(engine, metricas_pool)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or (
+    f"mysql+aiomysql://{settings.DB_USER}:{settings.DB_PASSWORD}"
+    f"@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+)
+
+# Engine & session (async) - se crean al primer uso para no exigir el driver
+# asíncrono a scripts que solo usan la sesión síncrona
+async_engine = None
+AsyncSessionLocal = None
+
+def get_async_sessionmaker():
+    global async_engine, AsyncSessionLocal
+    if AsyncSessionLocal is None:
+        async_engine = create_async_engine(
+            ASYNC_DATABASE_URL, echo=False,
+            **opciones_pool(AsyncAdaptedQueuePool, metricas_pool_async)
+        )
+        instalar_ping_inactiva(async_engine.sync_engine, metricas_pool_async)
+        AsyncSessionLocal = sessionmaker(
+            async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+    return AsyncSessionLocal
+
+async def get_async_db():
+    """
+    Dependencia con sesión asíncrona para los endpoints de lectura más usados:
+    la petición no ocupa un hilo del threadpool mientras espera a la base de datos
+    """
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+def registrar_modelos():
+    """
+    Importa todos los modelos para registrarlos en Base.metadata (y que las
+    relaciones declaradas por nombre se resuelvan). Es la única lista de
+    modelos: la usan init_db y los benchmarks.
+    """
+    from app.models import empleado, paciente, medico, cita, historia, consulta, farmacia, medicamento, signos_vitales, asistencia, receta, encuesta, reserva_slot, resumen_historia, medicion_vital  # noqa: F401
+
 def init_db():
-    # Import models here so they are registered with Base.metadata
-    from app.models import empleado, paciente, medico, cita, historia, consulta, farmacia, medicamento, signos_vitales, asistencia, receta, encuesta
+    registrar_modelos()
     try:
         Base.metadata.create_all(bind=engine)
         print("Database tables created or already exist.")
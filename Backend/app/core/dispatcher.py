@@ -0,0 +1,154 @@
+"""
+Despachador de notificaciones en tiempo real
+Los servicios son funciones síncronas que FastAPI ejecuta en hilos del threadpool,
+donde no hay event loop y asyncio.create_task falla. El despachador recibe los
+eventos desde cualquier hilo, los entrega al event loop mediante
+call_soon_threadsafe y los envía agrupados por destinatario, sin bloquear nunca
+el hilo de la petición.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.websocket import manager
+from app.utils.logger import logger
+
+# ("usuario", user_id) o ("rol", cargo)
+Destino = Tuple[str, object]
+# (destino, mensaje, instante de encolado en perf_counter)
+Evento = Tuple[Destino, dict, float]
+
+
+class NotificationDispatcher:
+    """Cola thread-safe de notificaciones consumida por una tarea del event loop"""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._cola: Optional[asyncio.Queue] = None
+        self._tarea: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+        # Métricas
+        self._latencias: Deque[float] = deque(maxlen=1000)
+        self.encolados = 0
+        self.entregados = 0
+        self.lotes = 0
+        self.descartados = 0
+
+    def iniciar(self):
+        """Arranca el consumidor; debe llamarse desde el event loop (startup)"""
+        self._loop = asyncio.get_running_loop()
+        self._cola = asyncio.Queue(maxsize=settings.NOTIFICACIONES_COLA_MAX)
+        self._tarea = self._loop.create_task(self._consumir())
+
+    async def detener(self):
+        if self._tarea:
+            self._tarea.cancel()
+        self._loop = None
+
+    def enviar_a_usuario(self, user_id: int, mensaje: dict):
+        self._encolar(("usuario", user_id), mensaje)
+
+    def enviar_a_rol(self, cargo: str, mensaje: dict):
+        self._encolar(("rol", cargo), mensaje)
+
+    def invalidar(self, cache: str, datos: dict):
+        """
+        Publica a los demás workers la invalidación de una caché en memoria;
+        puede llamarse desde cualquier hilo. Sin otros workers (backplane local)
+        o sin event loop no hay a quién avisar.
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed() or manager.backplane.nombre == "local":
+            return
+        loop.call_soon_threadsafe(self._publicar_invalidacion, cache, datos)
+
+    def _publicar_invalidacion(self, cache: str, datos: dict):
+        asyncio.get_running_loop().create_task(manager.publicar_invalidacion(cache, datos))
+
+    def _encolar(self, destino: Destino, mensaje: dict):
+        """Puede llamarse desde cualquier hilo; nunca espera por la red"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            logger.warning(f"Despachador no iniciado, notificación descartada: {mensaje.get('type')}")
+            with self._lock:
+                self.descartados += 1
+            return
+        mensaje.setdefault("timestamp", datetime.utcnow().isoformat())
+        evento = (destino, mensaje, time.perf_counter())
+        with self._lock:
+            self.encolados += 1
+        try:
+            en_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            en_loop = False
+        if en_loop:
+            self._poner(evento)
+        else:
+            loop.call_soon_threadsafe(self._poner, evento)
+
+    def _poner(self, evento: Evento):
+        try:
+            self._cola.put_nowait(evento)
+        except asyncio.QueueFull:
+            with self._lock:
+                self.descartados += 1
+
+    async def _consumir(self):
+        ventana = settings.NOTIFICACIONES_VENTANA_MS / 1000
+        while True:
+            eventos = [await self._cola.get()]
+            # Esperar una ventana corta para agrupar eventos del mismo destinatario
+            if ventana:
+                await asyncio.sleep(ventana)
+            while not self._cola.empty():
+                eventos.append(self._cola.get_nowait())
+            try:
+                await self._entregar(eventos)
+            except Exception as e:
+                logger.error(f"Error entregando notificaciones: {e}")
+
+    async def _entregar(self, eventos: List[Evento]):
+        por_destino: Dict[Destino, List[Evento]] = {}
+        for evento in eventos:
+            por_destino.setdefault(evento[0], []).append(evento)
+
+        for (tipo, destinatario), grupo in por_destino.items():
+            if len(grupo) == 1:
+                mensaje = grupo[0][1]
+            else:
+                mensaje = {"type": "lote", "mensajes": [m for _, m, _ in grupo]}
+                self.lotes += 1
+            if tipo == "usuario":
+                await manager.send_personal_message(mensaje, destinatario)
+            else:
+                await manager.send_to_role(mensaje, destinatario)
+            ahora = time.perf_counter()
+            self._latencias.extend(ahora - encolado for _, _, encolado in grupo)
+            self.entregados += len(grupo)
+
+    def estadisticas(self) -> dict:
+        """Contadores y latencia encolado→entrega (ms) de los últimos eventos"""
+        latencias = sorted(self._latencias)
+        def percentil(p):
+            return round(latencias[min(len(latencias) - 1, int(len(latencias) * p))] * 1000, 2) if latencias else None
+        return {
+            "activo": self._loop is not None,
+            "encolados": self.encolados,
+            "entregados": self.entregados,
+            "lotes": self.lotes,
+            "descartados": self.descartados,
+            "pendientes": self._cola.qsize() if self._cola else 0,
+            "latencia_ms": {
+                "p50": percentil(0.5),
+                "p95": percentil(0.95),
+                "max": round(latencias[-1] * 1000, 2) if latencias else None,
+            },
+        }
+
+
+# Instancia global del despachador
+dispatcher = NotificationDispatcher()
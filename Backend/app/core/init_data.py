@@ -2,11 +2,18 @@
 Módulo para inicializar datos por defecto en la base de datos
 Crea usuarios de prueba si no existen
 """
+from datetime import datetime
 from sqlalchemy.orm import Session
 from app.core.database import SessionLocal
 from app.core.security import get_password_hash
 from app.models.empleado import Empleado
 from app.models.medico import Medico
+from app.models.cita import Cita
+from app.models.reserva_slot import ReservaSlot
+from app.models.consulta import Consulta
+from app.models.medicion_vital import MedicionVital
+from app.services.reserva_service import clave_slot, nuevo_token
+from app.services.signos_service import registrar_signos
 from app.utils.logger import logger
 
 
@@ -103,6 +110,75 @@ def create_default_users(db: Session):
         logger.info("ℹ️  No se crearon usuarios nuevos, todos ya existen")
 
 
+def sincronizar_reservas(db: Session):
+    """
+    Registra en reservas_slot el horario de las citas futuras creadas antes
+    de existir la tabla, para que la restricción única también las proteja
+    """
+    hoy = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    ocupados = {
+        (r.medico_id, r.fecha, r.hora_inicio)
+        for r in db.query(ReservaSlot).filter(ReservaSlot.fecha >= hoy.date()).all()
+    }
+    citas = db.query(Cita).outerjoin(ReservaSlot, ReservaSlot.cita_id == Cita.id).filter(
+        Cita.fecha >= hoy,
+        Cita.medico_id.isnot(None),
+        ReservaSlot.id.is_(None)
+    ).all()
+
+    creadas = 0
+    for cita in citas:
+        try:
+            clave = clave_slot(cita.medico_id, cita.fecha, cita.hora_inicio, cita.estado)
+        except ValueError:
+            continue
+        if not clave or clave in ocupados:
+            continue
+        ocupados.add(clave)
+        db.add(ReservaSlot(
+            medico_id=clave[0],
+            fecha=clave[1],
+            hora_inicio=clave[2],
+            token=nuevo_token(),
+            cita_id=cita.id
+        ))
+        creadas += 1
+
+    if creadas:
+        db.commit()
+        logger.info(f"📅 Se registraron {creadas} horarios de citas existentes")
+
+
+def sincronizar_signos(db: Session):
+    """
+    Copia a mediciones_vitales los signos de las consultas guardadas antes de
+    existir la tabla. Se procesan por lotes para no cargar todas las consultas.
+    """
+    pendientes = db.query(Consulta).outerjoin(
+        MedicionVital, MedicionVital.consulta_id == Consulta.id
+    ).filter(
+        Consulta.signos_vitales.isnot(None),
+        Consulta.paciente_id.isnot(None),
+        Consulta.fecha_consulta.isnot(None),
+        MedicionVital.id.is_(None)
+    ).order_by(Consulta.id)
+
+    procesadas = 0
+    ultimo_id = 0
+    while True:
+        lote = pendientes.filter(Consulta.id > ultimo_id).limit(500).all()
+        if not lote:
+            break
+        for consulta in lote:
+            registrar_signos(db, consulta)
+        ultimo_id = lote[-1].id
+        procesadas += len(lote)
+        db.commit()
+
+    if procesadas:
+        logger.info(f"🩺 Se registraron los signos vitales de {procesadas} consultas existentes")
+
+
 def initialize_default_data():
     """
     Función principal para inicializar datos por defecto
@@ -112,6 +188,8 @@ def initialize_default_data():
     db = SessionLocal()
     try:
         create_default_users(db)
+        sincronizar_reservas(db)
+        sincronizar_signos(db)
         logger.info("✅ Inicialización de datos completada")
     except Exception as e:
         logger.error(f"❌ Error al inicializar datos: {str(e)}")
@@ -0,0 +1,97 @@
+"""
+Pool de procesos para verificar contraseñas
+bcrypt es deliberadamente costoso en CPU. Verificarlo en el threadpool de la
+API hace que, en un cambio de turno con muchos inicios de sesión a la vez, el
+resto de endpoints se queden sin hilos. Las verificaciones se envían a un
+número fijo de procesos y, si ya hay demasiadas en curso, se rechazan de
+inmediato para que el cliente reintente en lugar de esperar en cola.
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from app.core.config import settings
+from app.core.security import verify_and_update_password
+from app.utils.logger import logger
+
+
+class PoolHashSaturadoError(Exception):
+    """Hay LOGIN_HASH_COLA_MAX verificaciones pendientes"""
+
+
+class PoolHash:
+    """Verificaciones de contraseña en procesos dedicados, con cola acotada"""
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.pendientes = 0
+        self.verificadas = 0
+        self.rehasheadas = 0
+        self.rechazadas = 0
+
+    def _obtener_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: no hereda los hilos ni el event loop del servidor
+                self._executor = ProcessPoolExecutor(
+                    max_workers=settings.LOGIN_HASH_PROCESOS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    async def verificar(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Devuelve (válida, hash_nuevo). Lanza PoolHashSaturadoError si la cola está llena.
+        """
+        with self._lock:
+            if self.pendientes >= settings.LOGIN_HASH_COLA_MAX:
+                self.rechazadas += 1
+                raise PoolHashSaturadoError("Demasiados inicios de sesión simultáneos")
+            self.pendientes += 1
+        try:
+            executor = self._obtener_executor()
+            loop = asyncio.get_running_loop()
+            valida, nuevo_hash = await loop.run_in_executor(
+                executor, verify_and_update_password, password, hashed_password
+            )
+        except BrokenProcessPool:
+            # Un proceso murió: descartar el pool para recrearlo en la próxima petición
+            logger.error("Pool de verificación de contraseñas roto, se recreará")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False)
+            raise
+        finally:
+            with self._lock:
+                self.pendientes -= 1
+        with self._lock:
+            self.verificadas += 1
+            if nuevo_hash:
+                self.rehasheadas += 1
+        return valida, nuevo_hash
+
+    def cerrar(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "procesos": settings.LOGIN_HASH_PROCESOS,
+                "cola_max": settings.LOGIN_HASH_COLA_MAX,
+                "pendientes": self.pendientes,
+                "verificadas": self.verificadas,
+                "rehasheadas": self.rehasheadas,
+                "rechazadas": self.rechazadas,
+            }
+
+
+# Instancia global del pool
+pool_hash = PoolHash()
@@ -0,0 +1,147 @@
+"""
+Caché de PDFs generados
+LRU acotado por tamaño total en bytes. Las entradas desalojadas de memoria se
+pueden conservar en disco (PDF_CACHE_DIR), también con un límite de bytes, y
+vuelven a memoria cuando se piden otra vez. La clave incluye la versión del
+contenido, así que un cambio en los datos nunca devuelve un PDF viejo.
+"""
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.config import settings
+from app.utils.logger import logger
+
+_CLAVE_VALIDA = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+class CachePdf:
+    """LRU thread-safe de bytes con desborde opcional a disco"""
+
+    def __init__(self, max_bytes: int, directorio: Optional[str] = None, max_bytes_disco: int = 0):
+        self.max_bytes = max_bytes
+        self.directorio = directorio if directorio and max_bytes_disco > 0 else None
+        self.max_bytes_disco = max_bytes_disco
+        self._lock = threading.Lock()
+        self._memoria: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        # clave -> tamaño de los archivos en disco, en orden de uso
+        self._disco: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes_disco = 0
+        self.aciertos = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+        if self.directorio:
+            self._indexar_disco()
+
+    def _ruta(self, clave: str) -> str:
+        return os.path.join(self.directorio, f"{clave}.pdf")
+
+    def _indexar_disco(self):
+        """Recupera los archivos de una ejecución anterior, del más viejo al más nuevo"""
+        os.makedirs(self.directorio, exist_ok=True)
+        archivos = []
+        for nombre in os.listdir(self.directorio):
+            if nombre.endswith(".pdf"):
+                ruta = os.path.join(self.directorio, nombre)
+                archivos.append((os.path.getmtime(ruta), nombre[:-4], os.path.getsize(ruta)))
+        for _, clave, tamano in sorted(archivos):
+            self._disco[clave] = tamano
+            self._bytes_disco += tamano
+        self._recortar_disco()
+
+    def obtener(self, clave: str) -> Optional[bytes]:
+        with self._lock:
+            contenido = self._memoria.get(clave)
+            if contenido is not None:
+                self._memoria.move_to_end(clave)
+                self.aciertos += 1
+                return contenido
+            en_disco = self.directorio is not None and clave in self._disco
+        if en_disco:
+            try:
+                with open(self._ruta(clave), "rb") as archivo:
+                    contenido = archivo.read()
+            except OSError:
+                contenido = None
+            if contenido is not None:
+                with self._lock:
+                    self.aciertos_disco += 1
+                self.guardar(clave, contenido)
+                return contenido
+        with self._lock:
+            self.fallos += 1
+        return None
+
+    def guardar(self, clave: str, contenido: bytes):
+        if not _CLAVE_VALIDA.match(clave) or len(contenido) > self.max_bytes:
+            return
+        desalojados = []
+        with self._lock:
+            anterior = self._memoria.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= len(anterior)
+            self._memoria[clave] = contenido
+            self._bytes += len(contenido)
+            while self._bytes > self.max_bytes:
+                viejo, datos = self._memoria.popitem(last=False)
+                self._bytes -= len(datos)
+                desalojados.append((viejo, datos))
+        if self.directorio:
+            for viejo, datos in desalojados:
+                self._escribir_disco(viejo, datos)
+
+    def _escribir_disco(self, clave: str, contenido: bytes):
+        with self._lock:
+            if clave in self._disco:
+                self._disco.move_to_end(clave)
+                return
+        try:
+            # Escritura atómica: un lector nunca ve un archivo a medias
+            fd, temporal = tempfile.mkstemp(dir=self.directorio, suffix=".tmp")
+            with os.fdopen(fd, "wb") as archivo:
+                archivo.write(contenido)
+            os.replace(temporal, self._ruta(clave))
+        except OSError as e:
+            logger.error(f"No se pudo guardar el PDF {clave} en disco: {e}")
+            return
+        with self._lock:
+            self._disco[clave] = len(contenido)
+            self._bytes_disco += len(contenido)
+        self._recortar_disco()
+
+    def _recortar_disco(self):
+        borrar = []
+        with self._lock:
+            while self._bytes_disco > self.max_bytes_disco and self._disco:
+                clave, tamano = self._disco.popitem(last=False)
+                self._bytes_disco -= tamano
+                borrar.append(clave)
+        for clave in borrar:
+            try:
+                os.remove(self._ruta(clave))
+            except OSError:
+                pass
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            consultas = self.aciertos + self.aciertos_disco + self.fallos
+            return {
+                "entradas": len(self._memoria),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "entradas_disco": len(self._disco),
+                "bytes_disco": self._bytes_disco,
+                "max_bytes_disco": self.max_bytes_disco if self.directorio else 0,
+                "aciertos": self.aciertos,
+                "aciertos_disco": self.aciertos_disco,
+                "fallos": self.fallos,
+                "tasa_aciertos": round((self.aciertos + self.aciertos_disco) / consultas, 3) if consultas else None,
+            }
+
+
+# Instancia global de la caché
+cache_pdf = CachePdf(settings.PDF_CACHE_MAX_BYTES, settings.PDF_CACHE_DIR, settings.PDF_CACHE_DISCO_MAX_BYTES)
@@ -1,17 +1,19 @@
 from fastapi import HTTPException, status, Depends
-from jose import jwt, JWTError
-from app.core.config import settings
+from jose import JWTError
+from app.core.token_cache import cache_tokens
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 security = HTTPBearer()
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """
-    Obtiene el usuario actual desde el token JWT
+    Obtiene el usuario actual desde el token JWT.
+    Es async para no consumir un hilo del threadpool en cada petición;
+    la firma solo se verifica la primera vez que se ve el token.
     """
     try:
         token = credentials.credentials
-        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+        payload = cache_tokens.verificar(token)
         user_id = payload.get("sub")
         cargo = payload.get("cargo")
         
@@ -0,0 +1,167 @@
+"""
+Pool de conexiones configurable y medido
+Los parámetros del pool (tamaño, desborde, reciclado, timeout y estrategia de
+pre-ping) se leen de Settings. Cada checkout registra cuánto esperó por una
+conexión y si agotó el timeout, para dimensionar el pool con datos en /sistema/pool.
+"""
+import bisect
+import threading
+import time
+from typing import Dict, Optional, Type
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool, QueuePool
+
+from app.core.config import settings
+
+# Estrategias de verificación de conexiones al hacer checkout
+PING_SIEMPRE = "siempre"  # pool_pre_ping: un SELECT 1 en cada checkout
+PING_INACTIVA = "inactiva"  # solo si la conexión estuvo ociosa más de DB_POOL_PING_INACTIVIDAD
+PING_NUNCA = "nunca"  # confiar en pool_recycle y en la invalidación tras un error
+ESTRATEGIAS_PING = (PING_SIEMPRE, PING_INACTIVA, PING_NUNCA)
+
+# Límites superiores (ms) de los tramos del histograma de espera
+TRAMOS_ESPERA_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+class MetricasPool:
+    """Contadores de checkout de un pool; thread-safe"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.pings = 0
+            self.pings_fallidos = 0
+            self.espera_total = 0.0
+            self.espera_max = 0.0
+            # Un tramo por límite más el tramo final (> último límite)
+            self._tramos = [0] * (len(TRAMOS_ESPERA_MS) + 1)
+
+    def registrar_espera(self, segundos: float, timeout: bool = False):
+        ms = segundos * 1000
+        with self._lock:
+            if timeout:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.espera_total += segundos
+            self.espera_max = max(self.espera_max, segundos)
+            self._tramos[bisect.bisect_left(TRAMOS_ESPERA_MS, ms)] += 1
+
+    def registrar_ping(self, ok: bool):
+        with self._lock:
+            self.pings += 1
+            if not ok:
+                self.pings_fallidos += 1
+
+    def resumen(self) -> dict:
+        with self._lock:
+            etiquetas = [f"<={limite}ms" for limite in TRAMOS_ESPERA_MS] + [f">{TRAMOS_ESPERA_MS[-1]}ms"]
+            intentos = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "pings": self.pings,
+                "pings_fallidos": self.pings_fallidos,
+                "espera_ms": {
+                    "promedio": round(self.espera_total / intentos * 1000, 3) if intentos else None,
+                    "max": round(self.espera_max * 1000, 3),
+                    "histograma": dict(zip(etiquetas, self._tramos)),
+                },
+            }
+
+
+def pool_medido(base: Type[QueuePool], metricas: MetricasPool) -> Type[QueuePool]:
+    """
+    Subclase de `base` que mide la espera de cada checkout.
+    Las métricas se guardan en la clase para sobrevivir a pool.recreate()
+    (que SQLAlchemy invoca tras dispose() o una desconexión).
+    """
+
+    class PoolMedido(base):
+        _metricas = metricas
+
+        def _do_get(self):
+            inicio = time.perf_counter()
+            try:
+                conexion = super()._do_get()
+            except exc.TimeoutError:
+                self._metricas.registrar_espera(time.perf_counter() - inicio, timeout=True)
+                raise
+            self._metricas.registrar_espera(time.perf_counter() - inicio)
+            return conexion
+
+    PoolMedido.__name__ = f"{base.__name__}Medido"
+    return PoolMedido
+
+
+def opciones_pool(base: Type[QueuePool], metricas: MetricasPool) -> dict:
+    """Argumentos de create_engine/create_async_engine según Settings"""
+    estrategia = settings.DB_POOL_PRE_PING
+    if estrategia not in ESTRATEGIAS_PING:
+        raise ValueError(
+            f"DB_POOL_PRE_PING inválido: {estrategia} (opciones: {', '.join(ESTRATEGIAS_PING)})"
+        )
+    return {
+        "poolclass": pool_medido(base, metricas),
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_POOL_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": estrategia == PING_SIEMPRE,
+    }
+
+
+def instalar_ping_inactiva(engine: Engine, metricas: MetricasPool):
+    """
+    Estrategia "inactiva": verifica la conexión solo si estuvo ociosa en el pool
+    más de DB_POOL_PING_INACTIVIDAD segundos. Las conexiones usadas hace poco se
+    entregan sin el viaje extra a la base de datos.
+    """
+    if settings.DB_POOL_PRE_PING != PING_INACTIVA:
+        return
+
+    @event.listens_for(engine, "checkin")
+    def _marcar_devuelta(dbapi_connection, connection_record):
+        connection_record.info["devuelta_en"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _verificar(dbapi_connection, connection_record, connection_proxy):
+        devuelta_en = connection_record.info.pop("devuelta_en", None)
+        if devuelta_en is None or time.monotonic() - devuelta_en < settings.DB_POOL_PING_INACTIVIDAD:
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        except Exception:
+            metricas.registrar_ping(False)
+            # El pool descarta la conexión y reintenta con una nueva
+            raise exc.DisconnectionError()
+        finally:
+            cursor.close()
+        metricas.registrar_ping(True)
+
+
+def estado_pool(pool: Optional[Pool], metricas: MetricasPool) -> Optional[dict]:
+    """Ocupación actual del pool junto a sus métricas acumuladas"""
+    if pool is None:
+        return None
+    estado: Dict[str, object] = {"clase": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        estado.update({
+            "tamano": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+            "en_uso": pool.checkedout(),
+            "disponibles": pool.checkedin(),
+            # overflow() es negativo mientras no se han abierto pool_size conexiones
+            "overflow": max(pool.overflow(), 0),
+        })
+    estado.update(metricas.resumen())
+    return estado
@@ -0,0 +1,53 @@
+"""
+Caché de la identidad de médico de cada empleado
+Los listados de un médico se filtran por su medico_id, que se obtiene a partir
+del empleado autenticado. Se resuelve al iniciar sesión (o en la primera
+petición) y se recuerda aquí; update_medico/create_medico/delete_medico
+invalidan la entrada cuando cambia el vínculo con el empleado, en este worker
+y, por el backplane, en los demás.
+"""
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.dispatcher import dispatcher
+from app.core.websocket import manager
+
+# Marca de "no está en caché" (None significa que el empleado no es médico)
+SIN_ENTRADA = object()
+
+
+class CachePrincipales:
+    """empleado_id -> {"medico_id", "especialidad"} (o None si no es médico)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._medicos: Dict[int, Tuple[Optional[dict], float]] = {}
+
+    def obtener(self, empleado_id: int):
+        """Devuelve la identidad guardada, o SIN_ENTRADA si hay que resolverla"""
+        with self._lock:
+            entrada = self._medicos.get(empleado_id)
+            if entrada is None or time.monotonic() - entrada[1] >= settings.PRINCIPAL_CACHE_TTL:
+                return SIN_ENTRADA
+            return entrada[0]
+
+    def guardar(self, empleado_id: int, medico: Optional[dict]):
+        with self._lock:
+            self._medicos[empleado_id] = (medico, time.monotonic())
+
+    def invalidar(self, *empleado_ids: Optional[int]):
+        ids = [empleado_id for empleado_id in empleado_ids if empleado_id is not None]
+        self.aplicar_invalidacion({"empleados": ids})
+        dispatcher.invalidar("principales", {"empleados": ids})
+
+    def aplicar_invalidacion(self, datos: dict):
+        with self._lock:
+            for empleado_id in datos["empleados"]:
+                self._medicos.pop(empleado_id, None)
+
+
+# Instancia global de la caché
+cache_principales = CachePrincipales()
+manager.al_invalidar("principales", cache_principales.aplicar_invalidacion)
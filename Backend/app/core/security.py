@@ -1,9 +1,16 @@
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
+from typing import Optional, Tuple
 from jose import jwt
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min_rounds marca como desactualizados los hashes con un costo menor al configurado
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS
+)
 
 def get_password_hash(password: str) -> str:
     """
@@ -18,9 +25,22 @@ def get_password_hash(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifica la contraseña y, si el hash usa un costo desactualizado, devuelve
+    también el hash nuevo. Se ejecuta en los procesos de login_pool.
+    """
+    try:
+        return pwd_context.verify_and_update(plain_password[:72], hashed_password)
+    except ValueError:
+        # Hash con formato desconocido o corrupto
+        return False, None
+
 def create_access_token(data: dict, expires_delta: int = None):
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES if not expires_delta else expires_delta)
-    to_encode.update({"exp": expire})
+    now = datetime.utcnow()
+    expire = now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES if not expires_delta else expires_delta)
+    # iat permite revocar los tokens emitidos antes de una fecha (ver token_cache)
+    to_encode.update({"exp": expire, "iat": now})
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
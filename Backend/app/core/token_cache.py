@@ -0,0 +1,150 @@
+"""
+Caché de tokens JWT verificados
+Un cliente reutiliza el mismo token durante toda su vigencia, así que verificar
+la firma en cada petición repite el mismo trabajo. Los claims verificados se
+guardan en un LRU acotado, indexado por el SHA-256 del token (el token en claro
+no se conserva) y cada entrada caduca en el `exp` del propio token.
+La revocación explícita (cierre de sesión, baja o cambio de cargo de un
+empleado) se consulta también en los aciertos de caché y se publica a los
+demás workers por el backplane.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from jose import jwt, JWTError
+
+from app.core.config import settings
+from app.core.dispatcher import dispatcher
+from app.core.websocket import manager
+
+
+def _digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class CacheTokens:
+    """LRU thread-safe de claims verificados"""
+
+    def __init__(self, capacidad: int):
+        self.capacidad = capacidad
+        self._lock = threading.Lock()
+        # digest -> (claims, exp)
+        self._entradas: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+        # digest -> exp; se olvidan cuando el token habría expirado de todos modos
+        self._revocados: Dict[str, float] = {}
+        # sub -> instante de revocación: invalida los tokens emitidos antes
+        self._usuarios_revocados: Dict[str, float] = {}
+        self.aciertos = 0
+        self.fallos = 0
+        self.rechazados = 0
+
+    def verificar(self, token: str) -> dict:
+        """
+        Devuelve los claims del token; lanza JWTError si es inválido,
+        expiró o fue revocado
+        """
+        digest = _digest(token)
+        ahora = time.time()
+        with self._lock:
+            entrada = self._entradas.get(digest)
+            if entrada is not None and entrada[1] > ahora:
+                self._entradas.move_to_end(digest)
+                self.aciertos += 1
+                claims = entrada[0]
+            else:
+                if entrada is not None:
+                    del self._entradas[digest]
+                self.fallos += 1
+                claims = None
+
+        if claims is None:
+            claims = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+
+        if self._es_revocado(digest, claims):
+            with self._lock:
+                self._entradas.pop(digest, None)
+                self.rechazados += 1
+            raise JWTError("Token revocado")
+
+        exp = claims.get("exp")
+        if entrada is None or entrada[1] <= ahora:
+            # Sin exp no hay cuándo desalojarlo: no se guarda
+            if exp is not None:
+                with self._lock:
+                    self._entradas[digest] = (claims, float(exp))
+                    while len(self._entradas) > self.capacidad:
+                        self._entradas.popitem(last=False)
+        return claims
+
+    def _es_revocado(self, digest: str, claims: dict) -> bool:
+        with self._lock:
+            if digest in self._revocados:
+                return True
+            revocado_en = self._usuarios_revocados.get(str(claims.get("sub")))
+        # iat tiene resolución de segundos: un token emitido en el mismo segundo
+        # de la revocación (p. ej. el nuevo inicio de sesión) sigue siendo válido
+        return revocado_en is not None and claims.get("iat", 0) < int(revocado_en)
+
+    def revocar(self, token: str):
+        """Invalida un token concreto (cierre de sesión) en todos los workers"""
+        digest = _digest(token)
+        try:
+            exp = jwt.get_unverified_claims(token).get("exp")
+        except JWTError:
+            return
+        self._revocar_digest(digest, exp)
+        # Solo el digest: el token en claro no sale del proceso
+        dispatcher.invalidar("tokens", {"digest": digest, "exp": exp})
+
+    def revocar_usuario(self, user_id: int):
+        """Invalida en todos los workers los tokens emitidos hasta ahora para un empleado"""
+        instante = time.time()
+        self._revocar_usuario(str(user_id), instante)
+        dispatcher.invalidar("tokens", {"usuario": str(user_id), "instante": instante})
+
+    def aplicar_invalidacion(self, datos: dict):
+        """Revocación publicada por otro worker"""
+        if "digest" in datos:
+            self._revocar_digest(datos["digest"], datos.get("exp"))
+        else:
+            self._revocar_usuario(datos["usuario"], datos["instante"])
+
+    def _revocar_digest(self, digest: str, exp: Optional[float]):
+        ahora = time.time()
+        with self._lock:
+            self._entradas.pop(digest, None)
+            self._revocados[digest] = float(exp) if exp is not None else float("inf")
+            # Olvidar revocaciones de tokens que ya expiraron
+            for vencido in [d for d, e in self._revocados.items() if e <= ahora]:
+                del self._revocados[vencido]
+
+    def _revocar_usuario(self, sub: str, instante: float):
+        with self._lock:
+            self._usuarios_revocados[sub] = instante
+            for digest in [d for d, (claims, _) in self._entradas.items() if str(claims.get("sub")) == sub]:
+                del self._entradas[digest]
+            # Pasada la vigencia máxima de un token la marca ya no rechaza nada
+            limite = time.time() - settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+            for usuario in [u for u, t in self._usuarios_revocados.items() if t < limite]:
+                del self._usuarios_revocados[usuario]
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "capacidad": self.capacidad,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / consultas, 3) if consultas else None,
+                "rechazados": self.rechazados,
+                "revocados": len(self._revocados),
+            }
+
+
+# Instancia global de la caché
+cache_tokens = CacheTokens(settings.TOKEN_CACHE_MAX)
+manager.al_invalidar("tokens", cache_tokens.aplicar_invalidacion)
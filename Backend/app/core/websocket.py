@@ -7,99 +7,433 @@ Permite:
 - Alertas del sistema
 """
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict, List
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+from collections import deque
+import asyncio
 import json
+import time
+import uuid
+import zlib
 from datetime import datetime
+from app.core.backplane import Backplane, crear_backplane
+from app.core.config import settings
+from app.utils.logger import logger
+
+try:
+    import orjson
+except ImportError:  # opcional: sin orjson se usa json de la biblioteca estándar
+    orjson = None
+
+# Qué hacer cuando la cola de salida de una conexión está llena
+POLITICA_DESCARTAR_ANTIGUO = "descartar_antiguo"  # se pierde el mensaje más viejo pendiente
+POLITICA_DESCONECTAR = "desconectar"  # se cierra la conexión; el cliente se reconecta y recarga
+POLITICAS_LENTO = (POLITICA_DESCARTAR_ANTIGUO, POLITICA_DESCONECTAR)
+
+# Códigos de cierre WebSocket: "Try Again Later" y "Going Away"
+CIERRE_CLIENTE_LENTO = 1013
+CIERRE_SIN_LATIDO = 1001
+
+# Compresión negociada por el cliente al conectar (?compresion=deflate)
+COMPRESION_DEFLATE = "deflate"
+
+
+def codificar(mensaje: dict) -> str:
+    """JSON compacto del mensaje, el mismo texto para todos los destinatarios"""
+    if orjson is not None:
+        return orjson.dumps(mensaje, default=str).decode()
+    return json.dumps(mensaje, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class Trama:
+    """
+    Un mensaje ya serializado, compartido por todas las conexiones a las que se
+    envía. La versión comprimida (deflate sin cabecera, sin contexto entre
+    mensajes) se calcula la primera vez que una conexión la pide y se reutiliza.
+    """
+
+    __slots__ = ("texto", "_comprimido")
+
+    def __init__(self, texto: str):
+        self.texto = texto
+        self._comprimido: Optional[bytes] = None
+
+    @classmethod
+    def de(cls, mensaje: dict) -> "Trama":
+        return cls(codificar(mensaje))
+
+    def comprimido(self, metricas: "MetricasEnvio") -> Optional[bytes]:
+        """Bytes comprimidos, o None si el mensaje es tan corto que no compensa"""
+        if len(self.texto) < settings.WS_COMPRESION_MIN_BYTES:
+            return None
+        if self._comprimido is None:
+            compresor = zlib.compressobj(settings.WS_COMPRESION_NIVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+            self._comprimido = compresor.compress(self.texto.encode()) + compresor.flush()
+            metricas.comprimidos += 1
+        return self._comprimido
+
+
+class MetricasEnvio:
+    """Contadores de envío compartidos por todas las conexiones (solo se usan desde el event loop)"""
+
+    def __init__(self):
+        self.encolados = 0
+        self.enviados = 0
+        self.descartados = 0
+        self.desconectados_lentos = 0
+        self.sin_latido = 0
+        self.errores = 0
+        # Mensajes serializados y comprimidos: uno por envío, no por destinatario
+        self.serializados = 0
+        self.comprimidos = 0
+        # Segundos entre encolar y terminar de escribir, de los últimos envíos
+        self.latencias: Deque[float] = deque(maxlen=1000)
+
+    def resumen(self) -> dict:
+        latencias = sorted(self.latencias)
+        def percentil(p):
+            return round(latencias[min(len(latencias) - 1, int(len(latencias) * p))] * 1000, 2) if latencias else None
+        return {
+            "encolados": self.encolados,
+            "enviados": self.enviados,
+            "descartados": self.descartados,
+            "desconectados_lentos": self.desconectados_lentos,
+            "sin_latido": self.sin_latido,
+            "serializados": self.serializados,
+            "comprimidos": self.comprimidos,
+            "errores": self.errores,
+            "latencia_ms": {
+                "p50": percentil(0.5),
+                "p95": percentil(0.95),
+                "max": round(latencias[-1] * 1000, 2) if latencias else None,
+            },
+        }
+
+
+class ConexionSalida:
+    """
+    Una conexión registrada con su cola de salida acotada, vaciada por su propia tarea.
+    Encolar nunca espera por la red, así que un cliente lento solo se retrasa a sí mismo.
+    Al cerrarse, por el motivo que sea, avisa a `al_cerrar` para salir del registro.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user_id: int,
+        role: str,
+        metricas: MetricasEnvio,
+        al_cerrar: Callable[["ConexionSalida"], None],
+        comprime: bool = False
+    ):
+        self.id = uuid.uuid4().hex
+        self.websocket = websocket
+        self.user_id = user_id
+        self.role = role
+        # El cliente acepta tramas binarias comprimidas con deflate
+        self.comprime = comprime
+        self.metricas = metricas
+        self.cerrada = False
+        # Último mensaje recibido del cliente (monotonic); lo renueva cualquier mensaje o pong
+        self.ultima_actividad = time.monotonic()
+        self._al_cerrar = al_cerrar
+        # Inicio (monotonic) del envío en curso, None si no hay ninguno
+        self.enviando_desde: Optional[float] = None
+        # (trama, instante de encolado en perf_counter)
+        self._cola: Deque[Tuple[Trama, float]] = deque()
+        self._hay_mensajes = asyncio.Event()
+        self._tarea = asyncio.get_running_loop().create_task(self._enviar())
+
+    @property
+    def pendientes(self) -> int:
+        return len(self._cola)
+
+    def encolar(self, trama: Trama) -> bool:
+        if self.cerrada:
+            return False
+        if len(self._cola) >= settings.WS_COLA_MAX:
+            if settings.WS_POLITICA_LENTO == POLITICA_DESCONECTAR:
+                self.metricas.desconectados_lentos += 1
+                self.cerrar(CIERRE_CLIENTE_LENTO, "Cliente demasiado lento")
+                return False
+            self._cola.popleft()
+            self.metricas.descartados += 1
+        self._cola.append((trama, time.perf_counter()))
+        self.metricas.encolados += 1
+        self._hay_mensajes.set()
+        return True
+
+    async def _enviar(self):
+        try:
+            while not self.cerrada:
+                await self._hay_mensajes.wait()
+                self._hay_mensajes.clear()
+                while self._cola:
+                    trama, encolado = self._cola.popleft()
+                    comprimido = trama.comprimido(self.metricas) if self.comprime else None
+                    if comprimido is not None:
+                        envio = self.websocket.send_bytes(comprimido)
+                    else:
+                        envio = self.websocket.send_text(trama.texto)
+                    # Sin wait_for (una tarea extra por envío): la revisión de latidos
+                    # cierra las conexiones con un envío atascado más de WS_ENVIO_TIMEOUT
+                    self.enviando_desde = time.monotonic()
+                    await envio
+                    self.enviando_desde = None
+                    self.metricas.enviados += 1
+                    self.metricas.latencias.append(time.perf_counter() - encolado)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Conexión caída: el receptor de la ruta hará la limpieza
+            self.metricas.errores += 1
+            logger.warning(f"Error enviando por WebSocket: {e}")
+            self.cerrar()
+
+    def marcar_actividad(self):
+        self.ultima_actividad = time.monotonic()
+
+    def cerrar(self, codigo: Optional[int] = None, razon: str = ""):
+        """Detiene el envío y sale del registro; con código, además cierra el socket"""
+        if self.cerrada:
+            return
+        self.cerrada = True
+        self._cola.clear()
+        if asyncio.current_task() is not self._tarea:
+            self._tarea.cancel()
+        if codigo is not None:
+            asyncio.get_running_loop().create_task(self._cerrar_socket(codigo, razon))
+        self._al_cerrar(self)
+
+    async def _cerrar_socket(self, codigo: int, razon: str):
+        try:
+            await self.websocket.close(code=codigo, reason=razon)
+        except Exception:
+            pass
+
 
 class ConnectionManager:
-    """Gestiona las conexiones WebSocket activas"""
+    """
+    Gestiona las conexiones WebSocket activas
+    Registro indexado por id de conexión, usuario y rol (altas y bajas O(1)).
+    Una tarea de latidos envía un ping periódico y cierra las conexiones que
+    llevan más de WS_HEARTBEAT_TIMEOUT segundos sin mandar nada (TCP medio
+    abierto, pestaña suspendida...), así el registro solo contiene clientes vivos.
+    Los envíos se entregan a los clientes de este worker y se publican en el
+    backplane para que los demás workers los entreguen a los suyos. Cada envío
+    se serializa una sola vez y todas las conexiones comparten la misma trama.
+    Por el mismo backplane viajan las invalidaciones de las cachés en memoria
+    (tokens revocados, contadores, agenda...), que cada worker aplica con la
+    función registrada en al_invalidar.
+    """
     
-    def __init__(self):
-        # Diccionario de conexiones: user_id -> List[WebSocket]
-        self.active_connections: Dict[int, List[WebSocket]] = {}
+    def __init__(self, backplane: Optional[Backplane] = None):
+        # Conexiones por id
+        self.conexiones: Dict[str, ConexionSalida] = {}
+        # Conexiones por usuario: user_id -> Set[ConexionSalida]
+        self.active_connections: Dict[int, Set[ConexionSalida]] = {}
         # Conexiones por rol
-        self.connections_by_role: Dict[str, List[WebSocket]] = {
-            "Administrador": [],
-            "Medico": [],
-            "Enfermera": [],
-            "Farmaceutico": []
+        self.connections_by_role: Dict[str, Set[ConexionSalida]] = {
+            "Administrador": set(),
+            "Medico": set(),
+            "Enfermera": set(),
+            "Farmaceutico": set()
         }
+        # Rol de cada usuario conectado: user_id -> cargo
+        self.user_roles: Dict[int, str] = {}
+        # Cachés que otros workers pueden invalidar: nombre -> aplicar(datos)
+        self._invalidaciones: Dict[str, Callable[[dict], None]] = {}
+        self.metricas = MetricasEnvio()
+        self._tarea_latidos: Optional[asyncio.Task] = None
+        self.backplane = backplane or crear_backplane(settings.WS_BACKPLANE)
+        if settings.WS_POLITICA_LENTO not in POLITICAS_LENTO:
+            raise ValueError(
+                f"WS_POLITICA_LENTO inválido: {settings.WS_POLITICA_LENTO} (opciones: {', '.join(POLITICAS_LENTO)})"
+            )
+
+    async def iniciar(self):
+        """Arranca el backplane y la tarea de latidos; debe llamarse desde el event loop (startup)"""
+        await self.backplane.iniciar(self._recibir)
+        self._tarea_latidos = asyncio.get_running_loop().create_task(self._latidos())
+
+    async def detener(self):
+        if self._tarea_latidos:
+            self._tarea_latidos.cancel()
+        await self.backplane.detener()
+        tareas = [conexion._tarea for conexion in self.conexiones.values()]
+        for conexion in list(self.conexiones.values()):
+            conexion.cerrar()
+        await asyncio.gather(*tareas, return_exceptions=True)
     
-    async def connect(self, websocket: WebSocket, user_id: int, user_role: str):
+    async def connect(
+        self,
+        websocket: WebSocket,
+        user_id: int,
+        user_role: str,
+        comprime: bool = False
+    ) -> ConexionSalida:
         """Conecta un nuevo cliente WebSocket"""
         await websocket.accept()
+        conexion = ConexionSalida(websocket, user_id, user_role, self.metricas, self._quitar, comprime)
         
-        # Agregar a conexiones por usuario
-        if user_id not in self.active_connections:
-            self.active_connections[user_id] = []
-        self.active_connections[user_id].append(websocket)
-        
-        # Agregar a conexiones por rol
-        if user_role in self.connections_by_role:
-            self.connections_by_role[user_role].append(websocket)
+        self.conexiones[conexion.id] = conexion
+        self.active_connections.setdefault(user_id, set()).add(conexion)
+        self.user_roles[user_id] = user_role
+        self.connections_by_role.setdefault(user_role, set()).add(conexion)
         
         print(f"✅ Usuario {user_id} ({user_role}) conectado. Total conexiones: {self.get_total_connections()}")
+        return conexion
     
-    def disconnect(self, websocket: WebSocket, user_id: int, user_role: str):
-        """Desconecta un cliente WebSocket"""
-        # Remover de conexiones por usuario
-        if user_id in self.active_connections:
-            if websocket in self.active_connections[user_id]:
-                self.active_connections[user_id].remove(websocket)
-            if not self.active_connections[user_id]:
-                del self.active_connections[user_id]
+    def disconnect(self, conexion_id: str):
+        """Desconecta un cliente WebSocket; no hace nada si ya se había quitado"""
+        conexion = self.conexiones.get(conexion_id)
+        if conexion:
+            conexion.cerrar()
+
+    def _quitar(self, conexion: ConexionSalida):
+        """Saca la conexión de todos los índices (la llama ConexionSalida al cerrarse)"""
+        if self.conexiones.pop(conexion.id, None) is None:
+            return
         
-        # Remover de conexiones por rol
-        if user_role in self.connections_by_role:
-            if websocket in self.connections_by_role[user_role]:
-                self.connections_by_role[user_role].remove(websocket)
+        conexiones_usuario = self.active_connections.get(conexion.user_id)
+        if conexiones_usuario is not None:
+            conexiones_usuario.discard(conexion)
+            if not conexiones_usuario:
+                del self.active_connections[conexion.user_id]
+                self.user_roles.pop(conexion.user_id, None)
         
-        print(f"❌ Usuario {user_id} ({user_role}) desconectado. Total conexiones: {self.get_total_connections()}")
+        conexiones_rol = self.connections_by_role.get(conexion.role)
+        if conexiones_rol is not None:
+            conexiones_rol.discard(conexion)
+        
+        print(f"❌ Usuario {conexion.user_id} ({conexion.role}) desconectado. Total conexiones: {self.get_total_connections()}")
+
+    def _trama(self, message: dict) -> Trama:
+        self.metricas.serializados += 1
+        return Trama.de(message)
+
+    def enviar(self, conexion_id: str, message: dict) -> bool:
+        """Encola un mensaje para una conexión; no espera a que se escriba"""
+        conexion = self.conexiones.get(conexion_id)
+        return conexion.encolar(self._trama(message)) if conexion else False
+
+    def _encolar_a(self, conexiones: Iterable[ConexionSalida], trama: Trama):
+        # Copia: una conexión puede cerrarse (y salir del conjunto) al encolar
+        for conexion in tuple(conexiones):
+            conexion.encolar(trama)
+
+    def _entregar_local(self, tipo: str, destinatario, texto: str):
+        """Encola el mensaje ya serializado a los clientes de este worker (también lo llama el backplane)"""
+        if tipo == "usuario":
+            conexiones = self.active_connections.get(destinatario, ())
+        elif tipo == "rol":
+            conexiones = self.connections_by_role.get(destinatario, ())
+        else:
+            conexiones = self.conexiones.values()
+        if conexiones:
+            self._encolar_a(conexiones, Trama(texto))
+
+    def _recibir(self, tipo: str, destinatario, texto: str):
+        """Lo que publica otro worker: notificaciones para los clientes de este o invalidaciones de caché"""
+        if tipo != "invalidacion":
+            self._entregar_local(tipo, destinatario, texto)
+            return
+        aplicar = self._invalidaciones.get(destinatario)
+        if aplicar is None:
+            return
+        try:
+            aplicar(json.loads(texto))
+        except Exception as e:
+            logger.error(f"Error aplicando la invalidación de {destinatario}: {e}")
+
+    def al_invalidar(self, cache: str, aplicar: Callable[[dict], None]):
+        """Registra cómo aplica este worker las invalidaciones de `cache` publicadas por otro"""
+        self._invalidaciones[cache] = aplicar
+
+    async def publicar_invalidacion(self, cache: str, datos: dict):
+        """Pide a los demás workers que descarten su copia de `cache` (este ya la actualizó)"""
+        try:
+            await self.backplane.publicar("invalidacion", cache, codificar(datos))
+        except Exception as e:
+            self.backplane.errores += 1
+            logger.error(f"Error publicando en el backplane ({self.backplane.nombre}): {e}")
+
+    async def _enviar(self, tipo: str, destinatario, message: dict, propagar: bool):
+        # Copia con la marca de tiempo: el dict del llamador no se modifica
+        trama = self._trama({**message, "timestamp": datetime.utcnow().isoformat()})
+        self._entregar_local(tipo, destinatario, trama.texto)
+        if not propagar:
+            return
+        try:
+            await self.backplane.publicar(tipo, destinatario, trama.texto)
+        except Exception as e:
+            self.backplane.errores += 1
+            logger.error(f"Error publicando en el backplane ({self.backplane.nombre}): {e}")
     
-    async def send_personal_message(self, message: dict, user_id: int):
-        """Envía un mensaje a un usuario específico"""
-        if user_id in self.active_connections:
-            message["timestamp"] = datetime.utcnow().isoformat()
-            for connection in self.active_connections[user_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    print(f"Error enviando mensaje a usuario {user_id}: {e}")
+    async def send_personal_message(self, message: dict, user_id: int, propagar: bool = True):
+        """
+        Envía un mensaje a un usuario específico, en cualquier worker.
+        Con propagar=False solo a sus conexiones en este worker.
+        """
+        await self._enviar("usuario", user_id, message, propagar)
     
     async def send_to_role(self, message: dict, role: str):
         """Envía un mensaje a todos los usuarios de un rol específico"""
-        if role in self.connections_by_role:
-            message["timestamp"] = datetime.utcnow().isoformat()
-            disconnected = []
-            for connection in self.connections_by_role[role]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    print(f"Error enviando mensaje a rol {role}: {e}")
-                    disconnected.append(connection)
-            
-            # Limpiar conexiones muertas
-            for conn in disconnected:
-                if conn in self.connections_by_role[role]:
-                    self.connections_by_role[role].remove(conn)
+        await self._enviar("rol", role, message, True)
     
     async def broadcast(self, message: dict):
         """Envía un mensaje a todos los usuarios conectados"""
-        message["timestamp"] = datetime.utcnow().isoformat()
-        for user_id, connections in self.active_connections.items():
-            for connection in connections:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    print(f"Error en broadcast a usuario {user_id}: {e}")
+        await self._enviar("todos", None, message, True)
+
+    async def _latidos(self):
+        """Cada WS_HEARTBEAT_INTERVALO: cierra las conexiones mudas o atascadas y hace ping al resto"""
+        while True:
+            await asyncio.sleep(settings.WS_HEARTBEAT_INTERVALO)
+            try:
+                self.revisar_latidos()
+            except Exception as e:
+                logger.error(f"Error revisando latidos WebSocket: {e}")
+
+    def revisar_latidos(self):
+        ahora = time.monotonic()
+        limite = ahora - settings.WS_HEARTBEAT_TIMEOUT
+        limite_envio = ahora - settings.WS_ENVIO_TIMEOUT
+        ping = self._trama({"type": "ping", "timestamp": datetime.utcnow().isoformat()})
+        for conexion in list(self.conexiones.values()):
+            if conexion.ultima_actividad < limite:
+                self.metricas.sin_latido += 1
+                conexion.cerrar(CIERRE_SIN_LATIDO, "Sin respuesta al ping")
+            elif conexion.enviando_desde is not None and conexion.enviando_desde < limite_envio:
+                self.metricas.desconectados_lentos += 1
+                conexion.cerrar(CIERRE_CLIENTE_LENTO, "Envío demasiado lento")
+            else:
+                conexion.encolar(ping)
     
     def get_total_connections(self) -> int:
-        """Retorna el total de conexiones activas"""
-        return sum(len(conns) for conns in self.active_connections.values())
+        """Retorna el total de conexiones activas en este worker"""
+        return len(self.conexiones)
     
     def get_users_online(self) -> List[int]:
-        """Retorna lista de IDs de usuarios conectados"""
+        """Retorna lista de IDs de usuarios conectados a este worker"""
         return list(self.active_connections.keys())
+    
+    def get_user_roles(self) -> Dict[int, str]:
+        """Retorna el rol de cada usuario conectado a este worker"""
+        return dict(self.user_roles)
+
+    def estadisticas_envio(self) -> dict:
+        """Profundidad de las colas de salida y latencia encolado→escrito"""
+        profundidades = [conexion.pendientes for conexion in self.conexiones.values()]
+        return {
+            "heartbeat_intervalo": settings.WS_HEARTBEAT_INTERVALO,
+            "heartbeat_timeout": settings.WS_HEARTBEAT_TIMEOUT,
+            "cola_max": settings.WS_COLA_MAX,
+            "compresion": settings.WS_COMPRESION,
+            "conexiones_comprimidas": sum(1 for conexion in self.conexiones.values() if conexion.comprime),
+            "politica_lento": settings.WS_POLITICA_LENTO,
+            "pendientes": sum(profundidades),
+            "cola_mas_larga": max(profundidades, default=0),
+            **self.metricas.resumen(),
+        }
 
 
 # Instancia global del gestor de conexiones
@@ -124,11 +458,8 @@ async def notificar_llamada_paciente(paciente_id: int, paciente_nombre: str, med
     }, paciente_id)
 
 
-async def notificar_cita_actualizada(cita_id: int, paciente_id: int, nuevo_estado: str, mensaje: str):
-    """
-    Notifica cambios en el estado de una cita
-    """
-    await manager.send_personal_message({
+def mensaje_cita_actualizada(cita_id: int, nuevo_estado: str, mensaje: str) -> dict:
+    return {
         "type": "cita_actualizada",
         "title": "Actualización de cita",
         "message": mensaje,
@@ -136,7 +467,34 @@ async def notificar_cita_actualizada(cita_id: int, paciente_id: int, nuevo_estad
             "cita_id": cita_id,
             "nuevo_estado": nuevo_estado
         }
-    }, paciente_id)
+    }
+
+
+async def notificar_cita_actualizada(cita_id: int, paciente_id: int, nuevo_estado: str, mensaje: str):
+    """
+    Notifica cambios en el estado de una cita
+    """
+    await manager.send_personal_message(
+        mensaje_cita_actualizada(cita_id, nuevo_estado, mensaje), paciente_id
+    )
+
+
+def mensaje_citas_agendadas(citas: List[dict]) -> dict:
+    return {
+        "type": "citas_agendadas",
+        "title": "Citas agendadas",
+        "message": f"Se agendaron {len(citas)} cita(s)",
+        "data": {
+            "citas": citas
+        }
+    }
+
+
+async def notificar_citas_agendadas(paciente_id: int, citas: List[dict]):
+    """
+    Notifica en un solo mensaje todas las citas agendadas a un paciente en un lote
+    """
+    await manager.send_personal_message(mensaje_citas_agendadas(citas), paciente_id)
 
 
 async def notificar_receta_lista(paciente_id: int, receta_id: int):
@@ -165,6 +523,17 @@ async def notificar_medicos(titulo: str, mensaje: str, data: dict = None):
     }, "Medico")
 
 
+async def notificar_contadores(user_id: int, contadores: dict):
+    """
+    Envía los contadores de notificaciones actualizados a un usuario
+    """
+    # Cada worker calcula los contadores de sus propios clientes
+    await manager.send_personal_message({
+        "type": "contadores",
+        "data": contadores
+    }, user_id, propagar=False)
+
+
 async def notificar_farmaceuticos(titulo: str, mensaje: str, data: dict = None):
     """
     Envía notificación a todos los farmacéuticos
@@ -1,13 +1,23 @@
+import asyncio
+import threading
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core import config, database
 from app.core.init_data import initialize_default_data
+from app.utils.pagination import NEXT_CURSOR_HEADER
 from app.routes import (
     auth_routes, empleado_routes, paciente_routes, medico_routes,
     cita_routes, historia_routes, consulta_routes, farmacia_routes, medicamento_routes,
-    asistencia_routes, receta_routes, websocket_routes, encuesta_routes
+    asistencia_routes, receta_routes, websocket_routes, encuesta_routes,
+    notificacion_routes, sistema_routes, export_routes
 )
+from app.core.dispatcher import dispatcher
+from app.core.websocket import manager
+from app.core.login_pool import pool_hash
+from app.services.receta_pdf_service import generador_pdf
+from app.services.notificacion_service import tarea_publicar_contadores
+from app.services.busqueda_service import indice_pacientes
 
 def create_app() -> FastAPI:
     app = FastAPI(
@@ -25,6 +35,7 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER],
     )
     
     # Ruta raíz de bienvenida
@@ -50,6 +61,9 @@ def create_app() -> FastAPI:
     app.include_router(asistencia_routes.router, prefix="/asistencias", tags=["asistencias"])
     app.include_router(receta_routes.router, prefix="/recetas", tags=["recetas"])
     app.include_router(encuesta_routes.router, prefix="/encuestas", tags=["encuestas"])
+    app.include_router(notificacion_routes.router, prefix="/notificaciones", tags=["notificaciones"])
+    app.include_router(sistema_routes.router, prefix="/sistema", tags=["sistema"])
+    app.include_router(export_routes.router, prefix="/export", tags=["export"])
     app.include_router(websocket_routes.router, tags=["websocket"])
 
     @app.on_event("startup")
@@ -60,6 +74,24 @@ def create_app() -> FastAPI:
         initialize_default_data()
         print("✅ Sistema listo!")
 
+    @app.on_event("startup")
+    async def iniciar_tareas():
+        # Entrega de notificaciones encoladas desde los servicios síncronos
+        dispatcher.iniciar()
+        # Backplane entre workers, latidos WebSocket y limpieza de conexiones muertas
+        await manager.iniciar()
+        # Publicación de contadores de notificaciones por WebSocket
+        asyncio.create_task(tarea_publicar_contadores())
+        # Índice de búsqueda de pacientes, sin retrasar el arranque
+        threading.Thread(target=indice_pacientes.cargar_en_segundo_plano, daemon=True).start()
+
+    @app.on_event("shutdown")
+    async def detener_tareas():
+        await dispatcher.detener()
+        await manager.detener()
+        pool_hash.cerrar()
+        generador_pdf.cerrar()
+
     return app
 
 app = create_app()
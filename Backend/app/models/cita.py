@@ -1,10 +1,19 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Time
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Time, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, time
 from app.core.database import Base
 
 class Cita(Base):
     __tablename__ = "citas"
+    __table_args__ = (
+        # Índices para la paginación por (fecha, id) con y sin filtro de médico
+        Index("ix_citas_fecha_id", "fecha", "id"),
+        Index("ix_citas_medico_fecha_id", "medico_id", "fecha", "id"),
+        # Pacientes de un médico (EXISTS) y su última visita (MAX(fecha)) sin leer la tabla
+        Index("ix_citas_medico_paciente_fecha", "medico_id", "paciente_id", "fecha"),
+        # Historial de un paciente por fecha (timeline)
+        Index("ix_citas_paciente_fecha_id", "paciente_id", "fecha", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     fecha = Column(DateTime, nullable=False)
@@ -1,10 +1,18 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, JSON
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
 
 class Consulta(Base):
     __tablename__ = "consultas"
+    __table_args__ = (
+        # Historial de un paciente por fecha (timeline)
+        Index("ix_consultas_paciente_fecha_id", "paciente_id", "fecha_consulta", "id"),
+        # Listado de consultas: una combinación de filtros por índice
+        Index("ix_consultas_fecha_id", "fecha_consulta", "id"),
+        Index("ix_consultas_medico_fecha_id", "medico_id", "fecha_consulta", "id"),
+        Index("ix_consultas_medico_paciente_fecha_id", "medico_id", "paciente_id", "fecha_consulta", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -9,6 +9,10 @@ class EncuestaSatisfaccion(Base):
     Actividad 16 del manual de procesos
     """
     __tablename__ = "encuestas_satisfaccion"
+    __table_args__ = (
+        # Historial de un paciente por fecha (timeline)
+        Index("ix_encuestas_paciente_fecha_id", "paciente_id", "fecha", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     paciente_id = Column(Integer, ForeignKey("pacientes.id"), nullable=False)
@@ -15,3 +15,6 @@ class Historia(Base):
     
     # Relación 1:1 con Paciente
     paciente = relationship("Paciente", back_populates="historia", uselist=False)
+
+    # Resumen mantenido con cada consulta y receta (1:1)
+    resumen = relationship("ResumenHistoria", back_populates="historia", uselist=False, cascade="all, delete-orphan")
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Index
+from datetime import datetime
+from app.core.database import Base
+
+class MedicionVital(Base):
+    """
+    Una medición de un signo vital: una fila por métrica y consulta.
+    Se escribe junto con la consulta a partir de su JSON `signos_vitales`
+    para poder consultar series y umbrales sin leer ni parsear las consultas.
+    """
+    __tablename__ = "mediciones_vitales"
+    __table_args__ = (
+        # Serie de un paciente: /pacientes/{id}/signos
+        Index("ix_mediciones_paciente_metrica_fecha", "paciente_id", "metrica", "medido_en"),
+        # Búsquedas por umbral en un periodo (p. ej. SpO2 < 92 esta semana)
+        Index("ix_mediciones_metrica_fecha_valor", "metrica", "medido_en", "valor"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    paciente_id = Column(Integer, ForeignKey("pacientes.id"), nullable=False)
+    consulta_id = Column(Integer, ForeignKey("consultas.id"), nullable=False, index=True)
+    metrica = Column(String(30), nullable=False)  # Clave de METRICAS en signos_service
+    valor = Column(Float, nullable=False)
+    medido_en = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -17,7 +17,7 @@ class Medico(Base):
     email = Column(String(150), unique=True, nullable=True)
     
     # Si se quiere relacionar con Empleado (herencia)
-    empleado_id = Column(Integer, ForeignKey("empleados.id"), nullable=True)
+    empleado_id = Column(Integer, ForeignKey("empleados.id"), nullable=True, index=True)
     
     # Relación con Citas (1 Médico -> N Citas)
     citas = relationship("Cita", back_populates="medico", cascade="all, delete-orphan")
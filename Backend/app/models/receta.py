@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -9,6 +9,12 @@ class Receta(Base):
     Permite gestionar medicamentos prescritos por el médico
     """
     __tablename__ = "recetas"
+    __table_args__ = (
+        # Historial de un paciente por fecha (timeline)
+        Index("ix_recetas_paciente_fecha_id", "paciente_id", "fecha_emision", "id"),
+        # Exportación por rango de fechas
+        Index("ix_recetas_fecha_id", "fecha_emision", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     consulta_id = Column(Integer, ForeignKey("consultas.id"), nullable=False)
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime, UniqueConstraint
+from app.core.database import Base
+
+class ReservaSlot(Base):
+    """
+    Ocupación de un horario (medico_id, fecha, hora_inicio) de la agenda.
+    La restricción única impide que dos citas activas compartan horario.
+    Mientras cita_id es nulo la fila es una reserva temporal que vence en expira_en;
+    al confirmarse queda asociada a la cita hasta que esta se cancela o elimina.
+    """
+    __tablename__ = "reservas_slot"
+    __table_args__ = (
+        UniqueConstraint("medico_id", "fecha", "hora_inicio", name="uq_reserva_slot"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    medico_id = Column(Integer, ForeignKey("medicos.id"), nullable=False)
+    fecha = Column(Date, nullable=False)
+    hora_inicio = Column(String(10), nullable=False)  # Formato "09:00"
+    token = Column(String(64), unique=True, nullable=False)
+    expira_en = Column(DateTime, nullable=True)  # Solo para reservas sin confirmar
+    cita_id = Column(Integer, ForeignKey("citas.id"), nullable=True, unique=True)
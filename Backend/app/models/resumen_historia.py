@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Text, JSON
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from app.core.database import Base
+
+class ResumenHistoria(Base):
+    """
+    Resumen persistido de la historia clínica de un paciente.
+    Se actualiza en la misma transacción que cada consulta o receta, de modo que
+    abrir una historia es una lectura por clave en lugar de recorrer todo el historial.
+    """
+    __tablename__ = "resumenes_historia"
+
+    id = Column(Integer, primary_key=True, index=True)
+    historia_id = Column(Integer, ForeignKey("historias.id"), unique=True, nullable=False)
+    paciente_id = Column(Integer, ForeignKey("pacientes.id"), unique=True, nullable=False)
+
+    # Últimos signos vitales registrados y cuándo
+    ultimos_signos = Column(JSON, nullable=True)
+    fecha_ultimos_signos = Column(DateTime, nullable=True)
+
+    # [{"diagnostico", "fecha", "consulta_id"}], el más reciente primero y sin repetir
+    diagnosticos_activos = Column(JSON, nullable=True)
+    # [{"receta_id", "medicamentos", "fecha", "estado"}] de recetas pendientes o parciales
+    recetas_vigentes = Column(JSON, nullable=True)
+    alergias = Column(Text, nullable=True)  # Copia de Paciente.alergias
+
+    total_consultas = Column(Integer, default=0, nullable=False)
+    total_recetas = Column(Integer, default=0, nullable=False)
+    ultima_consulta = Column(DateTime, nullable=True)
+    actualizado_en = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    historia = relationship("Historia", back_populates="resumen")
@@ -1,9 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.core.database import SessionLocal
 from app.schemas.empleado_schema import EmpleadoCreate, EmpleadoOut, LoginRequest
 from app.services.empleado_service import create_empleado, authenticate_empleado
+from app.services.medico_service import resolver_medico
 from app.core.security import create_access_token
+from app.core.permissions import security, get_current_user
+from app.core.token_cache import cache_tokens
+from app.core.login_pool import PoolHashSaturadoError
 
 router = APIRouter()
 
@@ -20,9 +26,29 @@ def register(payload: EmpleadoCreate, db: Session = Depends(get_db)):
     return empleado
 
 @router.post("/login")
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
-    empleado = authenticate_empleado(db, payload.email, payload.password)
+async def login(payload: LoginRequest, db: Session = Depends(get_db)):
+    try:
+        empleado = await authenticate_empleado(db, payload.email, payload.password)
+    except PoolHashSaturadoError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
     if not empleado:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciales no válidas")
     token = create_access_token({"sub": str(empleado.id), "cargo": empleado.cargo})
-    return {"access_token": token, "token_type": "bearer", "user": EmpleadoOut.from_orm(empleado)}
+    respuesta = {"access_token": token, "token_type": "bearer", "user": EmpleadoOut.from_orm(empleado)}
+    if empleado.cargo == "Medico":
+        # Resolver aquí su medico_id deja la caché lista para los listados de la sesión
+        respuesta["medico"] = await run_in_threadpool(resolver_medico, db, empleado.id)
+    return respuesta
+
+@router.post("/logout")
+def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: dict = Depends(get_current_user)
+):
+    """Invalida el token actual antes de su expiración"""
+    cache_tokens.revocar(credentials.credentials)
+    return {"detail": "Sesión cerrada"}
@@ -25,14 +25,23 @@ def all(db: Session = Depends(get_db), current_user: dict = Depends(medical_staf
     """Listar todas las citas - Requiere rol: Administrador, Médico o Enfermera"""
     return list_citas(db)
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import SessionLocal
-from app.schemas.cita_schema import CitaCreate, CitaOut, CitaUpdate
-from app.services.cita_service import create_cita, get_cita, list_citas, update_cita, delete_cita
+from typing import List, Optional, Union
+from datetime import date, datetime, time, timedelta
+from app.core.database import SessionLocal, get_async_db
+from app.schemas.cita_schema import CitaCreate, CitaOut, CitaUpdate, ReservaCreate, ReservaOut, CitaLoteCreate, CitaLoteOut, ConteoCitasOut
+from app.services.cita_service import create_cita, create_citas_lote, get_cita, list_citas_async, contar_citas_async, update_cita, delete_cita
+from app.services.reserva_service import (
+    crear_reserva,
+    liberar_reserva,
+    SlotOcupadoError,
+    ReservaInvalidaError
+)
 from app.core.permissions import get_current_user, admin_only
-from app.models.medico import Medico
+from app.services.medico_service import resolver_medico_async
+from app.utils.pagination import LIMITE_POR_DEFECTO, NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
 
 router = APIRouter()
 
@@ -46,20 +55,99 @@ def get_db():
 @router.post("/", response_model=CitaOut)
 def create(payload: CitaCreate, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
     """Crear cita - Requiere autenticación"""
-    return create_cita(db, payload)
+    try:
+        return create_cita(db, payload)
+    except SlotOcupadoError as e:
+        raise HTTPException(409, str(e))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
 
-@router.get("/", response_model=List[CitaOut])
-def all(db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
-    """Listar citas - Admin ve todas, médicos solo sus citas"""
-    medico_id = None
-    
+@router.post("/batch", response_model=CitaLoteOut)
+def create_batch(
+    payload: CitaLoteCreate,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Crear varias citas en una transacción (seguimientos, jornadas de vacunación).
+    Devuelve las citas creadas y los errores por posición del lote.
+    """
+    creadas, errores = create_citas_lote(db, payload.citas, payload.todo_o_nada)
+    return {"creadas": creadas, "errores": errores}
+
+@router.post("/reservas", response_model=ReservaOut, status_code=201)
+def reservar(payload: ReservaCreate, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    """Aparta un horario por unos minutos mientras se completa la cita"""
+    try:
+        return crear_reserva(db, payload.medico_id, payload.fecha, payload.hora_inicio)
+    except SlotOcupadoError as e:
+        raise HTTPException(409, str(e))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+@router.post("/reservas/{token}/confirmar", response_model=CitaOut)
+def confirmar_reserva(token: str, payload: CitaCreate, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    """Crea la cita sobre un horario apartado previamente"""
+    try:
+        return create_cita(db, payload, token_reserva=token)
+    except ReservaInvalidaError as e:
+        raise HTTPException(409, str(e))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+@router.delete("/reservas/{token}")
+def cancelar_reserva(token: str, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    """Libera un horario apartado que no se va a confirmar"""
+    if not liberar_reserva(db, token):
+        raise HTTPException(404, "Reserva no encontrada")
+    return {"detail": "Reserva liberada"}
+
+@router.get("/", response_model=Union[List[CitaOut], ConteoCitasOut])
+async def all(
+    response: Response,
+    fecha: Optional[date] = Query(None, description="Citas de un día (YYYY-MM-DD)"),
+    fecha_desde: Optional[date] = Query(None, description="Desde esta fecha, inclusive"),
+    fecha_hasta: Optional[date] = Query(None, description="Hasta esta fecha, inclusive"),
+    estado: Optional[str] = Query(None, description="Filtrar por estado"),
+    medico_id: Optional[int] = Query(None, description="Filtrar por médico"),
+    paciente_id: Optional[int] = Query(None, description="Filtrar por paciente"),
+    count_only: bool = Query(False, description="Devolver solo {total} sin cargar las citas"),
+    cursor: Optional[str] = Query(None, description="Token de la página siguiente"),
+    limit: int = Query(LIMITE_POR_DEFECTO, ge=1, le=1000, description="Tamaño de página"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Listar citas - Admin ve todas, médicos solo sus citas.
+    Paginado por (fecha, id); el token de la siguiente página se devuelve en X-Next-Cursor.
+    """
     # Si es médico, obtener su medico_id
     if current_user["cargo"] == "Medico":
-        medico = db.query(Medico).filter(Medico.empleado_id == current_user["id"]).first()
-        if medico:
-            medico_id = medico.id
-    
-    return list_citas(db, medico_id)
+        medico = await resolver_medico_async(db, current_user["id"])
+        medico_id = medico["medico_id"] if medico else None
+
+    if fecha:
+        fecha_desde = fecha_hasta = fecha
+    desde = datetime.combine(fecha_desde, time.min) if fecha_desde else None
+    hasta = datetime.combine(fecha_hasta + timedelta(days=1), time.min) if fecha_hasta else None
+    filtros = {
+        "medico_id": medico_id,
+        "paciente_id": paciente_id,
+        "estado": estado,
+        "fecha_desde": desde,
+        "fecha_hasta": hasta,
+    }
+    if count_only:
+        return ConteoCitasOut(total=await contar_citas_async(db, **filtros))
+
+    clave = decode_cursor(cursor)
+    if clave and clave[0] is None:
+        raise HTTPException(400, "Cursor de paginación inválido")
+    citas = await list_citas_async(db, cursor=clave, limit=limit + 1, **filtros)
+    if len(citas) > limit:
+        citas = citas[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(citas[-1].fecha, citas[-1].id)
+    return citas
 
 @router.get("/{cita_id}", response_model=CitaOut)
 def one(cita_id: int, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
@@ -72,7 +160,12 @@ def one(cita_id: int, db: Session = Depends(get_db), current_user: dict = Depend
 @router.put("/{cita_id}", response_model=CitaOut)
 def update(cita_id: int, payload: CitaUpdate, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
     """Actualizar cita - Requiere autenticación"""
-    cita = update_cita(db, cita_id, payload)
+    try:
+        cita = update_cita(db, cita_id, payload)
+    except SlotOcupadoError as e:
+        raise HTTPException(409, str(e))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     if not cita:
         raise HTTPException(404, "Cita no encontrada")
     return cita
@@ -88,7 +181,12 @@ def remove(cita_id: int, db: Session = Depends(get_db), current_user: dict = Dep
 @router.put("/{cita_id}", response_model=CitaOut)
 def update(cita_id: int, payload: CitaUpdate, db: Session = Depends(get_db), current_user: dict = Depends(medical_staff)):
     """Actualizar cita - Requiere rol: Administrador, Médico o Enfermera"""
-    cita = update_cita(db, cita_id, payload)
+    try:
+        cita = update_cita(db, cita_id, payload)
+    except SlotOcupadoError as e:
+        raise HTTPException(409, str(e))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     if not cita:
         raise HTTPException(404, "Cita no encontrada")
     return cita
@@ -1,9 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.core.database import SessionLocal
-from app.schemas.consulta_schema import ConsultaCreate, ConsultaOut, ConsultaUpdate
-from app.services.consulta_service import create_consulta, list_consultas, get_consulta, update_consulta
+from typing import List, Optional, Union
+from app.core.database import SessionLocal, get_async_db
+from app.schemas.consulta_schema import ConsultaCreate, ConsultaOut, ConsultaUpdate, ConteoConsultasOut
+from app.services.consulta_service import (
+    create_consulta,
+    list_consultas_async,
+    contar_consultas_async,
+    get_consulta,
+    update_consulta
+)
+from app.utils.pagination import LIMITE_POR_DEFECTO, NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from app.utils.fechas import FechaOHora, inicio_rango, fin_rango
 
 router = APIRouter()
 
@@ -16,17 +25,44 @@ def get_db():
 
 @router.post("/", response_model=ConsultaOut)
 def create(payload: ConsultaCreate, db: Session = Depends(get_db)):
-    return create_consulta(db, payload)
+    try:
+        return create_consulta(db, payload)
+    except ValueError as e:
+        raise HTTPException(404, str(e))
 
-@router.get("/", response_model=List[ConsultaOut])
-def all(
+@router.get("/", response_model=Union[List[ConsultaOut], ConteoConsultasOut])
+async def all(
+    response: Response,
     paciente_id: Optional[int] = Query(None),
     medico_id: Optional[int] = Query(None),
-    fecha_desde: Optional[str] = Query(None),
-    fecha_hasta: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    fecha_desde: Optional[FechaOHora] = Query(None, description="Desde esta fecha u hora, inclusive"),
+    fecha_hasta: Optional[FechaOHora] = Query(None, description="Hasta esta fecha (día completo) u hora, inclusive"),
+    count_only: bool = Query(False, description="Devolver solo {total} sin cargar las consultas"),
+    cursor: Optional[str] = Query(None, description="Token de la página siguiente"),
+    limit: int = Query(LIMITE_POR_DEFECTO, ge=1, le=1000, description="Tamaño de página"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return list_consultas(db, paciente_id, medico_id, fecha_desde, fecha_hasta)
+    """
+    Listar consultas de la más reciente a la más antigua.
+    Paginado por (fecha_consulta, id); el token de la siguiente página se devuelve en X-Next-Cursor.
+    """
+    filtros = {
+        "paciente_id": paciente_id,
+        "medico_id": medico_id,
+        "fecha_desde": inicio_rango(fecha_desde),
+        "fecha_hasta": fin_rango(fecha_hasta),
+    }
+    if count_only:
+        return ConteoConsultasOut(total=await contar_consultas_async(db, **filtros))
+
+    clave = decode_cursor(cursor)
+    if clave and clave[0] is None:
+        raise HTTPException(400, "Cursor de paginación inválido")
+    consultas = await list_consultas_async(db, cursor=clave, limit=limit + 1, **filtros)
+    if len(consultas) > limit:
+        consultas = consultas[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(consultas[-1].fecha_consulta, consultas[-1].id)
+    return consultas
 
 @router.get("/{consulta_id}", response_model=ConsultaOut)
 def one(consulta_id: int, db: Session = Depends(get_db)):
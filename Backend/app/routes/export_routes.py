@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from app.core.permissions import admin_only
+from app.services.export_service import exportar, ENTIDADES, FORMATOS, TIPOS_CONTENIDO
+from app.utils.fechas import FechaOHora, inicio_rango, fin_rango
+
+router = APIRouter()
+
+@router.get("/{entidad}")
+def exportar_entidad(
+    entidad: str,
+    formato: str = Query("ndjson", description="ndjson o csv"),
+    desde: Optional[FechaOHora] = Query(None, description="Desde esta fecha u hora, inclusive"),
+    hasta: Optional[FechaOHora] = Query(None, description="Hasta esta fecha (día completo) u hora, inclusive"),
+    current_user: dict = Depends(admin_only)
+):
+    """
+    Exporta consultas, citas o recetas de un rango de fechas - Solo administradores.
+    El archivo se envía por partes a medida que se lee de la base de datos.
+    """
+    if entidad not in ENTIDADES:
+        raise HTTPException(404, f"Entidades exportables: {', '.join(ENTIDADES)}")
+    if formato not in FORMATOS:
+        raise HTTPException(400, f"Formatos válidos: {', '.join(FORMATOS)}")
+
+    nombre = "_".join(
+        [entidad] + [v.strftime("%Y%m%d") for v in (desde, hasta) if v is not None]
+    )
+    return StreamingResponse(
+        exportar(entidad, formato, inicio_rango(desde), fin_rango(hasta)),
+        media_type=TIPOS_CONTENIDO[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}.{formato}"'}
+    )
@@ -2,8 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from app.core.database import SessionLocal
-from app.schemas.historia_schema import HistoriaCreate, HistoriaOut
-from app.services.historia_service import create_historia, list_historias, get_historia
+from app.schemas.historia_schema import HistoriaCreate, HistoriaOut, HistoriaDetalleOut
+from app.services.historia_service import create_historia, list_historias, get_historia_con_resumen
 
 router = APIRouter()
 
@@ -22,9 +22,10 @@ def create(payload: HistoriaCreate, db: Session = Depends(get_db)):
 def all(db: Session = Depends(get_db)):
     return list_historias(db)
 
-@router.get("/{historia_id}", response_model=HistoriaOut)
+@router.get("/{historia_id}", response_model=HistoriaDetalleOut)
 def one(historia_id: int, db: Session = Depends(get_db)):
-    h = get_historia(db, historia_id)
+    """Historia clínica con el resumen del paciente (signos, diagnósticos, recetas vigentes)"""
+    h = get_historia_con_resumen(db, historia_id)
     if not h:
         raise HTTPException(404, "Historia no encontrada")
-    return h
+    return HistoriaDetalleOut.from_orm(h).copy(update={"paciente_id": h.paciente.id if h.paciente else None})
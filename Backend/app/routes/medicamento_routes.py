@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
-from app.core.database import SessionLocal
+from app.core.database import SessionLocal, get_async_db
 from app.schemas.medicamento_schema import MedicamentoCreate, MedicamentoOut
-from app.services.medicamento_service import create_medicamento, list_medicamentos, get_medicamento
+from app.services.medicamento_service import create_medicamento, list_medicamentos_async, get_medicamento
 
 router = APIRouter()
 
@@ -19,8 +20,8 @@ def create(payload: MedicamentoCreate, db: Session = Depends(get_db)):
     return create_medicamento(db, payload)
 
 @router.get("/", response_model=List[MedicamentoOut])
-def all(db: Session = Depends(get_db)):
-    return list_medicamentos(db)
+async def all(db: AsyncSession = Depends(get_async_db)):
+    return await list_medicamentos_async(db)
 
 @router.get("/{med_id}", response_model=MedicamentoOut)
 def one(med_id: int, db: Session = Depends(get_db)):
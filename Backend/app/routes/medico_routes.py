@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import date, timedelta
 from app.core.database import SessionLocal
 from app.schemas.medico_schema import MedicoOut, MedicoCreate, MedicoUpdate
+from app.schemas.disponibilidad_schema import SlotOut
 from app.services import medico_service
+from app.services.disponibilidad_service import disponibilidad_medico, proximos_slots
+
+MAX_DIAS_DISPONIBILIDAD = 31
 
 router = APIRouter()
 
@@ -19,6 +24,37 @@ def get_all_medicos(db: Session = Depends(get_db)):
     """Listar todos los médicos"""
     return medico_service.list_medicos(db)
 
+@router.get("/disponibilidad", response_model=List[SlotOut])
+def proximos_huecos(
+    especialidad: Optional[str] = Query(None, description="Especialidad; todos los médicos si se omite"),
+    desde: Optional[date] = Query(None, description="Fecha inicial (por defecto hoy)"),
+    duracion: int = Query(30, ge=5, le=480, description="Duración del hueco en minutos"),
+    n: int = Query(10, ge=1, le=200, description="Cantidad de huecos"),
+    horizonte: int = Query(14, ge=1, le=MAX_DIAS_DISPONIBILIDAD, description="Días a explorar"),
+    db: Session = Depends(get_db)
+):
+    """Próximos huecos libres entre todos los médicos de una especialidad"""
+    return proximos_slots(db, especialidad, desde or date.today(), duracion, n, horizonte)
+
+@router.get("/{medico_id}/disponibilidad", response_model=List[SlotOut])
+def disponibilidad(
+    medico_id: int,
+    desde: Optional[date] = Query(None, description="Fecha inicial (por defecto hoy)"),
+    hasta: Optional[date] = Query(None, description="Fecha final inclusive (por defecto desde + 6 días)"),
+    duracion: int = Query(30, ge=5, le=480, description="Duración del hueco en minutos"),
+    db: Session = Depends(get_db)
+):
+    """Huecos libres de un médico en un rango de fechas"""
+    desde = desde or date.today()
+    hasta = hasta or desde + timedelta(days=6)
+    if hasta < desde:
+        raise HTTPException(status_code=400, detail="'hasta' debe ser posterior a 'desde'")
+    if (hasta - desde).days >= MAX_DIAS_DISPONIBILIDAD:
+        raise HTTPException(status_code=400, detail=f"El rango máximo es de {MAX_DIAS_DISPONIBILIDAD} días")
+    if not medico_service.get_medico(db, medico_id):
+        raise HTTPException(status_code=404, detail="Médico no encontrado")
+    return disponibilidad_medico(db, medico_id, desde, hasta, duracion)
+
 @router.get("/{medico_id}", response_model=MedicoOut)
 def get_one_medico(medico_id: int, db: Session = Depends(get_db)):
     """Obtener un médico por ID"""
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.schemas.notificacion_schema import ContadoresOut
+from app.services.notificacion_service import obtener_contadores
+from app.core.permissions import get_current_user
+
+router = APIRouter()
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@router.get("/contadores", response_model=ContadoresOut, response_model_exclude_none=True)
+def contadores(db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    """
+    Contadores de notificaciones del usuario según su rol.
+    Los mismos valores se publican por WebSocket (tipo "contadores") cuando cambian.
+    """
+    return obtener_contadores(db, current_user["cargo"], current_user["id"])
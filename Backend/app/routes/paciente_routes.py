@@ -1,11 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException
+import os
+import shutil
+import tempfile
+import threading
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import SessionLocal
-from app.schemas.paciente_schema import PacienteCreate, PacienteOut, PacienteUpdate
-from app.services.paciente_service import create_paciente, get_paciente, list_pacientes, delete_paciente, update_paciente
+from datetime import datetime
+from typing import List, Optional, Union
+from app.core.database import SessionLocal, get_async_db
+from app.schemas.paciente_schema import PacienteCreate, PacienteOut, PacienteUpdate, ConteoPacientesOut
+from app.services.paciente_service import (
+    create_paciente,
+    get_paciente,
+    list_pacientes_async,
+    contar_pacientes_async,
+    delete_paciente,
+    update_paciente
+)
 from app.core.permissions import get_current_user, admin_only
-from app.models.medico import Medico
+from app.services.medico_service import resolver_medico_async
+from app.services.busqueda_service import buscar_pacientes
+from app.services.importacion_service import importaciones, importar_en_segundo_plano, FORMATOS_IMPORTACION
+from app.services.timeline_service import timeline_paciente, TIPOS_TIMELINE
+from app.schemas.timeline_schema import EventoTimelineOut
+from app.services.signos_service import analizar_signos, METRICAS
+from app.schemas.signos_vitales_schema import SerieSignoOut
+from app.utils.pagination import (
+    LIMITE_POR_DEFECTO,
+    NEXT_CURSOR_HEADER,
+    encode_cursor,
+    decode_cursor,
+    encode_cursor_evento,
+    decode_cursor_evento
+)
 
 router = APIRouter()
 
@@ -21,18 +48,98 @@ def create(payload: PacienteCreate, db: Session = Depends(get_db), current_user:
     """Crear paciente - Requiere autenticación"""
     return create_paciente(db, payload)
 
-@router.get("/", response_model=List[PacienteOut])
-def all(db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
-    """Listar pacientes - Admin ve todos, médicos solo sus pacientes"""
+@router.get("/", response_model=Union[List[PacienteOut], ConteoPacientesOut])
+async def all(
+    response: Response,
+    orden: str = Query("id", regex="^(id|ultima_visita)$", description="id o ultima_visita (más reciente primero)"),
+    count_only: bool = Query(False, description="Devolver solo {total} sin cargar los pacientes"),
+    cursor: Optional[str] = Query(None, description="Token de la página siguiente"),
+    limit: int = Query(LIMITE_POR_DEFECTO, ge=1, le=1000, description="Tamaño de página"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Listar pacientes - Admin ve todos, médicos solo sus pacientes.
+    Paginado por keyset; el token de la siguiente página se devuelve en X-Next-Cursor.
+    """
     medico_id = None
     
     # Si es médico, obtener su medico_id
     if current_user["cargo"] == "Medico":
-        medico = db.query(Medico).filter(Medico.empleado_id == current_user["id"]).first()
+        medico = await resolver_medico_async(db, current_user["id"])
         if medico:
-            medico_id = medico.id
+            medico_id = medico["medico_id"]
+    if count_only:
+        return ConteoPacientesOut(total=await contar_pacientes_async(db, medico_id))
     
-    return list_pacientes(db, medico_id)
+    clave = decode_cursor(cursor)
+    # En el orden por última visita la fecha es None al llegar a los pacientes sin citas
+    if clave and orden == "id" and clave[0] is not None:
+        raise HTTPException(400, "El cursor no corresponde al orden solicitado")
+    filas = await list_pacientes_async(
+        db,
+        medico_id,
+        por_ultima_visita=orden == "ultima_visita",
+        cursor=clave,
+        limit=limit + 1
+    )
+    if len(filas) > limit:
+        filas = filas[:limit]
+        paciente, ultima_visita = filas[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(ultima_visita, paciente.id)
+    return [
+        PacienteOut.from_orm(paciente).copy(update={"ultima_visita": ultima_visita})
+        for paciente, ultima_visita in filas
+    ]
+
+@router.post("/importar", status_code=202)
+def importar(
+    archivo: UploadFile = File(..., description="CSV con cabecera o NDJSON (un paciente por línea)"),
+    formato: Optional[str] = Query(None, description="csv o ndjson; por defecto según la extensión"),
+    current_user: dict = Depends(admin_only)
+):
+    """
+    Importación masiva de pacientes - Solo administradores.
+    Las cédulas existentes se actualizan con las columnas no vacías del archivo.
+    Se procesa en segundo plano: el progreso se consulta en /pacientes/importar/{id}.
+    """
+    if formato is None:
+        formato = os.path.splitext(archivo.filename or "")[1].lstrip(".").lower()
+        formato = "ndjson" if formato in ("jsonl", "json") else formato
+    if formato not in FORMATOS_IMPORTACION:
+        raise HTTPException(400, f"Formatos válidos: {', '.join(FORMATOS_IMPORTACION)}")
+
+    # El archivo subido se cierra al terminar la petición: se copia a uno propio
+    with tempfile.NamedTemporaryFile(suffix=f".{formato}", delete=False) as copia:
+        shutil.copyfileobj(archivo.file, copia)
+    importacion = importaciones.nueva(archivo.filename)
+    threading.Thread(
+        target=importar_en_segundo_plano,
+        args=(copia.name, formato, importacion),
+        daemon=True
+    ).start()
+    return importacion.resumen()
+
+@router.get("/importar/{importacion_id}")
+def estado_importacion(importacion_id: str, current_user: dict = Depends(admin_only)):
+    """Progreso y errores por fila de una importación"""
+    importacion = importaciones.obtener(importacion_id)
+    if not importacion:
+        raise HTTPException(404, "Importación no encontrada")
+    return importacion.resumen()
+
+@router.get("/buscar", response_model=List[PacienteOut])
+def buscar(
+    q: str = Query(..., min_length=1, max_length=100, description="Nombre, apellido, cédula o email"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Búsqueda de pacientes por prefijo, sin distinguir tildes y tolerante a errores
+    de escritura. Devuelve los más relevantes primero.
+    """
+    return buscar_pacientes(db, q, limit)
 
 @router.get("/{paciente_id}", response_model=PacienteOut)
 def one(paciente_id: int, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
@@ -42,6 +149,59 @@ def one(paciente_id: int, db: Session = Depends(get_db), current_user: dict = De
         raise HTTPException(404, "Paciente no encontrado")
     return paciente
 
+@router.get("/{paciente_id}/timeline", response_model=List[EventoTimelineOut])
+def timeline(
+    paciente_id: int,
+    response: Response,
+    tipos: Optional[str] = Query(None, description="Tipos separados por coma: cita,consulta,receta,encuesta"),
+    cursor: Optional[str] = Query(None, description="Token de la página siguiente"),
+    limit: int = Query(50, ge=1, le=200, description="Tamaño de página"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Historial clínico del paciente (citas, consultas, recetas y encuestas) ordenado
+    del más reciente al más antiguo. El token de la siguiente página se devuelve en X-Next-Cursor.
+    """
+    seleccion = TIPOS_TIMELINE
+    if tipos:
+        seleccion = tuple(t for t in TIPOS_TIMELINE if t in {x.strip() for x in tipos.split(",")})
+        if not seleccion:
+            raise HTTPException(400, f"Tipos válidos: {', '.join(TIPOS_TIMELINE)}")
+    clave = decode_cursor_evento(cursor)
+    if clave and clave[1] not in TIPOS_TIMELINE:
+        raise HTTPException(400, "Cursor de paginación inválido")
+    if not get_paciente(db, paciente_id):
+        raise HTTPException(404, "Paciente no encontrado")
+
+    eventos, siguiente = timeline_paciente(db, paciente_id, seleccion, clave, limit)
+    if siguiente:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor_evento(*siguiente)
+    return eventos
+
+@router.get("/{paciente_id}/signos", response_model=List[SerieSignoOut])
+def signos(
+    paciente_id: int,
+    metricas: Optional[str] = Query(None, description="Métricas separadas por coma (por defecto todas)"),
+    desde: Optional[datetime] = Query(None, description="Solo mediciones desde esta fecha"),
+    ventana: int = Query(3, ge=1, le=50, description="Mediciones por media móvil"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Series de signos vitales del paciente con tendencia, media móvil y
+    mediciones fuera del rango normal
+    """
+    seleccion = tuple(METRICAS)
+    if metricas:
+        pedidas = {m.strip() for m in metricas.split(",")}
+        seleccion = tuple(m for m in METRICAS if m in pedidas)
+        if not seleccion:
+            raise HTTPException(400, f"Métricas válidas: {', '.join(METRICAS)}")
+    if not get_paciente(db, paciente_id):
+        raise HTTPException(404, "Paciente no encontrado")
+    return analizar_signos(db, paciente_id, seleccion, desde, ventana)
+
 @router.put("/{paciente_id}", response_model=PacienteOut)
 def update(paciente_id: int, payload: PacienteUpdate, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
     """Actualizar paciente - Requiere autenticación"""
@@ -1,21 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import date
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.core.database import SessionLocal
+from app.core.database import SessionLocal, get_async_db
 from app.schemas.receta_schema import RecetaCreate, RecetaOut, RecetaDispensar
 from app.services.receta_service import (
     crear_receta,
-    listar_recetas,
+    listar_recetas_async,
     obtener_receta,
+    obtener_receta_completa_async,
+    listar_recetas_completas_async,
     dispensar_receta,
     cancelar_receta
 )
 from app.core.permissions import get_current_user, admin_or_medic, admin_or_pharmacist
-from app.utils.pdf_generator import generar_receta_pdf
-from app.models.receta import Receta
-from app.models.paciente import Paciente
-from app.models.empleado import Empleado
+from app.utils.pdf_generator import datos_receta
+from app.services.receta_pdf_service import generador_pdf, clave_pdf, etag_coincide, combinar_pdfs, zip_pdfs
+from app.utils.fechas import inicio_rango, fin_rango
+
+# Recetas por lote de impresión
+MAX_RECETAS_LOTE = 2000
 
 router = APIRouter()
 
@@ -38,16 +45,65 @@ def crear(
     return crear_receta(db, payload)
 
 @router.get("/", response_model=List[RecetaOut])
-def listar(
+async def listar(
     paciente_id: Optional[int] = Query(None, description="Filtrar por paciente"),
     estado: Optional[str] = Query(None, description="Filtrar por estado (pendiente, dispensada, parcial, cancelada)"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Lista recetas con filtros opcionales
     """
-    return listar_recetas(db, paciente_id, estado)
+    return await listar_recetas_async(db, paciente_id, estado)
+
+@router.get("/pdf/lote")
+async def imprimir_lote(
+    estado: Optional[str] = Query("pendiente", description="Estado de las recetas (vacío: todos)"),
+    fecha: Optional[date] = Query(None, description="Día de emisión (YYYY-MM-DD)"),
+    formato: str = Query("pdf", regex="^(pdf|zip)$", description="pdf (un solo archivo) o zip (uno por receta)"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(admin_or_pharmacist)
+):
+    """
+    Imprime varias recetas de una vez - Solo farmacéuticos y administradores.
+    Recetas, pacientes y médicos se leen en una consulta y los PDF que no están
+    en caché se generan en paralelo en el pool de procesos.
+    """
+    recetas = await listar_recetas_completas_async(
+        db,
+        estado=estado or None,
+        desde=inicio_rango(fecha),
+        hasta=fin_rango(fecha),
+        limite=MAX_RECETAS_LOTE + 1
+    )
+    if len(recetas) > MAX_RECETAS_LOTE:
+        raise HTTPException(400, f"Más de {MAX_RECETAS_LOTE} recetas: acote por fecha")
+    recetas = [r for r in recetas if r.paciente and r.medico]
+    if not recetas:
+        raise HTTPException(404, "No hay recetas para imprimir")
+
+    items = []
+    for receta in recetas:
+        datos = datos_receta(receta, receta.paciente, receta.medico)
+        items.append((clave_pdf(datos), datos))
+    try:
+        pdfs = await generador_pdf.obtener_lote(items)
+    except Exception as e:
+        raise HTTPException(500, f"Error al generar PDF: {str(e)}")
+
+    nombre = f"recetas_{fecha.strftime('%Y%m%d') if fecha else 'lote'}"
+    if formato == "zip":
+        return StreamingResponse(
+            zip_pdfs((f"receta_{r.id}.pdf", pdf) for r, pdf in zip(recetas, pdfs)),
+            media_type="application/zip",
+            headers={"Content-Disposition": f"attachment; filename={nombre}.zip"}
+        )
+    combinado = await run_in_threadpool(combinar_pdfs, pdfs)
+    return Response(
+        combinado,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f"attachment; filename={nombre}.pdf"}
+    )
 
 @router.get("/{receta_id}", response_model=RecetaOut)
 def obtener(
@@ -94,41 +150,37 @@ def cancelar(
     return receta
 
 @router.get("/{receta_id}/pdf")
-def descargar_pdf(
+async def descargar_pdf(
     receta_id: int,
-    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Genera y descarga el PDF de una receta médica
-    Accesible para todos los usuarios autenticados
+    Accesible para todos los usuarios autenticados. Responde 304 si el cliente
+    ya tiene la versión actual (If-None-Match con el ETag recibido).
     """
-    # Obtener receta con sus relaciones
-    receta = db.query(Receta).filter(Receta.id == receta_id).first()
+    receta = await obtener_receta_completa_async(db, receta_id)
     if not receta:
         raise HTTPException(404, "Receta no encontrada")
-    
-    # Obtener datos del paciente
-    paciente = db.query(Paciente).filter(Paciente.id == receta.paciente_id).first()
-    if not paciente:
+    if not receta.paciente:
         raise HTTPException(404, "Paciente no encontrado")
-    
-    # Obtener datos del médico
-    medico = db.query(Empleado).filter(Empleado.id == receta.medico_id).first()
-    if not medico:
+    if not receta.medico:
         raise HTTPException(404, "Médico no encontrado")
-    
-    # Generar PDF
+
+    datos = datos_receta(receta, receta.paciente, receta.medico)
+    clave = clave_pdf(datos)
+    etag = f'"{clave}"'
+    # El cliente puede reutilizar su copia, pero debe revalidarla cada vez
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_coincide(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
     try:
-        pdf_buffer = generar_receta_pdf(receta, paciente, medico)
-        
-        # Retornar como respuesta streaming
-        return StreamingResponse(
-            pdf_buffer,
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename=receta_{receta_id}.pdf"
-            }
-        )
+        pdf = await generador_pdf.obtener(clave, datos)
     except Exception as e:
         raise HTTPException(500, f"Error al generar PDF: {str(e)}")
+
+    headers["Content-Disposition"] = f"attachment; filename=receta_{receta_id}.pdf"
+    return Response(pdf, media_type="application/pdf", headers=headers)
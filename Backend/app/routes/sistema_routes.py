@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends
+from app.core import database
+from app.core.config import settings
+from app.core.pool import estado_pool
+from app.core.permissions import admin_only
+from app.core.token_cache import cache_tokens
+from app.core.login_pool import pool_hash
+from app.services.receta_pdf_service import generador_pdf
+
+router = APIRouter()
+
+@router.get("/pool")
+def pool(current_user: dict = Depends(admin_only)):
+    """
+    Ocupación y métricas de los pools de conexiones - Solo administradores.
+    Incluye conexiones en uso, desborde, histograma de espera por conexión y
+    checkouts que agotaron DB_POOL_TIMEOUT.
+    """
+    return {
+        "configuracion": {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_POOL_MAX_OVERFLOW,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pre_ping": settings.DB_POOL_PRE_PING,
+        },
+        "sync": estado_pool(database.engine.pool, database.metricas_pool),
+        # El motor asíncrono se crea con la primera petición que lo usa
+        "async": estado_pool(
+            database.async_engine.sync_engine.pool if database.async_engine else None,
+            database.metricas_pool_async
+        ),
+    }
+
+@router.get("/tokens")
+def tokens(current_user: dict = Depends(admin_only)):
+    """Aciertos y fallos de la caché de tokens verificados - Solo administradores"""
+    return cache_tokens.estadisticas()
+
+@router.get("/login")
+def login(current_user: dict = Depends(admin_only)):
+    """Estado del pool de procesos que verifica contraseñas - Solo administradores"""
+    return pool_hash.estadisticas()
+
+@router.get("/pdf")
+def pdf(current_user: dict = Depends(admin_only)):
+    """Generación de PDFs de recetas y su caché - Solo administradores"""
+    return generador_pdf.estadisticas()
@@ -1,8 +1,11 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query
-from jose import jwt, JWTError
+from jose import JWTError
+from app.core.token_cache import cache_tokens
 from app.core.config import settings
-from app.core.websocket import manager
+from app.core.websocket import COMPRESION_DEFLATE, manager
+from app.core.dispatcher import dispatcher
 from typing import Optional
+import json
 
 router = APIRouter()
 
@@ -11,7 +14,7 @@ async def get_user_from_token(token: str) -> dict:
     Extrae información del usuario desde el token JWT
     """
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+        payload = cache_tokens.verificar(token)
         user_id = payload.get("sub")
         cargo = payload.get("cargo")
         
@@ -23,16 +26,29 @@ async def get_user_from_token(token: str) -> dict:
         return None
 
 
+def es_pong(data: str) -> bool:
+    """Respuesta del cliente al ping de latido: {"type": "pong"}"""
+    try:
+        return json.loads(data).get("type") == "pong"
+    except (ValueError, AttributeError):
+        return False
+
+
 @router.websocket("/ws")
 async def websocket_endpoint(
     websocket: WebSocket,
-    token: Optional[str] = Query(None, description="Token JWT de autenticación")
+    token: Optional[str] = Query(None, description="Token JWT de autenticación"),
+    compresion: Optional[str] = Query(None, description="deflate: recibir los mensajes largos comprimidos")
 ):
     """
     Endpoint WebSocket para notificaciones en tiempo real
     
     Uso:
     ws://localhost:8000/ws?token=YOUR_JWT_TOKEN
+    ws://localhost:8000/ws?token=YOUR_JWT_TOKEN&compresion=deflate
+    
+    Con compresion=deflate los mensajes de WS_COMPRESION_MIN_BYTES o más llegan
+    como tramas binarias comprimidas con deflate sin cabecera (deflate-raw).
     
     Tipos de mensajes que se pueden recibir:
     - llamada_paciente: Notificación de llamada a consulta
@@ -40,6 +56,8 @@ async def websocket_endpoint(
     - receta_lista: Receta disponible en farmacia
     - notificacion_medico: Notificaciones para médicos
     - notificacion_farmacia: Notificaciones para farmacia
+    - ping: Latido; el cliente responde {"type": "pong"} o se le desconecta
+      si pasa WS_HEARTBEAT_TIMEOUT segundos sin enviar nada
     """
     
     # Validar token
@@ -56,39 +74,45 @@ async def websocket_endpoint(
     user_role = user["cargo"]
     
     # Conectar al cliente
-    await manager.connect(websocket, user_id, user_role)
+    comprime = settings.WS_COMPRESION and compresion == COMPRESION_DEFLATE
+    conexion = await manager.connect(websocket, user_id, user_role, comprime)
     
     try:
-        # Enviar mensaje de bienvenida
-        await websocket.send_json({
+        # Enviar mensaje de bienvenida (por la cola de la conexión, como el resto)
+        manager.enviar(conexion.id, {
             "type": "connection_established",
             "message": f"Conectado exitosamente como {user_role}",
-            "user_id": user_id
+            "user_id": user_id,
+            "compresion": COMPRESION_DEFLATE if comprime else None
         })
         
         # Mantener la conexión abierta y escuchar mensajes
         while True:
             # Recibir mensajes del cliente (por si quiere enviar algo)
             data = await websocket.receive_text()
+            # Cualquier mensaje del cliente cuenta como latido
+            conexion.marcar_actividad()
+            if es_pong(data):
+                continue
             
             # Aquí podrías procesar mensajes del cliente si es necesario
             # Por ahora solo hacer echo
-            await websocket.send_json({
+            manager.enviar(conexion.id, {
                 "type": "echo",
                 "message": f"Mensaje recibido: {data}"
             })
             
     except WebSocketDisconnect:
-        manager.disconnect(websocket, user_id, user_role)
+        manager.disconnect(conexion.id)
     except Exception as e:
         print(f"Error en WebSocket: {e}")
-        manager.disconnect(websocket, user_id, user_role)
+        manager.disconnect(conexion.id)
 
 
 @router.get("/ws/stats")
 async def websocket_stats():
     """
-    Endpoint para obtener estadísticas de conexiones WebSocket
+    Endpoint para obtener estadísticas de conexiones WebSocket de este worker
     """
     return {
         "total_connections": manager.get_total_connections(),
@@ -96,5 +120,8 @@ async def websocket_stats():
         "connections_by_role": {
             role: len(conns) 
             for role, conns in manager.connections_by_role.items()
-        }
+        },
+        "dispatcher": dispatcher.estadisticas(),
+        "envio": manager.estadisticas_envio(),
+        "backplane": manager.backplane.estadisticas()
     }
@@ -1,6 +1,9 @@
 from pydantic import BaseModel
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import List, Optional
+from pydantic import conlist
+from .paciente_schema import PacienteOut
+from .medico_schema import MedicoOut
 
 class CitaBase(BaseModel):
     fecha: datetime
@@ -32,8 +35,40 @@ class CitaOut(CitaBase):
     medico_id: Optional[int] = None
     encargado_id: Optional[int] = None
     observaciones_cancelacion: Optional[str] = None
-    paciente: Optional[dict] = None  # Datos del paciente anidados
-    medico: Optional[dict] = None  # Datos del médico anidados
+    paciente: Optional[PacienteOut] = None  # Datos del paciente anidados
+    medico: Optional[MedicoOut] = None  # Datos del médico anidados
 
     class Config:
         orm_mode = True
+
+class ConteoCitasOut(BaseModel):
+    total: int
+
+class ReservaCreate(BaseModel):
+    """Horario que se quiere apartar antes de crear la cita"""
+    medico_id: int
+    fecha: date
+    hora_inicio: str  # Formato "09:00"
+
+class ReservaOut(BaseModel):
+    token: str
+    medico_id: int
+    fecha: date
+    hora_inicio: str
+    expira_en: datetime
+
+    class Config:
+        orm_mode = True
+
+class CitaLoteCreate(BaseModel):
+    """Lote de citas a crear en una sola transacción"""
+    citas: conlist(CitaCreate, min_items=1, max_items=1000)
+    todo_o_nada: bool = False  # Si hay algún error no se crea ninguna cita
+
+class CitaLoteError(BaseModel):
+    indice: int  # Posición del elemento en el lote
+    error: str
+
+class CitaLoteOut(BaseModel):
+    creadas: List[CitaOut]
+    errores: List[CitaLoteError]
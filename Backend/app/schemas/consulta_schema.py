@@ -25,6 +25,9 @@ class ConsultaCreate(ConsultaBase):
 class ConsultaUpdate(ConsultaBase):
     pass
 
+class ConteoConsultasOut(BaseModel):
+    total: int
+
 class ConsultaOut(ConsultaBase):
     id: int
     fecha_consulta: datetime
@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+from datetime import date
+
+class SlotOut(BaseModel):
+    """Hueco libre en la agenda de un médico"""
+    medico_id: int
+    fecha: date
+    hora_inicio: str  # Formato "09:00"
+    hora_fin: str  # Formato "09:30"
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import List, Optional
+from datetime import datetime
 
 class HistoriaBase(BaseModel):
     identificador: str
@@ -11,3 +12,22 @@ class HistoriaOut(HistoriaBase):
     id: int
     class Config:
         orm_mode = True
+
+class ResumenHistoriaOut(BaseModel):
+    ultimos_signos: Optional[dict]
+    fecha_ultimos_signos: Optional[datetime]
+    diagnosticos_activos: List[dict] = []
+    recetas_vigentes: List[dict] = []
+    alergias: Optional[str]
+    total_consultas: int
+    total_recetas: int
+    ultima_consulta: Optional[datetime]
+    actualizado_en: Optional[datetime]
+
+    class Config:
+        orm_mode = True
+
+class HistoriaDetalleOut(HistoriaOut):
+    fecha_creacion: Optional[datetime]
+    paciente_id: Optional[int]
+    resumen: Optional[ResumenHistoriaOut]
@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class ContadoresOut(BaseModel):
+    """Contadores de notificaciones; solo se incluyen los que aplican al rol"""
+    citas_en_espera: Optional[int] = None
+    pacientes_listos: Optional[int] = None
+    recetas_pendientes: Optional[int] = None
+    medicamentos_agotados: Optional[int] = None
+    total: int
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from typing import Optional
-from datetime import date
+from datetime import date, datetime
 
 class PacienteBase(BaseModel):
     nombre: str
@@ -36,10 +36,14 @@ class PacienteUpdate(BaseModel):
     contacto_emergencia_telefono: Optional[str] = None
     contacto_emergencia_relacion: Optional[str] = None
 
+class ConteoPacientesOut(BaseModel):
+    total: int
+
 class PacienteOut(PacienteBase):
     id: int
     historia_id: Optional[int] = None
     edad: Optional[int] = None  # Edad calculada desde fecha_nacimiento
+    ultima_visita: Optional[datetime] = None  # Solo en el listado con orden=ultima_visita
 
     class Config:
         orm_mode = True
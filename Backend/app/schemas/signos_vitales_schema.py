@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional
+from datetime import datetime
 
 class SignosVitalesBase(BaseModel):
     presion_arterial: Optional[str] = None
@@ -21,3 +22,23 @@ class SignosVitalesOut(SignosVitalesBase):
 
     class Config:
         orm_mode = True
+
+class PuntoSignoOut(BaseModel):
+    fecha: datetime
+    valor: float
+    media_movil: float
+    fuera_de_rango: bool
+
+class SerieSignoOut(BaseModel):
+    metrica: str
+    unidad: str
+    rango_normal: Dict[str, Optional[float]]
+    mediciones: int
+    ultimo: float
+    minimo: float
+    maximo: float
+    promedio: float
+    tendencia: Optional[str]  # sube, baja, estable (None con menos de dos días de datos)
+    pendiente_por_dia: Optional[float]
+    fuera_de_rango: int
+    puntos: List[PuntoSignoOut]
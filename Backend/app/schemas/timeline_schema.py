@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+from datetime import datetime
+
+class EventoTimelineOut(BaseModel):
+    """Evento del historial clínico de un paciente"""
+    tipo: str  # cita, consulta, receta, encuesta
+    id: int
+    fecha: datetime
+    resumen: str
+    estado: Optional[str] = None
+    profesional: Optional[str] = None  # Médico o farmacéutico a cargo
+    datos: Dict[str, Any] = {}
@@ -0,0 +1,336 @@
+"""
+Índice de búsqueda de pacientes en memoria
+Indexa nombre, apellido, cédula y email normalizados (minúsculas y sin tildes).
+Cada término se guarda en una lista ordenada para búsquedas por prefijo y en
+un índice de trigramas para tolerar errores de escritura. Se carga con una sola
+consulta al primer uso y se actualiza desde create/update/delete_paciente.
+Los cambios que llegan mientras se lee la tabla para (re)construirlo se anotan
+y se vuelven a aplicar sobre el índice nuevo, así no se pierden en el cambio.
+"""
+import bisect
+import heapq
+import itertools
+import re
+import threading
+import time as _time
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.paciente import Paciente
+from app.utils.logger import logger
+
+_SEPARADORES = re.compile(r"[^0-9a-z]+")
+
+# Puntajes por tipo de coincidencia de cada palabra de la consulta
+PUNTAJE_EXACTO = 1.0
+PUNTAJE_PREFIJO = 0.75
+PUNTAJE_DIFUSO = 0.5  # máximo; se multiplica por la similitud de trigramas
+SIMILITUD_MINIMA = 0.35
+MIN_RESULTADOS_SIN_DIFUSA = 20  # con menos coincidencias exactas/prefijo se prueba la difusa
+MAX_TRIGRAMAS_CANDIDATOS = 4  # trigramas más raros usados para proponer términos parecidos
+MAX_TERMINOS_DIFUSOS = 200  # términos candidatos evaluados por palabra mal escrita
+MAX_PALABRAS = 4
+
+
+def normalizar(texto: Optional[str]) -> str:
+    """Minúsculas sin tildes ni diéresis: "Núñez" -> "nunez" """
+    if not texto:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", str(texto).lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def tokenizar(texto: Optional[str]) -> List[str]:
+    return [t for t in _SEPARADORES.split(normalizar(texto)) if t]
+
+
+def trigramas(termino: str) -> Set[str]:
+    relleno = f"  {termino} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+def terminos_de_paciente(paciente: Paciente) -> Set[str]:
+    terminos = set(tokenizar(paciente.nombre)) | set(tokenizar(paciente.apellido))
+    if paciente.cedula is not None:
+        terminos.add(str(paciente.cedula))
+    if paciente.email:
+        email = normalizar(paciente.email)
+        terminos.update(tokenizar(email))
+    return terminos
+
+
+class IndicePacientes:
+    """Índice invertido término -> pacientes, con prefijos y trigramas"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._terminos: List[str] = []  # ordenados, para prefijos
+        self._por_termino: Dict[str, Set[int]] = {}
+        self._por_trigrama: Dict[str, Set[str]] = {}
+        self._por_paciente: Dict[int, Set[str]] = {}
+        self._cargado_en: Optional[float] = None
+        self._recargando = False
+        # Cambios (paciente_id, términos o None si se eliminó) llegados durante
+        # una construcción; None cuando no hay ninguna en curso
+        self._cambios: Optional[List[Tuple[int, Optional[Set[str]]]]] = None
+        # Evita que varias peticiones construyan el índice inicial a la vez
+        self._carga_lock = threading.Lock()
+
+    # --- Mantenimiento -------------------------------------------------
+
+    def _agregar_termino(self, termino: str, paciente_id: int):
+        ids = self._por_termino.get(termino)
+        if ids is None:
+            ids = self._por_termino[termino] = set()
+            bisect.insort(self._terminos, termino)
+            for trigrama in trigramas(termino):
+                self._por_trigrama.setdefault(trigrama, set()).add(termino)
+        ids.add(paciente_id)
+
+    def _quitar_termino(self, termino: str, paciente_id: int):
+        ids = self._por_termino.get(termino)
+        if ids is None:
+            return
+        ids.discard(paciente_id)
+        if not ids:
+            del self._por_termino[termino]
+            del self._terminos[bisect.bisect_left(self._terminos, termino)]
+            for trigrama in trigramas(termino):
+                terminos = self._por_trigrama.get(trigrama)
+                if terminos is not None:
+                    terminos.discard(termino)
+                    if not terminos:
+                        del self._por_trigrama[trigrama]
+
+    def _quitar(self, paciente_id: int):
+        for termino in self._por_paciente.pop(paciente_id, ()):
+            self._quitar_termino(termino, paciente_id)
+
+    def _insertar(self, paciente_id: int, terminos: Set[str]):
+        self._por_paciente[paciente_id] = terminos
+        for termino in terminos:
+            self._agregar_termino(termino, paciente_id)
+
+    def _construir(self, filas: Iterable[Paciente]):
+        """
+        Reconstruye las estructuras completas fuera del lock y las publica de una vez.
+        La lectura pudo no ver los cambios anotados desde que empezó: se reaplican
+        (en orden) sobre el índice nuevo; los que sí vio quedan igual.
+        """
+        por_paciente = {p.id: terminos_de_paciente(p) for p in filas}
+        por_termino: Dict[str, Set[int]] = {}
+        for paciente_id, terminos in por_paciente.items():
+            for termino in terminos:
+                por_termino.setdefault(termino, set()).add(paciente_id)
+        por_trigrama: Dict[str, Set[str]] = {}
+        for termino in por_termino:
+            for trigrama in trigramas(termino):
+                por_trigrama.setdefault(trigrama, set()).add(termino)
+        with self._lock:
+            self._por_paciente = por_paciente
+            self._por_termino = por_termino
+            self._por_trigrama = por_trigrama
+            self._terminos = sorted(por_termino)
+            for paciente_id, terminos in self._cambios or ():
+                self._quitar(paciente_id)
+                if terminos is not None:
+                    self._insertar(paciente_id, terminos)
+            self._cambios = None
+            self._cargado_en = _time.monotonic()
+
+    def cargar(self, db: Session):
+        # Se anotan los cambios desde antes de leer: la lectura puede no verlos
+        with self._lock:
+            self._cambios = []
+        try:
+            filas = db.query(
+                Paciente.id, Paciente.nombre, Paciente.apellido, Paciente.cedula, Paciente.email
+            ).yield_per(5000)
+            self._construir(filas)
+        finally:
+            with self._lock:
+                self._cambios = None
+
+    def cargar_en_segundo_plano(self):
+        """Construye el índice con una sesión propia (arranque y recargas por TTL)"""
+        from app.core.database import SessionLocal
+        db = SessionLocal()
+        try:
+            with self._carga_lock:
+                self.cargar(db)
+        except Exception as e:
+            logger.error(f"Error construyendo el índice de pacientes: {e}")
+        finally:
+            db.close()
+            self._recargando = False
+
+    def asegurar_cargado(self, db: Session):
+        """
+        Carga el índice al primer uso. Pasado BUSQUEDA_INDICE_TTL se reconstruye en
+        un hilo aparte (para recoger cambios de otros workers) mientras se sigue
+        respondiendo con el índice actual.
+        """
+        if self._cargado_en is None:
+            with self._carga_lock:
+                if self._cargado_en is None:
+                    self.cargar(db)
+            return
+        if _time.monotonic() - self._cargado_en < settings.BUSQUEDA_INDICE_TTL:
+            return
+        with self._lock:
+            if self._recargando:
+                return
+            self._recargando = True
+        threading.Thread(target=self.cargar_en_segundo_plano, daemon=True).start()
+
+    def registrar(self, paciente: Paciente):
+        """Indexa (o reindexa) un paciente creado o modificado"""
+        terminos = terminos_de_paciente(paciente)
+        with self._lock:
+            if self._cambios is not None:
+                self._cambios.append((paciente.id, terminos))
+            if self._cargado_en is None:
+                return  # lo aplicará la carga en curso al terminar, o lo leerá la primera
+            self._quitar(paciente.id)
+            self._insertar(paciente.id, terminos)
+
+    def remover(self, paciente_id: int):
+        with self._lock:
+            if self._cambios is not None:
+                self._cambios.append((paciente_id, None))
+            self._quitar(paciente_id)
+
+    # --- Consulta ------------------------------------------------------
+
+    def _exactos(self, palabra: str) -> Set[int]:
+        return self._por_termino.get(palabra, set())
+
+    def _prefijo(self, palabra: str) -> Set[int]:
+        """Pacientes con un término que empieza por la palabra (sin los exactos)"""
+        inicio = bisect.bisect_left(self._terminos, palabra)
+        fin = bisect.bisect_left(self._terminos, palabra + "\uffff", inicio)
+        return set().union(*(
+            self._por_termino[t] for t in self._terminos[inicio:fin] if t != palabra
+        )) - self._exactos(palabra)
+
+    def _difusos(self, palabra: str, excluidos: int) -> Dict[int, float]:
+        """
+        Pacientes con un término parecido por trigramas (sin los exactos ni los de
+        prefijo), con su puntaje. Solo se intenta si la palabra es poco frecuente
+        (`excluidos` coincidencias previas), que es cuando suele estar mal escrita;
+        las cédulas se buscan solo por prefijo.
+        """
+        difusos: Dict[int, float] = {}
+        if len(palabra) < 3 or palabra.isdigit() or excluidos >= MIN_RESULTADOS_SIN_DIFUSA:
+            return difusos
+        trigramas_palabra = trigramas(palabra)
+        compartidos: Dict[str, int] = {}
+        # Los trigramas muy comunes no discriminan: se usan los más raros para proponer candidatos
+        for trigrama in sorted(trigramas_palabra, key=lambda t: len(self._por_trigrama.get(t, ())))[:MAX_TRIGRAMAS_CANDIDATOS]:
+            for termino in self._por_trigrama.get(trigrama, ()):
+                compartidos[termino] = compartidos.get(termino, 0) + 1
+        parecidos: List[Tuple[float, str]] = []
+        for termino in heapq.nlargest(MAX_TERMINOS_DIFUSOS, compartidos, key=compartidos.get):
+            if termino.startswith(palabra):
+                continue
+            trigramas_termino = trigramas(termino)
+            comunes = len(trigramas_palabra & trigramas_termino)
+            similitud = comunes / (len(trigramas_palabra) + len(trigramas_termino) - comunes)
+            if similitud < SIMILITUD_MINIMA:
+                continue
+            parecidos.append((PUNTAJE_DIFUSO * similitud, termino))
+        # De menor a mayor puntaje: cada update deja el mejor puntaje de cada paciente
+        for puntaje, termino in sorted(parecidos):
+            difusos.update(dict.fromkeys(self._por_termino[termino], puntaje))
+        # Un término parecido puede pertenecer a un paciente que ya coincide mejor
+        for paciente_id in self._exactos(palabra):
+            difusos.pop(paciente_id, None)
+        return difusos
+
+    def buscar(self, consulta: str, limite: int) -> List[Tuple[int, float]]:
+        """
+        Devuelve hasta `limite` pares (paciente_id, puntaje) ordenados por relevancia.
+        Cada palabra de la consulta debe coincidir (exacta, prefijo o difusa) con
+        algún término del paciente.
+
+        Como los niveles de cada palabra son disjuntos, cada paciente cae en una
+        sola combinación de niveles. Las combinaciones se recorren de mayor a menor
+        puntaje máximo y se termina en cuanto ninguna restante puede superar a los
+        `limite` mejores, así las palabras muy frecuentes no obligan a puntuar a
+        todos sus pacientes.
+        """
+        palabras = list(dict.fromkeys(tokenizar(consulta)))[:MAX_PALABRAS]
+        if not palabras:
+            return []
+
+        # Niveles de cada palabra (0 exacta, 1 prefijo, 2 difusa), calculados solo si se llega a ellos
+        niveles: List[Dict[int, object]] = [{} for _ in palabras]
+
+        def nivel(i: int, n: int):
+            if n not in niveles[i]:
+                palabra = palabras[i]
+                if n == 0:
+                    niveles[i][0] = self._exactos(palabra)
+                elif n == 1:
+                    niveles[i][1] = self._prefijo(palabra)
+                else:
+                    previos = len(nivel(i, 0)) + len(nivel(i, 1))
+                    difusos = self._difusos(palabra, previos)
+                    for paciente_id in nivel(i, 1):
+                        difusos.pop(paciente_id, None)
+                    niveles[i][2] = difusos
+            return niveles[i][n]
+
+        def maximo(combinacion):
+            return sum((PUNTAJE_EXACTO, PUNTAJE_PREFIJO, PUNTAJE_DIFUSO)[n] for n in combinacion)
+
+        combinaciones = sorted(itertools.product(range(3), repeat=len(palabras)), key=maximo, reverse=True)
+        mejores: List[Tuple[float, int]] = []  # heap de (puntaje, -id) con los `limite` mejores
+        with self._lock:
+            for combinacion in combinaciones:
+                tope = maximo(combinacion)
+                if len(mejores) >= limite and mejores[0][0] >= tope:
+                    break
+                conjuntos = []
+                for i, n in enumerate(combinacion):
+                    conjunto = nivel(i, n)
+                    if not conjunto:
+                        break
+                    conjuntos.append(conjunto)
+                else:
+                    conjuntos.sort(key=len)
+                    candidatos = conjuntos[0] if len(conjuntos) == 1 else set(conjuntos[0]).intersection(*conjuntos[1:])
+                    fijo = sum((PUNTAJE_EXACTO, PUNTAJE_PREFIJO, 0.0)[n] for n in combinacion)
+                    difusas = [nivel(i, 2) for i, n in enumerate(combinacion) if n == 2]
+                    if not difusas:
+                        # Todos comparten puntaje: basta con `limite` cualesquiera
+                        candidatos = itertools.islice(candidatos, limite)
+                    elif len(difusas) == 1:
+                        candidatos = heapq.nlargest(limite, candidatos, key=difusas[0].__getitem__)
+                    for paciente_id in candidatos:
+                        puntaje = fijo + sum(difusos[paciente_id] for difusos in difusas)
+                        entrada = (puntaje, -paciente_id)
+                        if len(mejores) < limite:
+                            heapq.heappush(mejores, entrada)
+                        elif entrada > mejores[0]:
+                            heapq.heapreplace(mejores, entrada)
+        # Empates: primero el id más bajo
+        return [(-menos_id, puntaje) for puntaje, menos_id in sorted(mejores, reverse=True)]
+
+
+# Instancia global del índice
+indice_pacientes = IndicePacientes()
+
+
+def buscar_pacientes(db: Session, consulta: str, limite: int) -> List[Paciente]:
+    """Pacientes más relevantes para la consulta, en orden de relevancia"""
+    indice_pacientes.asegurar_cargado(db)
+    resultados = indice_pacientes.buscar(consulta, limite)
+    if not resultados:
+        return []
+    ids = [paciente_id for paciente_id, _ in resultados]
+    pacientes = {p.id: p for p in db.query(Paciente).filter(Paciente.id.in_(ids)).all()}
+    return [pacientes[paciente_id] for paciente_id in ids if paciente_id in pacientes]
@@ -1,44 +1,308 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, or_, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload, selectinload
+from datetime import datetime
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Optional, Tuple
 from app.models.cita import Cita
+from app.models.medico import Medico
+from app.models.paciente import Paciente
+from app.models.reserva_slot import ReservaSlot
 from app.schemas.cita_schema import CitaCreate, CitaUpdate
-import asyncio
+from app.services.notificacion_service import invalidar_contadores
+from app.services.disponibilidad_service import indice_agenda
+from app.services.reserva_service import (
+    clave_slot,
+    ocupar_slot,
+    tomar_reserva,
+    liberar_slot_de_cita,
+    nuevo_token,
+    SlotOcupadoError
+)
+from app.core.dispatcher import dispatcher
+from app.core.websocket import mensaje_cita_actualizada, mensaje_citas_agendadas
+
+def create_cita(db: Session, payload: CitaCreate, token_reserva: Optional[str] = None):
+    """
+    Crea una cita ocupando su horario en la misma transacción.
+    Con token_reserva se confirma una reserva temporal previa en lugar de competir por el horario.
+    Lanza SlotOcupadoError si el médico ya tiene ese horario ocupado.
+    """
+    clave = clave_slot(payload.medico_id, payload.fecha, payload.hora_inicio, payload.estado)
+    if token_reserva:
+        reserva = tomar_reserva(db, token_reserva, clave)
+    else:
+        reserva = ocupar_slot(db, clave) if clave else None
 
-def create_cita(db: Session, payload: CitaCreate):
     c = Cita(
         fecha=payload.fecha, 
+        hora_inicio=payload.hora_inicio,
+        hora_fin=payload.hora_fin,
         paciente_id=payload.paciente_id, 
         medico_id=payload.medico_id,
         encargado_id=payload.encargado_id,
         motivo=payload.motivo,
-        estado=payload.estado
+        estado=payload.estado,
+        sala_asignada=payload.sala_asignada,
+        tipo_cita=payload.tipo_cita
     )
     db.add(c)
+    db.flush()
+    if reserva:
+        reserva.cita_id = c.id
+        reserva.expira_en = None
     db.commit()
     db.refresh(c)
+    invalidar_contadores()
+    indice_agenda.registrar(c)
     
-    # Notificar via WebSocket (si está disponible)
-    try:
-        from app.core.websocket import notificar_cita_actualizada
-        asyncio.create_task(
-            notificar_cita_actualizada(
-                c.id, 
-                c.paciente_id, 
-                c.estado, 
-                f"Cita agendada para {c.fecha.strftime('%d/%m/%Y %H:%M')}"
-            )
-        )
-    except Exception as e:
-        print(f"No se pudo enviar notificación WebSocket: {e}")
+    # Notificar via WebSocket (se entrega desde el event loop, sin bloquear esta petición)
+    dispatcher.enviar_a_usuario(c.paciente_id, mensaje_cita_actualizada(
+        c.id,
+        c.estado,
+        f"Cita agendada para {c.fecha.strftime('%d/%m/%Y %H:%M')}"
+    ))
     
     return c
 
-def list_citas(db: Session, medico_id: int = None):
+def create_citas_lote(db: Session, payloads: List[CitaCreate], todo_o_nada: bool = False):
     """
-    Lista citas. Si se proporciona medico_id, solo devuelve citas de ese médico.
+    Crea varias citas en una sola transacción.
+    Valida el lote completo con consultas agrupadas (pacientes, médicos y horarios
+    ocupados), inserta las citas y ocupa los horarios con un INSERT multi-fila
+    cada uno. El número de consultas no depende del tamaño del lote.
+    Devuelve (citas_creadas, errores) donde cada error es {"indice", "error"};
+    con todo_o_nada no se crea ninguna cita si algún elemento es inválido.
     """
+    errores: Dict[int, str] = {}
+    claves: Dict[int, tuple] = {}
+    vistas = set()
+
+    paciente_ids = {p.paciente_id for p in payloads}
+    medico_ids = {p.medico_id for p in payloads if p.medico_id is not None}
+    pacientes_existentes = {
+        pid for (pid,) in db.query(Paciente.id).filter(Paciente.id.in_(paciente_ids)).all()
+    }
+    medicos_existentes = {
+        mid for (mid,) in db.query(Medico.id).filter(Medico.id.in_(medico_ids)).all()
+    } if medico_ids else set()
+
+    for indice, payload in enumerate(payloads):
+        if payload.paciente_id not in pacientes_existentes:
+            errores[indice] = f"Paciente {payload.paciente_id} no encontrado"
+            continue
+        if payload.medico_id is not None and payload.medico_id not in medicos_existentes:
+            errores[indice] = f"Médico {payload.medico_id} no encontrado"
+            continue
+        try:
+            clave = clave_slot(payload.medico_id, payload.fecha, payload.hora_inicio, payload.estado)
+        except ValueError as e:
+            errores[indice] = str(e)
+            continue
+        if clave:
+            if clave in vistas:
+                errores[indice] = "Horario duplicado dentro del lote"
+                continue
+            vistas.add(clave)
+            claves[indice] = clave
+
+    # Horarios ya ocupados en la base de datos (una consulta para todo el lote)
+    if claves:
+        ahora = datetime.utcnow()
+        existentes = db.query(ReservaSlot).filter(
+            ReservaSlot.medico_id.in_({c[0] for c in claves.values()}),
+            ReservaSlot.fecha.in_({c[1] for c in claves.values()})
+        ).all()
+        vencidas = []
+        ocupadas = set()
+        for reserva in existentes:
+            clave = (reserva.medico_id, reserva.fecha, reserva.hora_inicio)
+            if reserva.cita_id is None and reserva.expira_en and reserva.expira_en < ahora:
+                vencidas.append(reserva.id)
+            else:
+                ocupadas.add(clave)
+        if vencidas:
+            db.query(ReservaSlot).filter(
+                ReservaSlot.id.in_(vencidas),
+                ReservaSlot.cita_id.is_(None)
+            ).delete(synchronize_session=False)
+        for indice, clave in list(claves.items()):
+            if clave in ocupadas:
+                errores[indice] = f"El horario {clave[2]} del {clave[1].strftime('%d/%m/%Y')} ya está ocupado"
+                del claves[indice]
+
+    if errores and todo_o_nada:
+        db.rollback()
+        return [], _lista_errores(errores)
+
+    validas = [(indice, payload) for indice, payload in enumerate(payloads) if indice not in errores]
+    nuevas = _insertar_citas(db, validas)
+
+    # Ocupar todos los horarios con un INSERT multi-fila (executemany)
+    filas = [
+        {
+            "medico_id": clave[0],
+            "fecha": clave[1],
+            "hora_inicio": clave[2],
+            "token": nuevo_token(),
+            "expira_en": None,
+            "cita_id": nuevas[indice].id
+        }
+        for indice, clave in claves.items()
+    ]
+    if filas:
+        savepoint = db.begin_nested()
+        try:
+            db.execute(insert(ReservaSlot), filas)
+            savepoint.commit()
+        except IntegrityError:
+            savepoint.rollback()
+            # Otra transacción ocupó algún horario tras la validación: resolver uno a uno
+            for indice, clave in claves.items():
+                try:
+                    ocupar_slot(db, clave, cita_id=nuevas[indice].id)
+                except SlotOcupadoError as e:
+                    errores[indice] = str(e)
+                    db.delete(nuevas.pop(indice))
+            if errores and todo_o_nada:
+                db.rollback()
+                return [], _lista_errores(errores)
+
+    creadas = list(nuevas.values())
+    # Paciente y médico ya están cargados: no expirarlos evita un SELECT por cita al serializar
+    db.expire_on_commit = False
+    try:
+        db.commit()
+    finally:
+        db.expire_on_commit = True
+
+    if creadas:
+        invalidar_contadores()
+        por_paciente: Dict[int, List[dict]] = {}
+        for cita in creadas:
+            indice_agenda.registrar(cita)
+            por_paciente.setdefault(cita.paciente_id, []).append({
+                "cita_id": cita.id,
+                "fecha": cita.fecha.isoformat(),
+                "estado": cita.estado
+            })
+        # Una notificación por paciente con todas sus citas del lote
+        for paciente_id, citas in por_paciente.items():
+            dispatcher.enviar_a_usuario(paciente_id, mensaje_citas_agendadas(citas))
+    return creadas, _lista_errores(errores)
+
+def _clave_cita(paciente_id: int, medico_id: Optional[int], fecha: datetime, hora_inicio: Optional[str]) -> tuple:
+    return paciente_id, medico_id, fecha, hora_inicio
+
+def _insertar_citas(db: Session, validas: List[Tuple[int, CitaCreate]]) -> Dict[int, Cita]:
+    """
+    Inserta las citas con un solo executemany y las lee de vuelta con una consulta
+    (paciente y médico con selectinload). Devuelve {índice del lote: cita}.
+    """
+    if not validas:
+        return {}
+    ultimo_id = db.query(func.max(Cita.id)).scalar() or 0
+    db.execute(insert(Cita), [
+        {
+            "fecha": payload.fecha,
+            "hora_inicio": payload.hora_inicio,
+            "hora_fin": payload.hora_fin,
+            "paciente_id": payload.paciente_id,
+            "medico_id": payload.medico_id,
+            "encargado_id": payload.encargado_id,
+            "motivo": payload.motivo,
+            "estado": payload.estado,
+            "sala_asignada": payload.sala_asignada,
+            "tipo_cita": payload.tipo_cita
+        }
+        for _, payload in validas
+    ])
+
+    # Los ids de un INSERT se asignan en el orden de las filas: se reparten en ese
+    # orden entre los elementos del lote con los mismos datos
+    pendientes: Dict[tuple, Deque[int]] = defaultdict(deque)
+    for indice, payload in validas:
+        pendientes[_clave_cita(payload.paciente_id, payload.medico_id, payload.fecha, payload.hora_inicio)].append(indice)
+    insertadas = db.execute(
+        select(Cita)
+        .options(selectinload(Cita.paciente), selectinload(Cita.medico))
+        .where(Cita.id > ultimo_id, Cita.paciente_id.in_({p.paciente_id for _, p in validas}))
+        .order_by(Cita.id)
+    ).scalars().all()
+    nuevas: Dict[int, Cita] = {}
+    for cita in insertadas:
+        indices = pendientes.get(_clave_cita(cita.paciente_id, cita.medico_id, cita.fecha, cita.hora_inicio))
+        if indices:
+            nuevas[indices.popleft()] = cita
+    return nuevas
+
+def _lista_errores(errores: Dict[int, str]) -> List[dict]:
+    return [{"indice": indice, "error": error} for indice, error in sorted(errores.items())]
+
+def _filtros_citas(
+    stmt,
+    medico_id: Optional[int] = None,
+    paciente_id: Optional[int] = None,
+    estado: Optional[str] = None,
+    fecha_desde: Optional[datetime] = None,
+    fecha_hasta: Optional[datetime] = None
+):
     if medico_id:
-        return db.query(Cita).filter(Cita.medico_id == medico_id).all()
-    return db.query(Cita).all()
+        stmt = stmt.where(Cita.medico_id == medico_id)
+    if paciente_id:
+        stmt = stmt.where(Cita.paciente_id == paciente_id)
+    if estado:
+        stmt = stmt.where(Cita.estado == estado)
+    if fecha_desde:
+        stmt = stmt.where(Cita.fecha >= fecha_desde)
+    if fecha_hasta:
+        stmt = stmt.where(Cita.fecha < fecha_hasta)
+    return stmt
+
+def _select_citas(
+    medico_id: Optional[int] = None,
+    paciente_id: Optional[int] = None,
+    estado: Optional[str] = None,
+    fecha_desde: Optional[datetime] = None,
+    fecha_hasta: Optional[datetime] = None,
+    cursor: Optional[Tuple[datetime, int]] = None,
+    limit: Optional[int] = None
+):
+    """Sentencia compartida por las versiones síncrona y asíncrona del listado"""
+    # Paciente y médico se serializan anidados: cargarlos en la misma consulta
+    stmt = select(Cita).options(joinedload(Cita.paciente), joinedload(Cita.medico))
+    stmt = _filtros_citas(stmt, medico_id, paciente_id, estado, fecha_desde, fecha_hasta)
+    if cursor:
+        fecha, ultimo_id = cursor
+        stmt = stmt.where(or_(
+            Cita.fecha > fecha,
+            and_(Cita.fecha == fecha, Cita.id > ultimo_id)
+        ))
+
+    stmt = stmt.order_by(Cita.fecha, Cita.id)
+    if limit:
+        stmt = stmt.limit(limit)
+    return stmt
+
+def _select_total_citas(medico_id: int = None, **filtros):
+    return _filtros_citas(select(func.count(Cita.id)), medico_id, **filtros)
+
+def list_citas(db: Session, medico_id: int = None, **filtros):
+    """
+    Lista citas ordenadas por (fecha, id) aplicando los filtros en SQL.
+    Si se proporciona cursor, devuelve las citas posteriores a esa clave (keyset).
+    """
+    return db.execute(_select_citas(medico_id, **filtros)).scalars().unique().all()
+
+async def list_citas_async(db: AsyncSession, medico_id: int = None, **filtros):
+    """Versión asíncrona de list_citas"""
+    result = await db.execute(_select_citas(medico_id, **filtros))
+    return result.scalars().unique().all()
+
+async def contar_citas_async(db: AsyncSession, medico_id: int = None, **filtros) -> int:
+    """Número de citas que cumplen los filtros, sin cargarlas"""
+    return (await db.execute(_select_total_citas(medico_id, **filtros))).scalar_one()
 
 def get_cita(db: Session, cita_id: int):
     return db.query(Cita).filter(Cita.id == cita_id).first()
@@ -50,31 +314,42 @@ def update_cita(db: Session, cita_id: int, payload: CitaUpdate):
     
     # Guardar estado anterior
     estado_anterior = cita.estado
+    cambios = payload.dict(exclude_unset=True)
+    
+    # Mover la ocupación del horario si cambia médico, fecha, hora o se libera la cita
+    clave_actual = clave_slot(cita.medico_id, cita.fecha, cita.hora_inicio, cita.estado)
+    clave_nueva = clave_slot(
+        cambios.get("medico_id", cita.medico_id),
+        cambios.get("fecha", cita.fecha),
+        cambios.get("hora_inicio", cita.hora_inicio),
+        cambios.get("estado", cita.estado)
+    )
+    if clave_nueva != clave_actual:
+        liberar_slot_de_cita(db, cita.id)
+        if clave_nueva:
+            ocupar_slot(db, clave_nueva, cita_id=cita.id)
     
     # Actualizar solo los campos proporcionados
-    for field, value in payload.dict(exclude_unset=True).items():
+    for field, value in cambios.items():
         setattr(cita, field, value)
     
     db.commit()
     db.refresh(cita)
+    invalidar_contadores()
+    indice_agenda.registrar(cita)
     
     # Notificar cambios vía WebSocket si cambió el estado
     if estado_anterior != cita.estado:
-        try:
-            from app.core.websocket import notificar_cita_actualizada
-            mensajes = {
-                "confirmada": "Su cita ha sido confirmada",
-                "cancelada": "Su cita ha sido cancelada",
-                "completada": "Su cita ha sido completada",
-                "en_curso": "Su cita está en curso"
-            }
-            mensaje = mensajes.get(cita.estado, f"Estado actualizado a: {cita.estado}")
-            
-            asyncio.create_task(
-                notificar_cita_actualizada(cita.id, cita.paciente_id, cita.estado, mensaje)
-            )
-        except Exception as e:
-            print(f"No se pudo enviar notificación WebSocket: {e}")
+        mensajes = {
+            "confirmada": "Su cita ha sido confirmada",
+            "cancelada": "Su cita ha sido cancelada",
+            "completada": "Su cita ha sido completada",
+            "en_curso": "Su cita está en curso"
+        }
+        mensaje = mensajes.get(cita.estado, f"Estado actualizado a: {cita.estado}")
+        dispatcher.enviar_a_usuario(
+            cita.paciente_id, mensaje_cita_actualizada(cita.id, cita.estado, mensaje)
+        )
     
     return cita
 
@@ -82,6 +357,9 @@ def delete_cita(db: Session, cita_id: int):
     cita = get_cita(db, cita_id)
     if not cita:
         return None
+    liberar_slot_de_cita(db, cita_id)
     db.delete(cita)
     db.commit()
+    invalidar_contadores()
+    indice_agenda.remover(cita_id)
     return True
@@ -1,39 +1,30 @@
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import JSON
-from typing import Optional
+from typing import Optional, Tuple
 from datetime import datetime
 from app.models.consulta import Consulta
-from app.models.cita import Cita
-from app.models.historia import Historia
+from app.models.paciente import Paciente
 from app.schemas.consulta_schema import ConsultaCreate, ConsultaUpdate
-import json
+from app.services.signos_service import registrar_signos
+from app.services.historia_service import obtener_o_crear_historia, asegurar_resumen, registrar_consulta, recalcular_resumen
 
 def create_consulta(db: Session, payload: ConsultaCreate):
-    # Obtener cita para extraer paciente_id e historia_id
-    historia_id = payload.historia_id
-    paciente_id = None
-    
-    if payload.cita_id:
-        cita = db.query(Cita).filter(Cita.id == payload.cita_id).first()
-        if cita:
-            paciente_id = cita.paciente_id
-            # Buscar o crear historia clínica
-            historia = db.query(Historia).filter(Historia.paciente_id == paciente_id).first()
-            if not historia:
-                historia = Historia(paciente_id=paciente_id)
-                db.add(historia)
-                db.flush()
-            historia_id = historia.id
-    
-    # Convertir signos_vitales dict a JSON
-    signos_vitales_json = None
-    if payload.signos_vitales:
-        signos_vitales_json = payload.signos_vitales
+    """
+    Registra la consulta en la historia clínica del paciente (creándola si no
+    existe) y actualiza su resumen en la misma transacción
+    """
+    paciente = db.query(Paciente).filter(Paciente.id == payload.paciente_id).first()
+    if not paciente:
+        raise ValueError("Paciente no encontrado")
+
+    historia = obtener_o_crear_historia(db, paciente)
+    resumen = asegurar_resumen(db, paciente.id, paciente)
 
     consulta = Consulta(
         cita_id=payload.cita_id,
-        historia_id=historia_id,
-        paciente_id=paciente_id,
+        historia_id=historia.id,
+        paciente_id=paciente.id,
         medico_id=payload.medico_id,
         motivo_consulta=payload.motivo_consulta,
         enfermedad_actual=payload.enfermedad_actual,
@@ -45,32 +36,75 @@ def create_consulta(db: Session, payload: ConsultaCreate):
         examenes_solicitados=payload.examenes_solicitados,
         pronostico=payload.pronostico,
         observaciones=payload.observaciones,
-        signos_vitales=signos_vitales_json
+        signos_vitales=payload.signos_vitales or None,
+        fecha_consulta=datetime.utcnow()
     )
     db.add(consulta)
+    db.flush()
+    registrar_signos(db, consulta)
+    registrar_consulta(resumen, consulta)
     db.commit()
     db.refresh(consulta)
     return consulta
 
-def list_consultas(
-    db: Session, 
+def _filtros_consultas(
+    stmt,
     paciente_id: Optional[int] = None,
     medico_id: Optional[int] = None,
-    fecha_desde: Optional[str] = None,
-    fecha_hasta: Optional[str] = None
+    fecha_desde: Optional[datetime] = None,
+    fecha_hasta: Optional[datetime] = None
 ):
-    query = db.query(Consulta)
-    
     if paciente_id:
-        query = query.filter(Consulta.paciente_id == paciente_id)
+        stmt = stmt.where(Consulta.paciente_id == paciente_id)
     if medico_id:
-        query = query.filter(Consulta.medico_id == medico_id)
+        stmt = stmt.where(Consulta.medico_id == medico_id)
     if fecha_desde:
-        query = query.filter(Consulta.fecha_consulta >= fecha_desde)
+        stmt = stmt.where(Consulta.fecha_consulta >= fecha_desde)
     if fecha_hasta:
-        query = query.filter(Consulta.fecha_consulta <= fecha_hasta)
-    
-    return query.all()
+        stmt = stmt.where(Consulta.fecha_consulta < fecha_hasta)
+    return stmt
+
+def _select_consultas(
+    paciente_id: Optional[int] = None,
+    medico_id: Optional[int] = None,
+    fecha_desde: Optional[datetime] = None,
+    fecha_hasta: Optional[datetime] = None,
+    cursor: Optional[Tuple[datetime, int]] = None,
+    limit: Optional[int] = None
+):
+    """
+    Consultas de la más reciente a la más antigua, por (fecha_consulta, id).
+    Cada combinación de filtros tiene un índice que empieza por sus columnas de
+    igualdad y sigue con (fecha_consulta, id), así el rango y el orden los
+    resuelve el índice.
+    """
+    stmt = _filtros_consultas(select(Consulta), paciente_id, medico_id, fecha_desde, fecha_hasta)
+    if cursor:
+        fecha, ultimo_id = cursor
+        stmt = stmt.where(or_(
+            Consulta.fecha_consulta < fecha,
+            and_(Consulta.fecha_consulta == fecha, Consulta.id < ultimo_id)
+        ))
+    stmt = stmt.order_by(Consulta.fecha_consulta.desc(), Consulta.id.desc())
+    if limit:
+        stmt = stmt.limit(limit)
+    return stmt
+
+def _select_total_consultas(**filtros):
+    return _filtros_consultas(select(func.count(Consulta.id)), **filtros)
+
+def list_consultas(db: Session, **filtros):
+    """Lista consultas filtradas; con cursor devuelve las anteriores a esa clave (keyset)"""
+    return db.execute(_select_consultas(**filtros)).scalars().all()
+
+async def list_consultas_async(db: AsyncSession, **filtros):
+    """Versión asíncrona de list_consultas"""
+    result = await db.execute(_select_consultas(**filtros))
+    return result.scalars().all()
+
+async def contar_consultas_async(db: AsyncSession, **filtros) -> int:
+    """Número de consultas que cumplen los filtros, sin cargarlas"""
+    return (await db.execute(_select_total_consultas(**filtros))).scalar_one()
 
 def get_consulta(db: Session, consulta_id: int):
     return db.query(Consulta).filter(Consulta.id == consulta_id).first()
@@ -84,6 +118,10 @@ def update_consulta(db: Session, consulta_id: int, payload: ConsultaUpdate):
     for field, value in update_data.items():
         setattr(consulta, field, value)
     
+    # Una edición puede cambiar el diagnóstico vigente: el resumen se recalcula
+    if "diagnostico" in update_data and consulta.paciente:
+        db.flush()
+        recalcular_resumen(db, consulta.paciente)
     db.commit()
     db.refresh(consulta)
     return consulta
@@ -0,0 +1,242 @@
+"""
+Índice en memoria de la agenda de los médicos
+Mantiene, por médico y por día, los intervalos ocupados ordenados por hora de inicio.
+Los días se cargan con una sola consulta por rango y se actualizan desde
+create_cita/update_cita/delete_cita, de modo que buscar huecos libres no
+requiere recorrer la tabla de citas. Los demás workers reciben el cambio por el
+backplane y descartan el día afectado, que vuelven a leer al consultarlo.
+"""
+import bisect
+import threading
+import time as _time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.dispatcher import dispatcher
+from app.core.websocket import manager
+from app.models.cita import Cita
+from app.models.medico import Medico
+
+# Estados que no ocupan el horario del médico
+ESTADOS_LIBERADOS = {"cancelada", "no_asistio"}
+
+Intervalo = Tuple[int, int, int]  # (inicio_min, fin_min, cita_id)
+
+
+def hora_a_minutos(hora: str) -> int:
+    """Convierte "09:30" en minutos desde medianoche"""
+    horas, minutos = hora.split(":")[:2]
+    return int(horas) * 60 + int(minutos)
+
+
+def minutos_a_hora(minutos: int) -> str:
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+def intervalo_de_cita(cita: Cita) -> Optional[Tuple[date, int, int]]:
+    """
+    Devuelve (día, inicio, fin) en minutos de una cita, o None si no ocupa agenda.
+    Sin hora_inicio se usa la hora de `fecha`; sin hora_fin, la duración por defecto.
+    """
+    if cita.medico_id is None or cita.fecha is None or cita.estado in ESTADOS_LIBERADOS:
+        return None
+    try:
+        inicio = hora_a_minutos(cita.hora_inicio) if cita.hora_inicio else \
+            cita.fecha.hour * 60 + cita.fecha.minute
+        fin = hora_a_minutos(cita.hora_fin) if cita.hora_fin else \
+            inicio + settings.DURACION_CITA_DEFECTO
+    except ValueError:
+        return None
+    return cita.fecha.date(), inicio, max(fin, inicio + 1)
+
+
+class IndiceAgenda:
+    """Intervalos ocupados por (medico_id, día), cargados bajo demanda"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (medico_id, día) -> intervalos ordenados por inicio
+        self._dias: Dict[Tuple[int, date], List[Intervalo]] = {}
+        # (medico_id, día) -> instante de carga (time.monotonic)
+        self._cargados: Dict[Tuple[int, date], float] = {}
+        # cita_id -> (medico_id, día) donde está indexada
+        self._por_cita: Dict[int, Tuple[int, date]] = {}
+
+    def _vigente(self, clave: Tuple[int, date], ahora: float) -> bool:
+        cargado = self._cargados.get(clave)
+        return cargado is not None and ahora - cargado < settings.DISPONIBILIDAD_INDICE_TTL
+
+    def _quitar(self, cita_id: int):
+        clave = self._por_cita.pop(cita_id, None)
+        if clave is None:
+            return
+        intervalos = self._dias.get(clave, [])
+        for i, intervalo in enumerate(intervalos):
+            if intervalo[2] == cita_id:
+                del intervalos[i]
+                break
+
+    def _insertar(self, cita: Cita):
+        datos = intervalo_de_cita(cita)
+        if datos is None:
+            return
+        dia, inicio, fin = datos
+        clave = (cita.medico_id, dia)
+        bisect.insort(self._dias.setdefault(clave, []), (inicio, fin, cita.id))
+        self._por_cita[cita.id] = clave
+
+    def asegurar_cargado(self, db: Session, medico_ids: Iterable[int], desde: date, hasta: date):
+        """
+        Carga con una única consulta los días de [desde, hasta] que no estén
+        indexados (o cuya carga haya expirado) para los médicos indicados
+        """
+        ahora = _time.monotonic()
+        dias = [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+        with self._lock:
+            faltantes: Set[Tuple[int, date]] = {
+                (medico_id, dia)
+                for medico_id in medico_ids
+                for dia in dias
+                if not self._vigente((medico_id, dia), ahora)
+            }
+        if not faltantes:
+            return
+
+        primero = min(dia for _, dia in faltantes)
+        ultimo = max(dia for _, dia in faltantes)
+        citas = db.query(Cita).filter(
+            Cita.medico_id.in_({medico_id for medico_id, _ in faltantes}),
+            Cita.fecha >= datetime.combine(primero, datetime.min.time()),
+            Cita.fecha < datetime.combine(ultimo + timedelta(days=1), datetime.min.time()),
+        ).all()
+
+        with self._lock:
+            for clave in faltantes:
+                for intervalo in self._dias.pop(clave, []):
+                    self._por_cita.pop(intervalo[2], None)
+                self._dias[clave] = []
+                self._cargados[clave] = ahora
+            for cita in citas:
+                if (cita.medico_id, cita.fecha.date()) in faltantes:
+                    self._quitar(cita.id)
+                    self._insertar(cita)
+
+    def registrar(self, cita: Cita):
+        """Indexa (o reindexa) una cita creada o modificada"""
+        datos = intervalo_de_cita(cita)
+        with self._lock:
+            self._quitar(cita.id)
+            # Los días no cargados se leerán completos de la base de datos
+            if datos and (cita.medico_id, datos[0]) in self._cargados:
+                self._insertar(cita)
+        dispatcher.invalidar("agenda", {
+            "cita_id": cita.id,
+            "medico_id": cita.medico_id,
+            "dia": datos[0].isoformat() if datos else None
+        })
+
+    def remover(self, cita_id: int):
+        """Quita una cita eliminada del índice"""
+        with self._lock:
+            self._quitar(cita_id)
+        dispatcher.invalidar("agenda", {"cita_id": cita_id})
+
+    def aplicar_invalidacion(self, datos: dict):
+        """Cambio de otro worker: quita la cita y descarta su día nuevo para releerlo"""
+        with self._lock:
+            self._quitar(datos["cita_id"])
+            if datos.get("dia"):
+                clave = (datos["medico_id"], date.fromisoformat(datos["dia"]))
+                self._cargados.pop(clave, None)
+                for intervalo in self._dias.pop(clave, []):
+                    self._por_cita.pop(intervalo[2], None)
+
+    def ocupados(self, medico_id: int, dia: date) -> List[Intervalo]:
+        with self._lock:
+            return list(self._dias.get((medico_id, dia), []))
+
+    def huecos(self, medico_id: int, dia: date, duracion: int) -> List[Tuple[int, int]]:
+        """Huecos libres de `duracion` minutos dentro de la jornada laboral"""
+        jornada_inicio = hora_a_minutos(settings.JORNADA_INICIO)
+        jornada_fin = hora_a_minutos(settings.JORNADA_FIN)
+        ahora = datetime.now()
+        if dia < ahora.date():
+            return []
+        cursor = jornada_inicio
+        if dia == ahora.date():
+            # Hoy solo se ofrecen huecos futuros, alineados a la rejilla de la jornada
+            transcurridos = ahora.hour * 60 + ahora.minute - jornada_inicio
+            if transcurridos > 0:
+                cursor += -(-transcurridos // duracion) * duracion
+
+        libres = []
+        for inicio, fin, _ in self.ocupados(medico_id, dia) + [(jornada_fin, jornada_fin, 0)]:
+            while cursor + duracion <= min(inicio, jornada_fin):
+                libres.append((cursor, cursor + duracion))
+                cursor += duracion
+            cursor = max(cursor, fin)
+        return libres
+
+
+# Instancia global del índice
+indice_agenda = IndiceAgenda()
+manager.al_invalidar("agenda", indice_agenda.aplicar_invalidacion)
+
+
+def _slot(medico_id: int, dia: date, inicio: int, fin: int) -> dict:
+    return {
+        "medico_id": medico_id,
+        "fecha": dia,
+        "hora_inicio": minutos_a_hora(inicio),
+        "hora_fin": minutos_a_hora(fin),
+    }
+
+
+def disponibilidad_medico(db: Session, medico_id: int, desde: date, hasta: date, duracion: int) -> List[dict]:
+    """Huecos libres de un médico entre dos fechas (inclusive)"""
+    indice_agenda.asegurar_cargado(db, [medico_id], desde, hasta)
+    slots = []
+    dia = desde
+    while dia <= hasta:
+        slots.extend(_slot(medico_id, dia, i, f) for i, f in indice_agenda.huecos(medico_id, dia, duracion))
+        dia += timedelta(days=1)
+    return slots
+
+
+def proximos_slots(
+    db: Session,
+    especialidad: Optional[str],
+    desde: date,
+    duracion: int,
+    cantidad: int,
+    horizonte_dias: int
+) -> List[dict]:
+    """
+    Próximos `cantidad` huecos libres entre todos los médicos de una especialidad,
+    ordenados por fecha y hora
+    """
+    query = db.query(Medico.id)
+    if especialidad:
+        query = query.filter(Medico.especialidad == especialidad)
+    medico_ids = [medico_id for (medico_id,) in query.all()]
+    if not medico_ids:
+        return []
+
+    hasta = desde + timedelta(days=horizonte_dias - 1)
+    indice_agenda.asegurar_cargado(db, medico_ids, desde, hasta)
+
+    slots = []
+    dia = desde
+    while dia <= hasta and len(slots) < cantidad:
+        del_dia = [
+            (inicio, medico_id, fin)
+            for medico_id in medico_ids
+            for inicio, fin in indice_agenda.huecos(medico_id, dia, duracion)
+        ]
+        del_dia.sort()
+        slots.extend(_slot(medico_id, dia, inicio, fin) for inicio, medico_id, fin in del_dia[:cantidad - len(slots)])
+        dia += timedelta(days=1)
+    return slots
@@ -1,7 +1,10 @@
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.models.empleado import Empleado
 from app.schemas.empleado_schema import EmpleadoCreate, EmpleadoUpdate
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash
+from app.core.login_pool import pool_hash
+from app.core.token_cache import cache_tokens
 
 def create_empleado(db: Session, payload: EmpleadoCreate):
     empleado = Empleado(
@@ -27,11 +30,15 @@ def update_empleado(db: Session, empleado_id: int, payload: EmpleadoUpdate):
     empleado = get_empleado(db, empleado_id)
     if not empleado:
         return None
+    cargo_anterior = empleado.cargo
     for field, value in payload.dict(exclude_unset=True).items():
         setattr(empleado, field, value)
     db.add(empleado)
     db.commit()
     db.refresh(empleado)
+    # El cargo viaja en el token: los emitidos con el cargo anterior dejan de valer
+    if empleado.cargo != cargo_anterior:
+        cache_tokens.revocar_usuario(empleado.id)
     return empleado
 
 def delete_empleado(db: Session, empleado_id: int):
@@ -40,16 +47,33 @@ def delete_empleado(db: Session, empleado_id: int):
         return None
     db.delete(empleado)
     db.commit()
+    cache_tokens.revocar_usuario(empleado_id)
     return True
 
-def authenticate_empleado(db: Session, email: str, password: str):
+def get_empleado_por_email(db: Session, email: str):
+    return db.query(Empleado).filter(Empleado.email == email).first()
+
+def guardar_hash(db: Session, empleado: Empleado, hashed_password: str):
+    empleado.hashed_password = hashed_password
+    db.commit()
+    db.refresh(empleado)
+
+async def authenticate_empleado(db: Session, email: str, password: str):
+    """
+    Verifica las credenciales en el pool de procesos de login.
+    Si el hash tiene un costo desactualizado se reemplaza en el mismo inicio de sesión.
+    Lanza PoolHashSaturadoError si hay demasiadas verificaciones en curso.
+    """
     if not email:
         return None
-    empleado = db.query(Empleado).filter(Empleado.email == email).first()
+    empleado = await run_in_threadpool(get_empleado_por_email, db, email)
     if not empleado:
         return None
     if not empleado.hashed_password:
         return None
-    if not verify_password(password, empleado.hashed_password):
+    valida, nuevo_hash = await pool_hash.verificar(password, empleado.hashed_password)
+    if not valida:
         return None
+    if nuevo_hash:
+        await run_in_threadpool(guardar_hash, db, empleado, nuevo_hash)
     return empleado
@@ -0,0 +1,103 @@
+"""
+Exportación masiva de consultas, citas y recetas
+Las filas se leen como tuplas de columnas (sin objetos ORM ni pydantic) con un
+cursor del lado del servidor y se entregan por lotes de `yield_per`, de modo que
+la memoria del worker no depende del tamaño del rango exportado.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Iterator, Optional
+
+from sqlalchemy import select
+
+from app.core.database import SessionLocal
+from app.models.cita import Cita
+from app.models.consulta import Consulta
+from app.models.receta import Receta
+
+FORMATOS = ("ndjson", "csv")
+TIPOS_CONTENIDO = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Filas por lote leídas del cursor y escritas en cada fragmento de la respuesta
+LOTE_EXPORTACION = 1000
+
+# Entidad -> (modelo, columna de fecha del rango, columnas exportadas)
+ENTIDADES = {
+    "consultas": (Consulta, Consulta.fecha_consulta, (
+        Consulta.id, Consulta.fecha_consulta, Consulta.paciente_id, Consulta.medico_id,
+        Consulta.cita_id, Consulta.historia_id, Consulta.motivo_consulta, Consulta.diagnostico,
+        Consulta.diagnosticos_secundarios, Consulta.tratamiento, Consulta.indicaciones,
+        Consulta.examenes_solicitados, Consulta.pronostico, Consulta.signos_vitales,
+    )),
+    "citas": (Cita, Cita.fecha, (
+        Cita.id, Cita.fecha, Cita.hora_inicio, Cita.hora_fin, Cita.paciente_id, Cita.medico_id,
+        Cita.estado, Cita.tipo_cita, Cita.motivo, Cita.sala_asignada, Cita.observaciones_cancelacion,
+    )),
+    "recetas": (Receta, Receta.fecha_emision, (
+        Receta.id, Receta.fecha_emision, Receta.paciente_id, Receta.medico_id, Receta.consulta_id,
+        Receta.medicamentos, Receta.indicaciones, Receta.estado, Receta.dispensada_por,
+        Receta.fecha_dispensacion,
+    )),
+}
+
+
+def _valor(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return valor
+
+
+def _celda(valor):
+    """Valor de una celda CSV: JSON para estructuras, vacío para NULL"""
+    if valor is None:
+        return ""
+    if isinstance(valor, (dict, list)):
+        return json.dumps(valor, ensure_ascii=False)
+    return _valor(valor)
+
+
+def exportar(
+    entidad: str,
+    formato: str,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None
+) -> Iterator[str]:
+    """
+    Generador con los fragmentos del archivo exportado, un fragmento por lote.
+    Abre su propia sesión: la respuesta se sigue enviando después de que la ruta retorna.
+    """
+    _, columna_fecha, columnas = ENTIDADES[entidad]
+    nombres = [c.key for c in columnas]
+
+    stmt = select(*columnas).order_by(columna_fecha, columnas[0])
+    if desde:
+        stmt = stmt.where(columna_fecha >= desde)
+    if hasta:
+        stmt = stmt.where(columna_fecha < hasta)
+    stmt = stmt.execution_options(stream_results=True, yield_per=LOTE_EXPORTACION)
+
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    if formato == "csv":
+        escritor.writerow(nombres)
+
+    db = SessionLocal()
+    try:
+        resultado = db.execute(stmt)
+        for lote in resultado.partitions():
+            if formato == "csv":
+                escritor.writerows([_celda(v) for v in fila] for fila in lote)
+            else:
+                for fila in lote:
+                    buffer.write(json.dumps(dict(zip(nombres, map(_valor, fila))), ensure_ascii=False))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            # Solo la cabecera CSV de una exportación vacía
+            yield buffer.getvalue()
+    finally:
+        db.close()
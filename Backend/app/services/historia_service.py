@@ -1,7 +1,19 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+from datetime import datetime
+from typing import Optional
 from app.models.historia import Historia
+from app.models.resumen_historia import ResumenHistoria
+from app.models.paciente import Paciente
+from app.models.consulta import Consulta
+from app.models.receta import Receta
 from app.schemas.historia_schema import HistoriaCreate
 
+# Diagnósticos distintos más recientes que se conservan en el resumen
+MAX_DIAGNOSTICOS = 10
+# Estados en los que una receta sigue vigente
+ESTADOS_VIGENTES = ("pendiente", "parcial")
+
 def create_historia(db: Session, payload: HistoriaCreate):
     h = Historia(identificador=payload.identificador)
     db.add(h)
@@ -14,3 +26,141 @@ def list_historias(db: Session):
 
 def get_historia(db: Session, historia_id: int):
     return db.query(Historia).filter(Historia.id == historia_id).first()
+
+def get_historia_con_resumen(db: Session, historia_id: int):
+    """
+    Historia junto a su paciente y su resumen en una sola lectura.
+    Las historias anteriores al resumen lo calculan la primera vez que se abren.
+    """
+    historia = (
+        db.query(Historia)
+        .options(joinedload(Historia.resumen), joinedload(Historia.paciente))
+        .filter(Historia.id == historia_id)
+        .first()
+    )
+    if historia and historia.resumen is None and historia.paciente is not None:
+        recalcular_resumen(db, historia.paciente)
+        db.commit()
+        db.refresh(historia)
+    return historia
+
+def obtener_o_crear_historia(db: Session, paciente: Paciente) -> Historia:
+    """Historia clínica del paciente; la crea y la enlaza si aún no tiene"""
+    if paciente.historia_id:
+        return paciente.historia
+    historia = Historia(identificador=f"HC-{paciente.id:06d}")
+    db.add(historia)
+    db.flush()
+    paciente.historia_id = historia.id
+    return historia
+
+def asegurar_resumen(db: Session, paciente_id: int, paciente: Optional[Paciente] = None) -> ResumenHistoria:
+    """
+    Resumen del paciente bloqueado para actualizar (SELECT ... FOR UPDATE), de modo
+    que dos escrituras concurrentes sobre el mismo paciente no pierdan contadores.
+    Debe llamarse antes de añadir la consulta o receta nueva a la sesión: si el
+    resumen no existe se calcula a partir de lo ya guardado.
+    """
+    resumen = (
+        db.query(ResumenHistoria)
+        .filter(ResumenHistoria.paciente_id == paciente_id)
+        .with_for_update()
+        .first()
+    )
+    if resumen is None:
+        if paciente is None:
+            paciente = db.query(Paciente).filter(Paciente.id == paciente_id).first()
+        resumen = recalcular_resumen(db, paciente)
+    return resumen
+
+def recalcular_resumen(db: Session, paciente: Paciente) -> ResumenHistoria:
+    """Reconstruye el resumen recorriendo consultas y recetas del paciente"""
+    historia = obtener_o_crear_historia(db, paciente)
+    resumen = historia.resumen
+    if resumen is None:
+        resumen = ResumenHistoria(historia_id=historia.id, paciente_id=paciente.id)
+        db.add(resumen)
+
+    total_consultas, ultima_consulta = (
+        db.query(func.count(Consulta.id), func.max(Consulta.fecha_consulta))
+        .filter(Consulta.paciente_id == paciente.id)
+        .one()
+    )
+    ultima_con_signos = (
+        db.query(Consulta.signos_vitales, Consulta.fecha_consulta)
+        .filter(Consulta.paciente_id == paciente.id, Consulta.signos_vitales.isnot(None))
+        .order_by(Consulta.fecha_consulta.desc(), Consulta.id.desc())
+        .first()
+    )
+    diagnosticos = []
+    filas = (
+        db.query(Consulta.id, Consulta.diagnostico, Consulta.fecha_consulta)
+        .filter(Consulta.paciente_id == paciente.id, Consulta.diagnostico.isnot(None))
+        .order_by(Consulta.fecha_consulta.desc(), Consulta.id.desc())
+    )
+    for consulta_id, diagnostico, fecha in filas.yield_per(100):
+        diagnosticos = _agregar_diagnostico(diagnosticos, diagnostico, fecha, consulta_id, al_final=True)
+        if len(diagnosticos) >= MAX_DIAGNOSTICOS:
+            break
+    recetas = (
+        db.query(Receta)
+        .filter(Receta.paciente_id == paciente.id)
+        .order_by(Receta.fecha_emision.desc(), Receta.id.desc())
+        .all()
+    )
+
+    resumen.total_consultas = total_consultas
+    resumen.ultima_consulta = ultima_consulta
+    resumen.ultimos_signos, resumen.fecha_ultimos_signos = ultima_con_signos or (None, None)
+    resumen.diagnosticos_activos = diagnosticos
+    resumen.total_recetas = len(recetas)
+    resumen.recetas_vigentes = [_receta_vigente(r) for r in recetas if r.estado in ESTADOS_VIGENTES]
+    resumen.alergias = paciente.alergias
+    resumen.actualizado_en = datetime.utcnow()
+    db.flush()
+    return resumen
+
+def registrar_consulta(resumen: ResumenHistoria, consulta: Consulta):
+    """Aplica una consulta nueva (ya con id y fecha) al resumen"""
+    resumen.total_consultas = (resumen.total_consultas or 0) + 1
+    if resumen.ultima_consulta is None or consulta.fecha_consulta >= resumen.ultima_consulta:
+        resumen.ultima_consulta = consulta.fecha_consulta
+    if consulta.signos_vitales:
+        resumen.ultimos_signos = consulta.signos_vitales
+        resumen.fecha_ultimos_signos = consulta.fecha_consulta
+    if consulta.diagnostico:
+        resumen.diagnosticos_activos = _agregar_diagnostico(
+            resumen.diagnosticos_activos or [], consulta.diagnostico, consulta.fecha_consulta, consulta.id
+        )[:MAX_DIAGNOSTICOS]
+    resumen.actualizado_en = datetime.utcnow()
+
+def registrar_receta(resumen: ResumenHistoria, receta: Receta):
+    """Aplica una receta nueva (ya con id y fecha) al resumen"""
+    resumen.total_recetas = (resumen.total_recetas or 0) + 1
+    actualizar_receta(resumen, receta)
+
+def actualizar_receta(resumen: ResumenHistoria, receta: Receta):
+    """Refleja el estado actual de una receta en la lista de vigentes"""
+    vigentes = [r for r in (resumen.recetas_vigentes or []) if r["receta_id"] != receta.id]
+    if receta.estado in ESTADOS_VIGENTES:
+        vigentes.insert(0, _receta_vigente(receta))
+        vigentes.sort(key=lambda r: (r["fecha"], r["receta_id"]), reverse=True)
+    # Se asigna una lista nueva para que SQLAlchemy detecte el cambio en la columna JSON
+    resumen.recetas_vigentes = vigentes
+    resumen.actualizado_en = datetime.utcnow()
+
+def _agregar_diagnostico(diagnosticos: list, diagnostico: str, fecha: datetime, consulta_id: int, al_final: bool = False) -> list:
+    """Lista nueva con el diagnóstico añadido si no estaba (sin distinguir mayúsculas)"""
+    clave = diagnostico.strip().lower()
+    if any(d["diagnostico"].strip().lower() == clave for d in diagnosticos):
+        return diagnosticos
+    entrada = {"diagnostico": diagnostico, "fecha": fecha.isoformat(), "consulta_id": consulta_id}
+    return diagnosticos + [entrada] if al_final else [entrada] + diagnosticos
+
+def _receta_vigente(receta: Receta) -> dict:
+    return {
+        "receta_id": receta.id,
+        "medicamentos": receta.medicamentos,
+        "fecha": receta.fecha_emision.isoformat(),
+        "estado": receta.estado,
+    }
@@ -0,0 +1,294 @@
+"""
+Importación masiva de pacientes desde CSV o NDJSON
+El archivo se lee fila a fila (sin cargarlo entero), cada fila se valida con
+PacienteCreate y las válidas se guardan por lotes: una consulta para detectar
+las cédulas y emails existentes, un INSERT masivo para las nuevas, un UPDATE
+masivo para las existentes y un commit por lote. Si una cédula se repite en
+el archivo vale la primera fila y las siguientes se informan como error,
+estén o no en el mismo lote. La importación corre en un
+hilo aparte y su progreso se consulta por id.
+"""
+import csv
+import io
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.models.paciente import Paciente
+from app.models.resumen_historia import ResumenHistoria
+from app.schemas.paciente_schema import PacienteCreate
+from app.services.busqueda_service import indice_pacientes
+from app.utils.logger import logger
+
+FORMATOS_IMPORTACION = ("csv", "ndjson")
+LOTE_IMPORTACION = 2000
+# Errores por fila que se conservan para el informe (el total se cuenta siempre)
+MAX_ERRORES_DETALLADOS = 1000
+# Importaciones terminadas que se recuerdan para consultar su resultado
+MAX_IMPORTACIONES = 20
+
+
+class Importacion:
+    """Estado y progreso de una importación; thread-safe"""
+
+    def __init__(self, archivo: Optional[str]):
+        self.id = uuid.uuid4().hex
+        self.archivo = archivo
+        self.estado = "en_curso"  # en_curso, completada, fallida
+        self.filas = 0
+        self.creados = 0
+        self.actualizados = 0
+        self.errores = 0
+        self.detalle_errores: List[dict] = []
+        self.iniciada_en = datetime.utcnow()
+        self.finalizada_en: Optional[datetime] = None
+        self.mensaje: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def error(self, fila: int, mensaje: str):
+        with self._lock:
+            self.errores += 1
+            if len(self.detalle_errores) < MAX_ERRORES_DETALLADOS:
+                self.detalle_errores.append({"fila": fila, "error": mensaje})
+
+    def avanzar(self, filas: int, creados: int, actualizados: int):
+        with self._lock:
+            self.filas += filas
+            self.creados += creados
+            self.actualizados += actualizados
+
+    def terminar(self, estado: str, mensaje: Optional[str] = None):
+        with self._lock:
+            self.estado = estado
+            self.mensaje = mensaje
+            self.finalizada_en = datetime.utcnow()
+
+    def resumen(self) -> dict:
+        with self._lock:
+            fin = self.finalizada_en or datetime.utcnow()
+            return {
+                "id": self.id,
+                "archivo": self.archivo,
+                "estado": self.estado,
+                "filas": self.filas,
+                "creados": self.creados,
+                "actualizados": self.actualizados,
+                "errores": self.errores,
+                "detalle_errores": list(self.detalle_errores),
+                "segundos": round((fin - self.iniciada_en).total_seconds(), 2),
+                "mensaje": self.mensaje,
+            }
+
+
+class RegistroImportaciones:
+    """Importaciones recientes por id (en memoria del proceso)"""
+
+    def __init__(self, capacidad: int):
+        self.capacidad = capacidad
+        self._lock = threading.Lock()
+        self._importaciones: "OrderedDict[str, Importacion]" = OrderedDict()
+
+    def nueva(self, archivo: Optional[str]) -> Importacion:
+        importacion = Importacion(archivo)
+        with self._lock:
+            self._importaciones[importacion.id] = importacion
+            while len(self._importaciones) > self.capacidad:
+                antigua = next(iter(self._importaciones))
+                if self._importaciones[antigua].estado == "en_curso":
+                    break
+                del self._importaciones[antigua]
+        return importacion
+
+    def obtener(self, importacion_id: str) -> Optional[Importacion]:
+        with self._lock:
+            return self._importaciones.get(importacion_id)
+
+
+# Instancia global del registro
+importaciones = RegistroImportaciones(MAX_IMPORTACIONES)
+
+
+def _limpiar(fila: dict) -> dict:
+    """Descarta columnas vacías para que no sobrescriban datos al actualizar"""
+    limpia = {}
+    for campo, valor in fila.items():
+        if campo is None:
+            continue
+        if isinstance(valor, str):
+            valor = valor.strip()
+        if valor not in ("", None):
+            limpia[campo.strip()] = valor
+    return limpia
+
+
+def leer_filas(archivo: BinaryIO, formato: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """(número de fila, datos, error de lectura) de cada fila del archivo, en streaming"""
+    texto = io.TextIOWrapper(archivo, encoding="utf-8-sig", newline="")
+    if formato == "csv":
+        # La fila 1 es la cabecera
+        for numero, fila in enumerate(csv.DictReader(texto), start=2):
+            yield numero, _limpiar(fila), None
+        return
+    for numero, linea in enumerate(texto, start=1):
+        if not linea.strip():
+            continue
+        try:
+            datos = json.loads(linea)
+        except ValueError as e:
+            yield numero, None, f"JSON inválido: {e}"
+            continue
+        if not isinstance(datos, dict):
+            yield numero, None, "Se esperaba un objeto JSON por línea"
+            continue
+        yield numero, _limpiar(datos), None
+
+
+def _mensaje_validacion(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+
+
+def _guardar_lote(
+    db: Session,
+    lote: List[Tuple[int, PacienteCreate]],
+    importacion: Importacion,
+    vistas: Dict[int, int]
+):
+    """
+    Inserta o actualiza un lote de pacientes válidos con un solo commit.
+    `vistas` lleva la primera fila de cada cédula ya procesada en el archivo
+    (en este lote o en los anteriores): solo esa fila se guarda.
+    """
+    por_cedula: Dict[int, Tuple[int, PacienteCreate]] = {}
+    for numero, paciente in lote:
+        primera = vistas.setdefault(paciente.cedula, numero)
+        if primera != numero:
+            importacion.error(numero, f"Cédula {paciente.cedula} repetida; ya aparece en la fila {primera}")
+            continue
+        por_cedula[paciente.cedula] = (numero, paciente)
+
+    existentes = dict(
+        db.query(Paciente.cedula, Paciente.id).filter(Paciente.cedula.in_(list(por_cedula)))
+    )
+    emails = [p.email for _, p in por_cedula.values() if p.email]
+    duenos_email = dict(
+        db.query(Paciente.email, Paciente.cedula).filter(Paciente.email.in_(emails))
+    ) if emails else {}
+
+    nuevos, actualizaciones = [], []
+    for numero, paciente in por_cedula.values():
+        # Las filas nuevas llevan todas las columnas, con NULL explícito (render_nulls),
+        # para que el lote sea un solo executemany; las existentes solo las del archivo
+        datos = paciente.dict(exclude_unset=paciente.cedula in existentes)
+        if paciente.email:
+            dueno = duenos_email.get(paciente.email)
+            if dueno is not None and dueno != paciente.cedula:
+                importacion.error(numero, f"El email {paciente.email} pertenece a otro paciente")
+                continue
+            duenos_email[paciente.email] = paciente.cedula
+        if paciente.cedula in existentes:
+            datos["id"] = existentes[paciente.cedula]
+            actualizaciones.append((numero, datos))
+        else:
+            nuevos.append((numero, datos))
+
+    # bulk_update_mappings agrupa en un executemany las filas consecutivas con las mismas columnas
+    actualizaciones.sort(key=lambda fila: sorted(fila[1]))
+    try:
+        db.bulk_insert_mappings(Paciente, [datos for _, datos in nuevos], render_nulls=True)
+        db.bulk_update_mappings(Paciente, [datos for _, datos in actualizaciones])
+        _sincronizar_alergias(db, actualizaciones)
+        db.commit()
+    except IntegrityError:
+        # Otro proceso escribió las mismas cédulas o emails: fila a fila para aislar el conflicto
+        db.rollback()
+        nuevos, actualizaciones = _guardar_fila_a_fila(db, nuevos, actualizaciones, importacion)
+    importacion.avanzar(len(lote), len(nuevos), len(actualizaciones))
+
+
+def _sincronizar_alergias(db: Session, actualizaciones: list):
+    """Copia las alergias importadas al resumen de la historia, como update_paciente"""
+    alergias = {datos["id"]: datos["alergias"] for _, datos in actualizaciones if "alergias" in datos}
+    if not alergias:
+        return
+    resumenes = db.query(ResumenHistoria.id, ResumenHistoria.paciente_id).filter(
+        ResumenHistoria.paciente_id.in_(list(alergias))
+    )
+    db.bulk_update_mappings(
+        ResumenHistoria,
+        [{"id": resumen_id, "alergias": alergias[paciente_id]} for resumen_id, paciente_id in resumenes]
+    )
+
+
+def _guardar_fila_a_fila(db: Session, nuevos: list, actualizaciones: list, importacion: Importacion):
+    guardados = ([], [])
+    for destino, filas, metodo in ((guardados[0], nuevos, db.bulk_insert_mappings),
+                                   (guardados[1], actualizaciones, db.bulk_update_mappings)):
+        for numero, datos in filas:
+            try:
+                with db.begin_nested():
+                    metodo(Paciente, [datos])
+                destino.append((numero, datos))
+            except IntegrityError as e:
+                importacion.error(numero, f"Cédula o email duplicado: {e.orig}")
+    _sincronizar_alergias(db, guardados[1])
+    db.commit()
+    return guardados
+
+
+def importar_pacientes(archivo: BinaryIO, formato: str, importacion: Importacion):
+    """Procesa el archivo completo actualizando el progreso de `importacion`"""
+    db = SessionLocal()
+    lote: List[Tuple[int, PacienteCreate]] = []
+    vistas: Dict[int, int] = {}
+    invalidas = 0
+    try:
+        for numero, datos, error in leer_filas(archivo, formato):
+            if error is None:
+                try:
+                    lote.append((numero, PacienteCreate(**datos)))
+                except ValidationError as e:
+                    error = _mensaje_validacion(e)
+            if error is not None:
+                importacion.error(numero, error)
+                invalidas += 1
+            if len(lote) >= LOTE_IMPORTACION:
+                _guardar_lote(db, lote, importacion, vistas)
+                importacion.avanzar(invalidas, 0, 0)
+                lote, invalidas = [], 0
+        if lote:
+            _guardar_lote(db, lote, importacion, vistas)
+        importacion.avanzar(invalidas, 0, 0)
+        importacion.terminar("completada")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error importando pacientes ({importacion.id}): {e}")
+        importacion.terminar("fallida", str(e))
+    finally:
+        db.close()
+
+    resumen = importacion.resumen()
+    logger.info(
+        f"Importación {importacion.id}: {resumen['filas']} filas, {resumen['creados']} creados, "
+        f"{resumen['actualizados']} actualizados, {resumen['errores']} errores en {resumen['segundos']}s"
+    )
+    # Un lote grande se indexa más rápido reconstruyendo el índice que paciente a paciente
+    if resumen["creados"] or resumen["actualizados"]:
+        indice_pacientes.cargar_en_segundo_plano()
+
+
+def importar_en_segundo_plano(ruta: str, formato: str, importacion: Importacion):
+    """Importa desde un archivo temporal y lo elimina al terminar"""
+    try:
+        with open(ruta, "rb") as archivo:
+            importar_pacientes(archivo, formato, importacion)
+    finally:
+        os.remove(ruta)
@@ -1,7 +1,10 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models.medicamento import Medicamento
 from app.models.farmacia import Farmacia
 from app.schemas.medicamento_schema import MedicamentoCreate
+from app.services.notificacion_service import invalidar_contadores
 
 def create_medicamento(db: Session, payload: MedicamentoCreate):
     # Si no se proporciona farmacia_id, intentar obtener la primera farmacia disponible
@@ -20,10 +23,15 @@ def create_medicamento(db: Session, payload: MedicamentoCreate):
     db.add(m)
     db.commit()
     db.refresh(m)
+    invalidar_contadores()
     return m
 
 def list_medicamentos(db: Session):
     return db.query(Medicamento).all()
 
+async def list_medicamentos_async(db: AsyncSession):
+    result = await db.execute(select(Medicamento))
+    return result.scalars().all()
+
 def get_medicamento(db: Session, med_id: int):
     return db.query(Medicamento).filter(Medicamento.id == med_id).first()
@@ -1,7 +1,36 @@
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models.medico import Medico
 from app.models.empleado import Empleado
 from app.schemas.medico_schema import MedicoCreate, MedicoUpdate
+from app.core.principal import cache_principales, SIN_ENTRADA
+
+def _identidad(fila) -> Optional[dict]:
+    return {"medico_id": fila[0], "especialidad": fila[1]} if fila else None
+
+def _select_identidad(empleado_id: int):
+    return select(Medico.id, Medico.especialidad).where(Medico.empleado_id == empleado_id).limit(1)
+
+def resolver_medico(db: Session, empleado_id: int) -> Optional[dict]:
+    """
+    Identidad de médico (medico_id, especialidad) del empleado, o None si no es médico.
+    Se consulta la base de datos solo la primera vez o tras una invalidación.
+    """
+    medico = cache_principales.obtener(empleado_id)
+    if medico is SIN_ENTRADA:
+        medico = _identidad(db.execute(_select_identidad(empleado_id)).first())
+        cache_principales.guardar(empleado_id, medico)
+    return medico
+
+async def resolver_medico_async(db: AsyncSession, empleado_id: int) -> Optional[dict]:
+    """Versión asíncrona de resolver_medico"""
+    medico = cache_principales.obtener(empleado_id)
+    if medico is SIN_ENTRADA:
+        medico = _identidad((await db.execute(_select_identidad(empleado_id))).first())
+        cache_principales.guardar(empleado_id, medico)
+    return medico
 
 def list_medicos(db: Session):
     """Listar todos los médicos del sistema"""
@@ -26,6 +55,7 @@ def create_medico(db: Session, medico_data: MedicoCreate):
     db.add(medico)
     db.commit()
     db.refresh(medico)
+    cache_principales.invalidar(medico.empleado_id)
     return medico
 
 def update_medico(db: Session, medico_id: int, medico_data: MedicoUpdate):
@@ -35,12 +65,15 @@ def update_medico(db: Session, medico_id: int, medico_data: MedicoUpdate):
         return None
     
     # Actualizar solo los campos proporcionados
+    empleado_anterior = medico.empleado_id
     update_data = medico_data.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(medico, key, value)
     
     db.commit()
     db.refresh(medico)
+    # El vínculo o la especialidad pudieron cambiar: resolver de nuevo en la próxima petición
+    cache_principales.invalidar(empleado_anterior, medico.empleado_id)
     return medico
 
 def delete_medico(db: Session, medico_id: int):
@@ -49,8 +82,10 @@ def delete_medico(db: Session, medico_id: int):
     if not medico:
         return False
     
+    empleado_id = medico.empleado_id
     db.delete(medico)
     db.commit()
+    cache_principales.invalidar(empleado_id)
     return True
 
 def list_medicos_empleados(db: Session):
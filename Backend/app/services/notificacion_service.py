@@ -0,0 +1,151 @@
+"""
+Contadores de notificaciones por rol
+Reemplaza el conteo en el navegador (descargar listas completas y usar .length)
+por consultas COUNT en la base de datos, cacheadas por un TTL corto.
+"""
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.dispatcher import dispatcher
+from app.core.websocket import manager, notificar_contadores
+from app.models.cita import Cita
+from app.models.medicamento import Medicamento
+from app.models.receta import Receta
+from app.services.medico_service import resolver_medico
+from app.utils.logger import logger
+
+# (cargo, empleado_id | None) -> (expira_en, contadores)
+_cache: Dict[Tuple[str, Optional[int]], Tuple[float, dict]] = {}
+_cache_lock = threading.Lock()
+
+
+def _scope(cargo: str, empleado_id: int) -> Tuple[str, Optional[int]]:
+    """Los médicos ven contadores propios; el resto de roles comparte los del rol"""
+    return (cargo, empleado_id if cargo == "Medico" else None)
+
+
+def _contar_citas_hoy(db: Session, estado: str, medico_id: Optional[int] = None) -> int:
+    hoy = datetime.combine(datetime.now().date(), datetime.min.time())
+    query = db.query(func.count(Cita.id)).filter(
+        Cita.estado == estado,
+        Cita.fecha >= hoy,
+        Cita.fecha < hoy + timedelta(days=1)
+    )
+    if medico_id is not None:
+        query = query.filter(Cita.medico_id == medico_id)
+    return query.scalar() or 0
+
+
+def _calcular_contadores(db: Session, cargo: str, empleado_id: Optional[int]) -> dict:
+    contadores = {}
+
+    if cargo in ("Enfermera", "Administrador"):
+        # Pacientes con cita confirmada hoy esperando signos vitales
+        contadores["citas_en_espera"] = _contar_citas_hoy(db, "confirmada")
+
+    if cargo == "Medico":
+        medico = resolver_medico(db, empleado_id)
+        medico_id = medico["medico_id"] if medico else None
+        contadores["pacientes_listos"] = (
+            _contar_citas_hoy(db, "en_consulta", medico_id) if medico_id else 0
+        )
+    elif cargo == "Administrador":
+        contadores["pacientes_listos"] = _contar_citas_hoy(db, "en_consulta")
+
+    if cargo in ("Farmaceutico", "Administrador"):
+        contadores["recetas_pendientes"] = db.query(func.count(Receta.id)).filter(
+            Receta.estado == "pendiente"
+        ).scalar() or 0
+        contadores["medicamentos_agotados"] = db.query(func.count(Medicamento.id)).filter(
+            Medicamento.stock == 0
+        ).scalar() or 0
+
+    contadores["total"] = sum(contadores.values())
+    return contadores
+
+
+def obtener_contadores(db: Session, cargo: str, empleado_id: int) -> dict:
+    """
+    Devuelve los contadores del usuario, recalculándolos solo si la entrada
+    cacheada para su rol (o su médico) ha expirado
+    """
+    clave = _scope(cargo, empleado_id)
+    ahora = time.monotonic()
+    with _cache_lock:
+        entrada = _cache.get(clave)
+        if entrada and entrada[0] > ahora:
+            return entrada[1]
+
+    contadores = _calcular_contadores(db, cargo, clave[1])
+    with _cache_lock:
+        _cache[clave] = (ahora + settings.NOTIFICACIONES_CACHE_TTL, contadores)
+    return contadores
+
+
+def invalidar_contadores():
+    """Descarta los contadores cacheados tras una escritura que los afecta, en todos los workers"""
+    _vaciar_cache()
+    dispatcher.invalidar("contadores", {})
+
+
+def _vaciar_cache(datos: dict = None):
+    with _cache_lock:
+        _cache.clear()
+
+
+manager.al_invalidar("contadores", _vaciar_cache)
+
+
+# Último valor enviado por WebSocket a cada usuario: user_id -> contadores
+_ultimos_enviados: Dict[int, dict] = {}
+
+
+def _contadores_por_scope(scopes: Dict[Tuple[str, Optional[int]], int]) -> dict:
+    db = SessionLocal()
+    try:
+        return {
+            clave: obtener_contadores(db, clave[0], empleado_id)
+            for clave, empleado_id in scopes.items()
+        }
+    finally:
+        db.close()
+
+
+async def publicar_contadores():
+    """
+    Recalcula los contadores de los usuarios conectados (una vez por rol o médico)
+    y envía por WebSocket solo a quienes les cambió el valor
+    """
+    usuarios = manager.get_user_roles()
+    for user_id in set(_ultimos_enviados) - set(usuarios):
+        del _ultimos_enviados[user_id]
+    if not usuarios:
+        return
+
+    scopes = {_scope(cargo, user_id): user_id for user_id, cargo in usuarios.items()}
+    por_scope = await run_in_threadpool(_contadores_por_scope, scopes)
+
+    for user_id, cargo in usuarios.items():
+        contadores = por_scope[_scope(cargo, user_id)]
+        if _ultimos_enviados.get(user_id) != contadores:
+            _ultimos_enviados[user_id] = contadores
+            await notificar_contadores(user_id, contadores)
+
+
+async def tarea_publicar_contadores():
+    """Tarea de fondo que publica los contadores periódicamente"""
+    while True:
+        await asyncio.sleep(settings.NOTIFICACIONES_PUSH_INTERVAL)
+        try:
+            await publicar_contadores()
+        except Exception as e:
+            logger.error(f"Error publicando contadores de notificaciones: {e}")
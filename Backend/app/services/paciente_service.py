@@ -1,6 +1,13 @@
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy import and_, func, null, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models.paciente import Paciente
+from app.models.cita import Cita
+from app.models.resumen_historia import ResumenHistoria
 from app.schemas.paciente_schema import PacienteCreate, PacienteUpdate
+from app.services.busqueda_service import indice_pacientes
 
 def create_paciente(db: Session, payload: PacienteCreate):
     p = Paciente(
@@ -14,19 +21,81 @@ def create_paciente(db: Session, payload: PacienteCreate):
     db.add(p)
     db.commit()
     db.refresh(p)
+    indice_pacientes.registrar(p)
     return p
 
-def list_pacientes(db: Session, medico_id: int = None):
+def _filtro_medico(stmt, medico_id: Optional[int]):
+    """Pacientes que tienen citas con este médico (todos si no hay médico)"""
+    if not medico_id:
+        return stmt
+    return stmt.where(
+        select(Cita.id).where(
+            Cita.medico_id == medico_id,
+            Cita.paciente_id == Paciente.id
+        ).exists()
+    )
+
+def _select_pacientes(
+    medico_id: Optional[int] = None,
+    por_ultima_visita: bool = False,
+    cursor: Optional[Tuple[Optional[datetime], int]] = None,
+    limit: Optional[int] = None
+):
+    """
+    Una sola consulta para el listado, paginada por keyset:
+    - por id ascendente, con EXISTS sobre las citas del médico si se filtra
+    - por última visita descendente, uniendo con MAX(fecha) agrupado por paciente;
+      los pacientes sin citas (ultima_visita NULL) van al final, por id descendente
+    Selecciona (Paciente, ultima_visita); ultima_visita es None en el orden por id.
+    """
+    if por_ultima_visita:
+        visitas = select(Cita.paciente_id, func.max(Cita.fecha).label("ultima_visita"))
+        if medico_id:
+            visitas = visitas.where(Cita.medico_id == medico_id)
+        visitas = visitas.group_by(Cita.paciente_id).subquery()
+        ultima_visita = visitas.c.ultima_visita
+        # Con médico solo interesan sus pacientes (todos tienen citas): join interno
+        stmt = select(Paciente, ultima_visita).join(
+            visitas, visitas.c.paciente_id == Paciente.id, isouter=not medico_id
+        )
+        if cursor:
+            fecha, ultimo_id = cursor
+            if fecha is None:
+                stmt = stmt.where(ultima_visita.is_(None), Paciente.id < ultimo_id)
+            else:
+                stmt = stmt.where(or_(
+                    ultima_visita < fecha,
+                    and_(ultima_visita == fecha, Paciente.id < ultimo_id),
+                    ultima_visita.is_(None)
+                ))
+        # NULLs al final sin NULLS LAST, que MySQL no admite
+        stmt = stmt.order_by(ultima_visita.is_(None), ultima_visita.desc(), Paciente.id.desc())
+    else:
+        stmt = _filtro_medico(select(Paciente, null().label("ultima_visita")), medico_id)
+        if cursor:
+            stmt = stmt.where(Paciente.id > cursor[1])
+        stmt = stmt.order_by(Paciente.id)
+
+    if limit:
+        stmt = stmt.limit(limit)
+    return stmt
+
+def list_pacientes(db: Session, medico_id: int = None, **opciones):
     """
     Lista pacientes. Si se proporciona medico_id, solo devuelve pacientes de ese médico.
+    Devuelve pares (paciente, ultima_visita).
     """
-    if medico_id:
-        # Obtener pacientes que tienen citas con este médico
-        from app.models.cita import Cita
-        pacientes_ids = db.query(Cita.paciente_id).filter(Cita.medico_id == medico_id).distinct().all()
-        pacientes_ids = [pid[0] for pid in pacientes_ids]
-        return db.query(Paciente).filter(Paciente.id.in_(pacientes_ids)).all()
-    return db.query(Paciente).all()
+    return db.execute(_select_pacientes(medico_id, **opciones)).all()
+
+async def list_pacientes_async(db: AsyncSession, medico_id: int = None, **opciones):
+    """Versión asíncrona de list_pacientes"""
+    result = await db.execute(_select_pacientes(medico_id, **opciones))
+    return result.all()
+
+async def contar_pacientes_async(db: AsyncSession, medico_id: int = None) -> int:
+    """Número de pacientes del listado (del médico si se indica), sin cargarlos"""
+    stmt = _filtro_medico(select(func.count(Paciente.id)), medico_id)
+    return (await db.execute(stmt)).scalar_one()
 
 def get_paciente(db: Session, paciente_id: int):
     return db.query(Paciente).filter(Paciente.id == paciente_id).first()
@@ -37,17 +106,26 @@ def update_paciente(db: Session, paciente_id: int, payload: PacienteUpdate):
         return None
     
     # Actualizar solo los campos proporcionados
-    for field, value in payload.dict(exclude_unset=True).items():
+    cambios = payload.dict(exclude_unset=True)
+    for field, value in cambios.items():
         setattr(paciente, field, value)
+    if "alergias" in cambios:
+        # Las alergias forman parte del resumen de la historia clínica
+        db.query(ResumenHistoria).filter(ResumenHistoria.paciente_id == paciente_id).update(
+            {"alergias": paciente.alergias}, synchronize_session=False
+        )
     
     db.commit()
     db.refresh(paciente)
+    indice_pacientes.registrar(paciente)
     return paciente
 
 def delete_paciente(db: Session, paciente_id: int):
     p = get_paciente(db, paciente_id)
     if not p:
         return None
+    db.query(ResumenHistoria).filter(ResumenHistoria.paciente_id == paciente_id).delete(synchronize_session=False)
     db.delete(p)
     db.commit()
+    indice_pacientes.remover(paciente_id)
     return True
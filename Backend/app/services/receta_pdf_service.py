@@ -0,0 +1,204 @@
+"""
+PDFs de recetas: caché por versión del contenido y generación fuera del event loop
+La versión es un hash de los datos que se imprimen (receta, paciente y médico),
+de modo que editar cualquiera de ellos produce un PDF y un ETag nuevos. Los
+PDFs que faltan en caché se generan en un pool de procesos (reportlab es CPU
+puro); cada proceso construye los estilos de pdf_generator una sola vez.
+Los lotes se reparten en grupos entre los procesos y se entregan como un PDF
+combinado o como un ZIP con un archivo por receta.
+"""
+import asyncio
+import hashlib
+import io
+import json
+import math
+import multiprocessing
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pypdf import PdfReader, PdfWriter
+
+from app.core.config import settings
+from app.core.pdf_cache import cache_pdf
+from app.utils.logger import logger
+from app.utils.pdf_generator import renderizar_receta, renderizar_recetas
+
+
+def clave_pdf(datos: dict) -> str:
+    """receta_id + hash de los datos impresos; sirve de clave de caché y de ETag"""
+    digest = hashlib.sha256(
+        json.dumps(datos, sort_keys=True, ensure_ascii=False, default=str).encode()
+    ).hexdigest()
+    return f"{datos['id']}-{digest[:24]}"
+
+
+class GeneradorPdf:
+    """Pool de procesos para generar PDFs, con una sola generación por clave a la vez"""
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # clave -> generación en curso; las peticiones simultáneas del mismo PDF la esperan
+        self._en_curso: Dict[str, asyncio.Future] = {}
+        self.generados = 0
+        self.compartidos = 0
+        self.segundos_generando = 0.0
+
+    def _obtener_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=settings.PDF_PROCESOS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    async def obtener(self, clave: str, datos: dict) -> bytes:
+        """PDF desde la caché o, si falta, generado en el pool y guardado"""
+        loop = asyncio.get_running_loop()
+        # La caché puede leer del disco: fuera del event loop
+        contenido = await loop.run_in_executor(None, cache_pdf.obtener, clave)
+        if contenido is not None:
+            return contenido
+
+        futuro = self._en_curso.get(clave)
+        if futuro is not None:
+            self.compartidos += 1
+            return await asyncio.shield(futuro)
+
+        futuro = self._en_curso[clave] = loop.create_future()
+        try:
+            contenido = await self._generar(datos)
+            await loop.run_in_executor(None, cache_pdf.guardar, clave, contenido)
+            futuro.set_result(contenido)
+            return contenido
+        except Exception as e:
+            futuro.set_exception(e)
+            # Evita el aviso de excepción no recuperada si nadie más esperaba
+            futuro.exception()
+            raise
+        finally:
+            del self._en_curso[clave]
+
+    async def obtener_lote(self, items: List[Tuple[str, dict]]) -> List[bytes]:
+        """
+        PDFs de varias recetas, en el orden recibido. Los que faltan en caché se
+        reparten en grupos entre todos los procesos del pool.
+        """
+        loop = asyncio.get_running_loop()
+        claves = [clave for clave, _ in items]
+        pdfs = await loop.run_in_executor(None, lambda: [cache_pdf.obtener(c) for c in claves])
+        faltantes = [i for i, pdf in enumerate(pdfs) if pdf is None]
+        if not faltantes:
+            return pdfs
+
+        # Unos pocos grupos por proceso: paralelismo completo sin un envío por receta
+        tamano = max(1, math.ceil(len(faltantes) / (settings.PDF_PROCESOS * 4)))
+        grupos = [faltantes[i:i + tamano] for i in range(0, len(faltantes), tamano)]
+        resultados = await asyncio.gather(*(
+            self._ejecutar(renderizar_recetas, [items[i][1] for i in grupo], len(grupo))
+            for grupo in grupos
+        ))
+        for grupo, generados in zip(grupos, resultados):
+            for i, pdf in zip(grupo, generados):
+                pdfs[i] = pdf
+        await loop.run_in_executor(None, lambda: [cache_pdf.guardar(claves[i], pdfs[i]) for i in faltantes])
+        return pdfs
+
+    async def _generar(self, datos: dict) -> bytes:
+        return await self._ejecutar(renderizar_receta, datos, 1)
+
+    async def _ejecutar(self, funcion, argumento, cantidad: int):
+        executor = self._obtener_executor()
+        inicio = time.perf_counter()
+        try:
+            contenido = await asyncio.get_running_loop().run_in_executor(executor, funcion, argumento)
+        except BrokenProcessPool:
+            # Un proceso murió: descartar el pool para recrearlo en la próxima petición
+            logger.error("Pool de generación de PDFs roto, se recreará")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False)
+            raise
+        with self._lock:
+            self.generados += cantidad
+            self.segundos_generando += time.perf_counter() - inicio
+        return contenido
+
+    def cerrar(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "procesos": settings.PDF_PROCESOS,
+                "en_curso": len(self._en_curso),
+                "generados": self.generados,
+                "compartidos": self.compartidos,
+                "ms_promedio": round(self.segundos_generando / self.generados * 1000, 1) if self.generados else None,
+                "cache": cache_pdf.estadisticas(),
+            }
+
+
+# Instancia global del generador
+generador_pdf = GeneradorPdf()
+
+
+def combinar_pdfs(pdfs: Iterable[bytes]) -> bytes:
+    """Un solo PDF con las páginas de todos, en orden"""
+    escritor = PdfWriter()
+    for pdf in pdfs:
+        escritor.append(PdfReader(io.BytesIO(pdf)))
+    salida = io.BytesIO()
+    escritor.write(salida)
+    return salida.getvalue()
+
+
+class _SalidaZip(io.RawIOBase):
+    """Destino no posicionable para ZipFile: acumula lo escrito hasta que se retira"""
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, datos) -> int:
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def retirar(self) -> bytes:
+        datos, self._partes = b"".join(self._partes), []
+        return datos
+
+
+def zip_pdfs(archivos: Iterable[Tuple[str, bytes]]) -> Iterator[bytes]:
+    """
+    ZIP generado por partes (un fragmento por archivo). Los PDF ya vienen
+    comprimidos, así que se guardan sin volver a comprimir.
+    """
+    salida = _SalidaZip()
+    with zipfile.ZipFile(salida, "w", compression=zipfile.ZIP_STORED) as zip_:
+        for nombre, contenido in archivos:
+            zip_.writestr(nombre, contenido)
+            yield salida.retirar()
+    yield salida.retirar()
+
+
+def etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """Evalúa If-None-Match (lista de ETags, débiles o fuertes, o *)"""
+    if not if_none_match:
+        return False
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*" or candidato.removeprefix("W/") == etag:
+            return True
+    return False
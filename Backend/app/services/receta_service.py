@@ -1,6 +1,10 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 from app.models.receta import Receta
 from app.schemas.receta_schema import RecetaCreate, RecetaDispensar
+from app.services.notificacion_service import invalidar_contadores
+from app.services.historia_service import asegurar_resumen, registrar_receta, actualizar_receta
 from datetime import datetime
 from typing import Optional
 
@@ -8,32 +12,47 @@ def crear_receta(db: Session, payload: RecetaCreate):
     """
     Crea una nueva receta médica
     """
+    resumen = asegurar_resumen(db, payload.paciente_id)
     receta = Receta(
         consulta_id=payload.consulta_id,
         medico_id=payload.medico_id,
         paciente_id=payload.paciente_id,
         medicamentos=payload.medicamentos,
         indicaciones=payload.indicaciones,
-        estado="pendiente"
+        estado="pendiente",
+        fecha_emision=datetime.utcnow()
     )
     db.add(receta)
+    db.flush()
+    registrar_receta(resumen, receta)
     db.commit()
     db.refresh(receta)
+    invalidar_contadores()
     return receta
 
-def listar_recetas(db: Session, paciente_id: Optional[int] = None, estado: Optional[str] = None):
-    """
-    Lista recetas con filtros opcionales
-    """
-    query = db.query(Receta)
+def _select_recetas(paciente_id: Optional[int] = None, estado: Optional[str] = None):
+    stmt = select(Receta)
     
     if paciente_id:
-        query = query.filter(Receta.paciente_id == paciente_id)
+        stmt = stmt.where(Receta.paciente_id == paciente_id)
     
     if estado:
-        query = query.filter(Receta.estado == estado)
+        stmt = stmt.where(Receta.estado == estado)
     
-    return query.order_by(Receta.fecha_emision.desc()).all()
+    return stmt.order_by(Receta.fecha_emision.desc())
+
+def listar_recetas(db: Session, paciente_id: Optional[int] = None, estado: Optional[str] = None):
+    """
+    Lista recetas con filtros opcionales
+    """
+    return db.execute(_select_recetas(paciente_id, estado)).scalars().all()
+
+async def listar_recetas_async(db: AsyncSession, paciente_id: Optional[int] = None, estado: Optional[str] = None):
+    """
+    Versión asíncrona de listar_recetas
+    """
+    result = await db.execute(_select_recetas(paciente_id, estado))
+    return result.scalars().all()
 
 def obtener_receta(db: Session, receta_id: int):
     """
@@ -41,6 +60,41 @@ def obtener_receta(db: Session, receta_id: int):
     """
     return db.query(Receta).filter(Receta.id == receta_id).first()
 
+async def obtener_receta_completa_async(db: AsyncSession, receta_id: int):
+    """
+    Receta con su paciente y su médico en una sola consulta
+    """
+    result = await db.execute(
+        select(Receta)
+        .options(joinedload(Receta.paciente), joinedload(Receta.medico))
+        .where(Receta.id == receta_id)
+    )
+    return result.scalars().first()
+
+async def listar_recetas_completas_async(
+    db: AsyncSession,
+    estado: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    limite: Optional[int] = None
+):
+    """
+    Recetas con paciente y médico en una sola consulta, por fecha de emisión
+    (impresión por lotes)
+    """
+    stmt = select(Receta).options(joinedload(Receta.paciente), joinedload(Receta.medico))
+    if estado:
+        stmt = stmt.where(Receta.estado == estado)
+    if desde:
+        stmt = stmt.where(Receta.fecha_emision >= desde)
+    if hasta:
+        stmt = stmt.where(Receta.fecha_emision < hasta)
+    stmt = stmt.order_by(Receta.fecha_emision, Receta.id)
+    if limite:
+        stmt = stmt.limit(limite)
+    result = await db.execute(stmt)
+    return result.scalars().all()
+
 def dispensar_receta(db: Session, receta_id: int, farmaceutico_id: int, payload: RecetaDispensar):
     """
     Marca una receta como dispensada
@@ -54,9 +108,11 @@ def dispensar_receta(db: Session, receta_id: int, farmaceutico_id: int, payload:
     receta.fecha_dispensacion = datetime.utcnow()
     if payload.observaciones:
         receta.observaciones = payload.observaciones
+    actualizar_receta(asegurar_resumen(db, receta.paciente_id), receta)
     
     db.commit()
     db.refresh(receta)
+    invalidar_contadores()
     return receta
 
 def cancelar_receta(db: Session, receta_id: int, observaciones: Optional[str] = None):
@@ -70,7 +126,9 @@ def cancelar_receta(db: Session, receta_id: int, observaciones: Optional[str] =
     receta.estado = "cancelada"
     if observaciones:
         receta.observaciones = observaciones
+    actualizar_receta(asegurar_resumen(db, receta.paciente_id), receta)
     
     db.commit()
     db.refresh(receta)
+    invalidar_contadores()
     return receta
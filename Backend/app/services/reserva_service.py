@@ -0,0 +1,143 @@
+"""
+Reservas de horario para evitar citas duplicadas
+Cada horario ocupado (medico_id, fecha, hora_inicio) tiene una fila en
+reservas_slot protegida por una restricción única: si dos recepcionistas
+intentan el mismo horario a la vez, la base de datos acepta solo una inserción.
+Las reservas temporales permiten apartar un horario mientras se completa el
+formulario y confirmarlo después sin volver a competir por él.
+"""
+import secrets
+from datetime import date, datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.reserva_slot import ReservaSlot
+from app.services.disponibilidad_service import ESTADOS_LIBERADOS, hora_a_minutos, minutos_a_hora
+
+ClaveSlot = Tuple[int, date, str]
+
+
+class SlotOcupadoError(ValueError):
+    """El horario ya está reservado o asignado a otra cita"""
+
+
+class ReservaInvalidaError(ValueError):
+    """La reserva no existe, venció o no corresponde al horario solicitado"""
+
+
+def clave_slot(
+    medico_id: Optional[int],
+    fecha: Optional[datetime],
+    hora_inicio: Optional[str],
+    estado: Optional[str] = None
+) -> Optional[ClaveSlot]:
+    """
+    Clave normalizada del horario que ocupa una cita, o None si no ocupa agenda
+    (sin médico, sin fecha o en un estado que libera el horario)
+    """
+    if medico_id is None or fecha is None or estado in ESTADOS_LIBERADOS:
+        return None
+    if hora_inicio:
+        try:
+            hora = minutos_a_hora(hora_a_minutos(hora_inicio))
+        except ValueError:
+            raise ValueError(f"Hora de inicio inválida: {hora_inicio}")
+    else:
+        hora = fecha.strftime("%H:%M")
+    return medico_id, fecha.date() if isinstance(fecha, datetime) else fecha, hora
+
+
+def nuevo_token() -> str:
+    return secrets.token_urlsafe(24)
+
+
+def _purgar_vencida(db: Session, clave: ClaveSlot) -> bool:
+    """Elimina la reserva temporal vencida que ocupe el horario, si la hay"""
+    medico_id, fecha, hora_inicio = clave
+    eliminadas = db.query(ReservaSlot).filter(
+        ReservaSlot.medico_id == medico_id,
+        ReservaSlot.fecha == fecha,
+        ReservaSlot.hora_inicio == hora_inicio,
+        ReservaSlot.cita_id.is_(None),
+        ReservaSlot.expira_en < datetime.utcnow()
+    ).delete(synchronize_session=False)
+    return eliminadas > 0
+
+
+def ocupar_slot(
+    db: Session,
+    clave: ClaveSlot,
+    cita_id: Optional[int] = None,
+    expira_en: Optional[datetime] = None
+) -> ReservaSlot:
+    """
+    Inserta la fila de ocupación dentro de un savepoint, sin bloquear la tabla.
+    Si el horario lo ocupa una reserva temporal vencida, se elimina y se reintenta;
+    cualquier otro conflicto se rechaza con SlotOcupadoError.
+    """
+    medico_id, fecha, hora_inicio = clave
+    for _ in range(settings.RESERVA_REINTENTOS):
+        reserva = ReservaSlot(
+            medico_id=medico_id,
+            fecha=fecha,
+            hora_inicio=hora_inicio,
+            token=nuevo_token(),
+            expira_en=expira_en,
+            cita_id=cita_id
+        )
+        savepoint = db.begin_nested()
+        try:
+            db.add(reserva)
+            db.flush()
+            savepoint.commit()
+            return reserva
+        except IntegrityError:
+            savepoint.rollback()
+            if not _purgar_vencida(db, clave):
+                break
+    raise SlotOcupadoError(f"El horario {hora_inicio} del {fecha.strftime('%d/%m/%Y')} ya está ocupado")
+
+
+def crear_reserva(db: Session, medico_id: int, fecha: date, hora_inicio: str) -> ReservaSlot:
+    """Aparta un horario durante RESERVA_SLOT_TTL segundos"""
+    clave = clave_slot(medico_id, datetime.combine(fecha, datetime.min.time()), hora_inicio)
+    expira_en = datetime.utcnow() + timedelta(seconds=settings.RESERVA_SLOT_TTL)
+    reserva = ocupar_slot(db, clave, expira_en=expira_en)
+    db.commit()
+    db.refresh(reserva)
+    return reserva
+
+
+def tomar_reserva(db: Session, token: str, clave: Optional[ClaveSlot]) -> ReservaSlot:
+    """
+    Bloquea la fila de una reserva temporal vigente para confirmarla.
+    El bloqueo es solo de esa fila: otras reservas siguen confirmándose en paralelo.
+    """
+    reserva = db.query(ReservaSlot).filter(
+        ReservaSlot.token == token
+    ).with_for_update().first()
+    if not reserva or reserva.cita_id is not None:
+        raise ReservaInvalidaError("Reserva no encontrada o ya confirmada")
+    if reserva.expira_en is None or reserva.expira_en < datetime.utcnow():
+        raise ReservaInvalidaError("La reserva ha vencido")
+    if clave != (reserva.medico_id, reserva.fecha, reserva.hora_inicio):
+        raise ReservaInvalidaError("La cita no corresponde al horario reservado")
+    return reserva
+
+
+def liberar_reserva(db: Session, token: str) -> bool:
+    """Cancela una reserva temporal que no se llegó a confirmar"""
+    eliminadas = db.query(ReservaSlot).filter(
+        ReservaSlot.token == token,
+        ReservaSlot.cita_id.is_(None)
+    ).delete(synchronize_session=False)
+    db.commit()
+    return eliminadas > 0
+
+
+def liberar_slot_de_cita(db: Session, cita_id: int):
+    """Libera el horario que ocupaba una cita (sin hacer commit)"""
+    db.query(ReservaSlot).filter(ReservaSlot.cita_id == cita_id).delete(synchronize_session=False)
@@ -0,0 +1,161 @@
+"""
+Signos vitales como series por métrica
+Al guardar una consulta su JSON `signos_vitales` se descompone en filas
+(paciente_id, medido_en, metrica, valor) de mediciones_vitales. Las tendencias,
+medias móviles y valores fuera de rango se calculan con NumPy sobre los arreglos
+de cada serie, leídos con una sola consulta por el índice del paciente.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.consulta import Consulta
+from app.models.medicion_vital import MedicionVital
+
+# Métrica -> (unidad, mínimo normal, máximo normal) en adultos; None si no aplica
+METRICAS: Dict[str, Tuple[str, Optional[float], Optional[float]]] = {
+    "presion_sistolica": ("mmHg", 90, 140),
+    "presion_diastolica": ("mmHg", 60, 90),
+    "frecuencia_cardiaca": ("lpm", 60, 100),
+    "frecuencia_respiratoria": ("rpm", 12, 20),
+    "temperatura": ("°C", 36.0, 37.5),
+    "saturacion_oxigeno": ("%", 92, 100),
+    "peso": ("kg", None, None),
+    "talla": ("m", None, None),
+    "imc": ("kg/m²", 18.5, 25),
+}
+
+# Variación estimada en el periodo, relativa al promedio, por debajo de la cual la serie es estable
+UMBRAL_ESTABLE = 0.02
+
+
+def _numero(valor) -> Optional[float]:
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        return None
+    return numero if np.isfinite(numero) else None
+
+
+def extraer_mediciones(signos: Optional[dict]) -> List[Tuple[str, float]]:
+    """(metrica, valor) presentes en el JSON de signos vitales de una consulta"""
+    if not signos:
+        return []
+    mediciones = []
+    presion = signos.get("presion_arterial")
+    if isinstance(presion, str) and "/" in presion:
+        sistolica, _, diastolica = presion.partition("/")
+        for metrica, valor in (("presion_sistolica", sistolica), ("presion_diastolica", diastolica)):
+            numero = _numero(valor)
+            if numero is not None:
+                mediciones.append((metrica, numero))
+    for metrica in METRICAS:
+        numero = _numero(signos.get(metrica))
+        if numero is not None:
+            mediciones.append((metrica, numero))
+    return mediciones
+
+
+def registrar_signos(db: Session, consulta: Consulta):
+    """Añade a la sesión las mediciones de una consulta ya insertada (con id y fecha)"""
+    db.add_all(
+        MedicionVital(
+            paciente_id=consulta.paciente_id,
+            consulta_id=consulta.id,
+            metrica=metrica,
+            valor=valor,
+            medido_en=consulta.fecha_consulta
+        )
+        for metrica, valor in extraer_mediciones(consulta.signos_vitales)
+    )
+
+
+def _analizar_serie(metrica: str, fechas: np.ndarray, valores: np.ndarray, ventana: int) -> dict:
+    unidad, minimo, maximo = METRICAS[metrica]
+    n = len(valores)
+
+    # Media móvil de las últimas `ventana` mediciones (menos al inicio de la serie)
+    acumulado = np.concatenate(([0.0], np.cumsum(valores)))
+    posiciones = np.arange(1, n + 1)
+    anchos = np.minimum(posiciones, ventana)
+    media_movil = (acumulado[posiciones] - acumulado[posiciones - anchos]) / anchos
+
+    fuera = np.zeros(n, dtype=bool)
+    if minimo is not None:
+        fuera |= valores < minimo
+    if maximo is not None:
+        fuera |= valores > maximo
+
+    # Pendiente de la recta de mínimos cuadrados, en unidades por día
+    dias = (fechas - fechas[0]) / np.timedelta64(1, "D")
+    pendiente = None
+    tendencia = None
+    if n >= 2 and dias[-1] > 0:
+        pendiente = float(np.polyfit(dias, valores, 1)[0])
+        variacion = pendiente * dias[-1]
+        promedio = abs(float(valores.mean())) or 1.0
+        if abs(variacion) < UMBRAL_ESTABLE * promedio:
+            tendencia = "estable"
+        else:
+            tendencia = "sube" if variacion > 0 else "baja"
+
+    return {
+        "metrica": metrica,
+        "unidad": unidad,
+        "rango_normal": {"min": minimo, "max": maximo},
+        "mediciones": n,
+        "ultimo": float(valores[-1]),
+        "minimo": float(valores.min()),
+        "maximo": float(valores.max()),
+        "promedio": round(float(valores.mean()), 2),
+        "tendencia": tendencia,
+        "pendiente_por_dia": round(pendiente, 4) if pendiente is not None else None,
+        "fuera_de_rango": int(fuera.sum()),
+        "puntos": [
+            {"fecha": fecha, "valor": valor, "media_movil": media, "fuera_de_rango": marca}
+            for fecha, valor, media, marca in zip(
+                fechas.astype("datetime64[us]").tolist(),
+                valores.tolist(),
+                np.round(media_movil, 2).tolist(),
+                fuera.tolist()
+            )
+        ],
+    }
+
+
+def analizar_signos(
+    db: Session,
+    paciente_id: int,
+    metricas: Iterable[str],
+    desde: Optional[datetime] = None,
+    ventana: int = 3
+) -> List[dict]:
+    """Series de las métricas pedidas con sus estadísticas, en el orden de METRICAS"""
+    stmt = (
+        select(MedicionVital.metrica, MedicionVital.medido_en, MedicionVital.valor)
+        .where(MedicionVital.paciente_id == paciente_id, MedicionVital.metrica.in_(list(metricas)))
+        .order_by(MedicionVital.metrica, MedicionVital.medido_en, MedicionVital.id)
+    )
+    if desde:
+        stmt = stmt.where(MedicionVital.medido_en >= desde)
+    filas = db.execute(stmt).all()
+    if not filas:
+        return []
+
+    nombres, fechas, valores = zip(*filas)
+    nombres = np.array(nombres)
+    fechas = np.array(fechas, dtype="datetime64[us]")
+    valores = np.array(valores, dtype=float)
+
+    # Las filas llegan agrupadas por métrica: se corta donde cambia el nombre
+    cortes = np.flatnonzero(nombres[1:] != nombres[:-1]) + 1
+    inicios = np.concatenate(([0], cortes))
+    finales = np.concatenate((cortes, [len(nombres)]))
+    series = {
+        str(nombres[i]): _analizar_serie(str(nombres[i]), fechas[i:f], valores[i:f], ventana)
+        for i, f in zip(inicios, finales)
+    }
+    return [series[m] for m in METRICAS if m in series]
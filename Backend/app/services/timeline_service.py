@@ -0,0 +1,158 @@
+"""
+Historial clínico de un paciente como una sola línea de tiempo
+Mezcla citas, consultas, recetas y encuestas ordenadas por fecha descendente.
+Cada fuente se lee con una consulta (relaciones con joinedload) limitada al
+tamaño de página y posterior al cursor; las listas ya ordenadas se combinan en
+memoria. El número de consultas es fijo: una por tipo solicitado.
+"""
+import heapq
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, joinedload
+
+from app.models.cita import Cita
+from app.models.consulta import Consulta
+from app.models.encuesta import EncuestaSatisfaccion
+from app.models.receta import Receta
+
+# Orden de desempate entre tipos con la misma fecha (parte de la clave del cursor)
+TIPOS_TIMELINE = ("cita", "consulta", "receta", "encuesta")
+
+ClaveEvento = Tuple[datetime, str, int]
+
+
+def _nombre(persona) -> Optional[str]:
+    return f"{persona.nombre} {persona.apellido}" if persona else None
+
+
+def _evento_cita(c: Cita) -> dict:
+    return {
+        "tipo": "cita",
+        "id": c.id,
+        "fecha": c.fecha,
+        "resumen": c.motivo or f"Cita de {c.tipo_cita or 'consulta'}",
+        "estado": c.estado,
+        "profesional": _nombre(c.medico),
+        "datos": {
+            "hora_inicio": c.hora_inicio,
+            "hora_fin": c.hora_fin,
+            "tipo_cita": c.tipo_cita,
+            "sala_asignada": c.sala_asignada,
+        },
+    }
+
+
+def _evento_consulta(c: Consulta) -> dict:
+    return {
+        "tipo": "consulta",
+        "id": c.id,
+        "fecha": c.fecha_consulta,
+        "resumen": c.diagnostico or c.motivo_consulta or "Consulta médica",
+        "profesional": _nombre(c.medico_empleado),
+        "datos": {
+            "cita_id": c.cita_id,
+            "motivo_consulta": c.motivo_consulta,
+            "tratamiento": c.tratamiento,
+            "signos_vitales": c.signos_vitales,
+        },
+    }
+
+
+def _evento_receta(r: Receta) -> dict:
+    return {
+        "tipo": "receta",
+        "id": r.id,
+        "fecha": r.fecha_emision,
+        "resumen": r.medicamentos,
+        "estado": r.estado,
+        "profesional": _nombre(r.medico),
+        "datos": {
+            "consulta_id": r.consulta_id,
+            "indicaciones": r.indicaciones,
+            "dispensada_por": _nombre(r.farmaceutico),
+            "fecha_dispensacion": r.fecha_dispensacion,
+        },
+    }
+
+
+def _evento_encuesta(e: EncuestaSatisfaccion) -> dict:
+    return {
+        "tipo": "encuesta",
+        "id": e.id,
+        "fecha": e.fecha,
+        "resumen": f"Encuesta de satisfacción ({e.satisfaccion_general}/5)"
+        if e.satisfaccion_general else "Encuesta de satisfacción",
+        "datos": {
+            "cita_id": e.cita_id,
+            "recomendaria": e.recomendaria,
+            "comentarios": e.comentarios,
+        },
+    }
+
+
+# tipo -> (modelo, columna de fecha, relaciones a cargar, conversión a evento)
+_FUENTES: Dict[str, tuple] = {
+    "cita": (Cita, Cita.fecha, (Cita.medico,), _evento_cita),
+    "consulta": (Consulta, Consulta.fecha_consulta, (Consulta.medico_empleado,), _evento_consulta),
+    "receta": (Receta, Receta.fecha_emision, (Receta.medico, Receta.farmaceutico), _evento_receta),
+    "encuesta": (EncuestaSatisfaccion, EncuestaSatisfaccion.fecha, (), _evento_encuesta),
+}
+
+
+def _despues_del_cursor(tipo: str, modelo, columna_fecha, cursor: ClaveEvento):
+    """
+    Filas estrictamente posteriores al cursor en el orden (fecha desc, tipo desc, id desc),
+    expresado solo con columnas de este tipo para aprovechar su índice
+    """
+    fecha, tipo_cursor, id_cursor = cursor
+    orden, orden_cursor = TIPOS_TIMELINE.index(tipo), TIPOS_TIMELINE.index(tipo_cursor)
+    if orden < orden_cursor:
+        return columna_fecha <= fecha
+    if orden > orden_cursor:
+        return columna_fecha < fecha
+    return or_(columna_fecha < fecha, and_(columna_fecha == fecha, modelo.id < id_cursor))
+
+
+def _leer_fuente(
+    db: Session,
+    tipo: str,
+    paciente_id: int,
+    cursor: Optional[ClaveEvento],
+    limite: int
+) -> List[dict]:
+    modelo, columna_fecha, relaciones, a_evento = _FUENTES[tipo]
+    query = db.query(modelo).options(*(joinedload(r) for r in relaciones)).filter(
+        modelo.paciente_id == paciente_id,
+        columna_fecha.isnot(None)
+    )
+    if cursor:
+        query = query.filter(_despues_del_cursor(tipo, modelo, columna_fecha, cursor))
+    filas = query.order_by(columna_fecha.desc(), modelo.id.desc()).limit(limite).all()
+    return [a_evento(fila) for fila in filas]
+
+
+def _clave(evento: dict) -> Tuple[datetime, int, int]:
+    return evento["fecha"], TIPOS_TIMELINE.index(evento["tipo"]), evento["id"]
+
+
+def timeline_paciente(
+    db: Session,
+    paciente_id: int,
+    tipos: Iterable[str] = TIPOS_TIMELINE,
+    cursor: Optional[ClaveEvento] = None,
+    limite: int = 50
+) -> Tuple[List[dict], Optional[ClaveEvento]]:
+    """
+    Devuelve (eventos, cursor_siguiente) con los `limite` eventos más recientes
+    posteriores al cursor. cursor_siguiente es None en la última página.
+    """
+    fuentes = [_leer_fuente(db, tipo, paciente_id, cursor, limite + 1) for tipo in tipos]
+    combinados = heapq.merge(*fuentes, key=_clave, reverse=True)
+    pagina = [evento for _, evento in zip(range(limite + 1), combinados)]
+    if len(pagina) <= limite:
+        return pagina, None
+    pagina = pagina[:limite]
+    ultimo = pagina[-1]
+    return pagina, (ultimo["fecha"], ultimo["tipo"], ultimo["id"])
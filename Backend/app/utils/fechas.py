@@ -0,0 +1,25 @@
+"""
+Límites de rangos de fechas recibidos como parámetros de consulta
+Aceptan una fecha (día completo) o una fecha y hora exacta, y devuelven el
+intervalo semiabierto [inicio, fin) que usan los filtros en SQL.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Union
+
+FechaOHora = Union[datetime, date]
+
+
+def inicio_rango(valor: Optional[FechaOHora]) -> Optional[datetime]:
+    """Límite inferior inclusivo; una fecha sin hora empieza a las 00:00"""
+    if valor is None or isinstance(valor, datetime):
+        return valor
+    return datetime.combine(valor, time.min)
+
+
+def fin_rango(valor: Optional[FechaOHora]) -> Optional[datetime]:
+    """Límite superior exclusivo; una fecha sin hora incluye el día completo"""
+    if valor is None:
+        return None
+    if isinstance(valor, datetime):
+        return valor + timedelta(microseconds=1)
+    return datetime.combine(valor + timedelta(days=1), time.min)
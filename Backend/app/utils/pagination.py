@@ -0,0 +1,57 @@
+"""
+Utilidades de paginación por cursor (keyset)
+El cursor codifica la última clave ordenada de la página anterior,
+así la siguiente página se obtiene con un WHERE indexado en lugar de OFFSET.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Tamaño de página cuando no se indica limit
+LIMITE_POR_DEFECTO = 200
+
+
+def encode_cursor(fecha: Optional[datetime], id: int) -> str:
+    """
+    Codifica la clave (fecha, id) como token opaco url-safe.
+    fecha es None cuando el listado se ordena solo por id.
+    """
+    raw = json.dumps([fecha.isoformat() if fecha else None, id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> list:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[Optional[datetime], int]]:
+    """Decodifica un token generado por encode_cursor"""
+    if not cursor:
+        return None
+    try:
+        fecha, id = _decode(cursor)
+        return (datetime.fromisoformat(fecha) if fecha is not None else None), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Cursor de paginación inválido")
+
+
+def encode_cursor_evento(fecha: datetime, tipo: str, id: int) -> str:
+    """Cursor de listados que mezclan entidades: clave (fecha, tipo, id)"""
+    raw = json.dumps([fecha.isoformat(), tipo, id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor_evento(cursor: Optional[str]) -> Optional[Tuple[datetime, str, int]]:
+    """Decodifica un token generado por encode_cursor_evento"""
+    if not cursor:
+        return None
+    try:
+        fecha, tipo, id = _decode(cursor)
+        return datetime.fromisoformat(fecha), str(tipo), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Cursor de paginación inválido")
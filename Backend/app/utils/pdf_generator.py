@@ -11,6 +11,122 @@ from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from io import BytesIO
 from datetime import datetime
 
+# Estilos compartidos por todas las recetas: se construyen una vez por proceso
+_styles = getSampleStyleSheet()
+
+SUBTITLE_STYLE = ParagraphStyle(
+    'Subtitle',
+    parent=_styles['Heading2'],
+    fontSize=14,
+    textColor=colors.HexColor('#059669'),
+    spaceAfter=12,
+    spaceBefore=12,
+    fontName='Helvetica-Bold'
+)
+
+NORMAL_STYLE = ParagraphStyle(
+    'CustomNormal',
+    parent=_styles['Normal'],
+    fontSize=11,
+    spaceAfter=6
+)
+
+MEDICAMENTOS_STYLE = ParagraphStyle(
+    'Medicamentos',
+    parent=_styles['Normal'],
+    fontSize=12,
+    leading=16,
+    leftIndent=10,
+    fontName='Helvetica'
+)
+
+FOOTER_STYLE = ParagraphStyle(
+    'Footer',
+    parent=_styles['Normal'],
+    fontSize=8,
+    textColor=colors.HexColor('#6b7280'),
+    alignment=TA_CENTER
+)
+
+HEADER_TABLE_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (0, 0), 16),
+    ('TEXTCOLOR', (0, 0), (0, 0), colors.HexColor('#1e40af')),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 10),
+    ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+])
+
+LINE_TABLE_STYLE = TableStyle([
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#d1d5db')),
+])
+
+PACIENTE_TABLE_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f3f4f6')),
+    ('BACKGROUND', (2, 0), (2, -1), colors.HexColor('#f3f4f6')),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e5e7eb')),
+    ('LEFTPADDING', (0, 0), (-1, -1), 8),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 8),
+    ('TOPPADDING', (0, 0), (-1, -1), 6),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+])
+
+MEDICAMENTOS_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#fef3c7')),
+    ('BOX', (0, 0), (-1, -1), 2, colors.HexColor('#f59e0b')),
+    ('LEFTPADDING', (0, 0), (-1, -1), 15),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 15),
+    ('TOPPADDING', (0, 0), (-1, -1), 15),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 15),
+])
+
+INDICACIONES_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#dbeafe')),
+    ('BOX', (0, 0), (-1, -1), 1, colors.HexColor('#3b82f6')),
+    ('LEFTPADDING', (0, 0), (-1, -1), 12),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 12),
+    ('TOPPADDING', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+])
+
+FIRMA_TABLE_STYLE = TableStyle([
+    ('ALIGN', (1, 0), (1, -1), 'CENTER'),
+    ('FONTNAME', (1, 3), (1, 3), 'Helvetica-Bold'),
+    ('FONTSIZE', (1, 2), (1, -1), 10),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+])
+
+def datos_receta(receta, paciente, medico) -> dict:
+    """
+    Todo lo que se imprime en la receta, como datos simples: se puede enviar a
+    otro proceso y su hash identifica la versión del PDF
+    """
+    return {
+        "id": receta.id,
+        "fecha_emision": receta.fecha_emision.strftime("%d/%m/%Y %H:%M"),
+        "medicamentos": receta.medicamentos,
+        "indicaciones": receta.indicaciones,
+        "paciente": {
+            "nombre": f"{paciente.nombre} {paciente.apellido}",
+            "cedula": str(paciente.cedula),
+            "edad": calcular_edad(paciente.fecha_nacimiento) if paciente.fecha_nacimiento else 'N/A',
+            "genero": paciente.genero or 'N/A',
+            "direccion": paciente.direccion or 'N/A',
+            "telefono": paciente.telefono or 'N/A',
+            "alergias": paciente.alergias,
+        },
+        "medico": {
+            "nombre": f"{medico.nombre} {medico.apellido}",
+            "cedula": str(medico.cedula),
+            "cargo": medico.cargo or 'Médico',
+        },
+    }
+
 def generar_receta_pdf(receta, paciente, medico):
     """
     Genera un PDF de receta médica con diseño profesional
@@ -23,6 +139,15 @@ def generar_receta_pdf(receta, paciente, medico):
     Returns:
         BytesIO: Buffer con el PDF generado
     """
+    return BytesIO(renderizar_receta(datos_receta(receta, paciente, medico)))
+
+def renderizar_receta(datos: dict) -> bytes:
+    """
+    Construye el PDF a partir de datos_receta(). Función de nivel de módulo
+    para poder ejecutarla en un pool de procesos.
+    """
+    paciente = datos["paciente"]
+    medico = datos["medico"]
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter,
                            rightMargin=72, leftMargin=72,
@@ -31,139 +156,57 @@ def generar_receta_pdf(receta, paciente, medico):
     # Container para los elementos del PDF
     elements = []
     
-    # Estilos
-    styles = getSampleStyleSheet()
-    
-    # Estilo personalizado para el título
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=20,
-        textColor=colors.HexColor('#1e40af'),
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        fontName='Helvetica-Bold'
-    )
-    
-    # Estilo para subtítulos
-    subtitle_style = ParagraphStyle(
-        'Subtitle',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.HexColor('#059669'),
-        spaceAfter=12,
-        spaceBefore=12,
-        fontName='Helvetica-Bold'
-    )
-    
-    # Estilo para texto normal
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=11,
-        spaceAfter=6
-    )
-    
     # ENCABEZADO - Membrete del establecimiento
     header_data = [
         ['🏥 SISTEMA DE GESTIÓN MÉDICA', ''],
-        ['Centro Médico Integral', f'Receta N° {receta.id}'],
-        ['Tel: (02) 123-4567 | Email: info@hospital.com', f'Fecha: {receta.fecha_emision.strftime("%d/%m/%Y %H:%M")}']
+        ['Centro Médico Integral', f'Receta N° {datos["id"]}'],
+        ['Tel: (02) 123-4567 | Email: info@hospital.com', f'Fecha: {datos["fecha_emision"]}']
     ]
     
     header_table = Table(header_data, colWidths=[4*inch, 2.5*inch])
-    header_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (0, 0), 16),
-        ('TEXTCOLOR', (0, 0), (0, 0), colors.HexColor('#1e40af')),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
+    header_table.setStyle(HEADER_TABLE_STYLE)
     elements.append(header_table)
     elements.append(Spacer(1, 0.3*inch))
     
     # Línea separadora
-    line_data = [['─' * 90]]
-    line_table = Table(line_data, colWidths=[6.5*inch])
-    line_table.setStyle(TableStyle([
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#d1d5db')),
-    ]))
+    line_table = Table([['─' * 90]], colWidths=[6.5*inch])
+    line_table.setStyle(LINE_TABLE_STYLE)
     elements.append(line_table)
     elements.append(Spacer(1, 0.2*inch))
     
     # DATOS DEL PACIENTE
-    elements.append(Paragraph('📋 DATOS DEL PACIENTE', subtitle_style))
+    elements.append(Paragraph('📋 DATOS DEL PACIENTE', SUBTITLE_STYLE))
     
     paciente_data = [
-        ['Nombre:', f'{paciente.nombre} {paciente.apellido}', 'Cédula:', str(paciente.cedula)],
-        ['Edad:', calcular_edad(paciente.fecha_nacimiento) if paciente.fecha_nacimiento else 'N/A', 
-         'Género:', paciente.genero or 'N/A'],
-        ['Dirección:', paciente.direccion or 'N/A', 'Teléfono:', paciente.telefono or 'N/A'],
+        ['Nombre:', paciente["nombre"], 'Cédula:', paciente["cedula"]],
+        ['Edad:', paciente["edad"], 'Género:', paciente["genero"]],
+        ['Dirección:', paciente["direccion"], 'Teléfono:', paciente["telefono"]],
     ]
     
-    if paciente.alergias:
-        paciente_data.append(['⚠️ Alergias:', paciente.alergias, '', ''])
+    if paciente["alergias"]:
+        paciente_data.append(['⚠️ Alergias:', paciente["alergias"], '', ''])
     
     paciente_table = Table(paciente_data, colWidths=[1.2*inch, 2.3*inch, 1*inch, 2*inch])
-    paciente_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f3f4f6')),
-        ('BACKGROUND', (2, 0), (2, -1), colors.HexColor('#f3f4f6')),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e5e7eb')),
-        ('LEFTPADDING', (0, 0), (-1, -1), 8),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
+    paciente_table.setStyle(PACIENTE_TABLE_STYLE)
     elements.append(paciente_table)
     elements.append(Spacer(1, 0.3*inch))
     
     # PRESCRIPCIÓN MÉDICA
-    elements.append(Paragraph('💊 PRESCRIPCIÓN MÉDICA', subtitle_style))
+    elements.append(Paragraph('💊 PRESCRIPCIÓN MÉDICA', SUBTITLE_STYLE))
     
     # Medicamentos - En un cuadro destacado
-    medicamentos_style = ParagraphStyle(
-        'Medicamentos',
-        parent=styles['Normal'],
-        fontSize=12,
-        leading=16,
-        leftIndent=10,
-        fontName='Helvetica'
-    )
-    
-    medicamentos_text = receta.medicamentos.replace('\n', '<br/>')
-    medicamentos_paragraph = Paragraph(medicamentos_text, medicamentos_style)
-    
+    medicamentos_paragraph = Paragraph(datos["medicamentos"].replace('\n', '<br/>'), MEDICAMENTOS_STYLE)
     medicamentos_table = Table([[medicamentos_paragraph]], colWidths=[6.5*inch])
-    medicamentos_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#fef3c7')),
-        ('BOX', (0, 0), (-1, -1), 2, colors.HexColor('#f59e0b')),
-        ('LEFTPADDING', (0, 0), (-1, -1), 15),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 15),
-        ('TOPPADDING', (0, 0), (-1, -1), 15),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 15),
-    ]))
+    medicamentos_table.setStyle(MEDICAMENTOS_TABLE_STYLE)
     elements.append(medicamentos_table)
     elements.append(Spacer(1, 0.2*inch))
     
     # INDICACIONES
-    if receta.indicaciones:
-        elements.append(Paragraph('📝 INDICACIONES', subtitle_style))
-        indicaciones_paragraph = Paragraph(receta.indicaciones.replace('\n', '<br/>'), normal_style)
+    if datos["indicaciones"]:
+        elements.append(Paragraph('📝 INDICACIONES', SUBTITLE_STYLE))
+        indicaciones_paragraph = Paragraph(datos["indicaciones"].replace('\n', '<br/>'), NORMAL_STYLE)
         indicaciones_table = Table([[indicaciones_paragraph]], colWidths=[6.5*inch])
-        indicaciones_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#dbeafe')),
-            ('BOX', (0, 0), (-1, -1), 1, colors.HexColor('#3b82f6')),
-            ('LEFTPADDING', (0, 0), (-1, -1), 12),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 12),
-            ('TOPPADDING', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-        ]))
+        indicaciones_table.setStyle(INDICACIONES_TABLE_STYLE)
         elements.append(indicaciones_table)
         elements.append(Spacer(1, 0.3*inch))
     
@@ -174,41 +217,31 @@ def generar_receta_pdf(receta, paciente, medico):
         ['', ''],
         ['', ''],
         ['', '________________________________'],
-        ['', f'Dr(a). {medico.nombre} {medico.apellido}'],
-        ['', f'Cédula: {medico.cedula}'],
-        ['', medico.cargo or 'Médico'],
+        ['', f'Dr(a). {medico["nombre"]}'],
+        ['', f'Cédula: {medico["cedula"]}'],
+        ['', medico["cargo"]],
     ]
     
     firma_table = Table(firma_data, colWidths=[3*inch, 3.5*inch])
-    firma_table.setStyle(TableStyle([
-        ('ALIGN', (1, 0), (1, -1), 'CENTER'),
-        ('FONTNAME', (1, 3), (1, 3), 'Helvetica-Bold'),
-        ('FONTSIZE', (1, 2), (1, -1), 10),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
+    firma_table.setStyle(FIRMA_TABLE_STYLE)
     elements.append(firma_table)
     
     # PIE DE PÁGINA
     elements.append(Spacer(1, 0.3*inch))
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=8,
-        textColor=colors.HexColor('#6b7280'),
-        alignment=TA_CENTER
-    )
     elements.append(Paragraph(
         '═══════════════════════════════════════════════════════════════<br/>'
         'Esta receta es válida por 30 días desde la fecha de emisión.<br/>'
         'Conservar en lugar fresco y seco. Mantener fuera del alcance de los niños.',
-        footer_style
+        FOOTER_STYLE
     ))
     
     # Construir PDF
     doc.build(elements)
-    
-    buffer.seek(0)
-    return buffer
+    return buffer.getvalue()
+
+def renderizar_recetas(lista: list) -> list:
+    """Varias recetas por llamada: reparte el costo de enviar trabajo a otro proceso"""
+    return [renderizar_receta(datos) for datos in lista]
 
 def calcular_edad(fecha_nacimiento):
     """Calcula la edad a partir de la fecha de nacimiento"""
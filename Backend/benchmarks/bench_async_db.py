@@ -0,0 +1,165 @@
+"""
+Benchmark: listado de citas con sesión síncrona (threadpool) vs sesión asíncrona
+
+Simula N peticiones concurrentes al listado de citas:
+- sync: cada petición ocupa un hilo de un pool limitado (como el threadpool de FastAPI)
+- async: las peticiones comparten el event loop y esperan a la base de datos sin hilos
+
+Uso (desde Backend/):
+    python -m benchmarks.bench_async_db
+    python -m benchmarks.bench_async_db --sync-url mysql+pymysql://u:p@host/db \\
+        --async-url mysql+aiomysql://u:p@host/db --peticiones 2000 --concurrencia 200
+
+Sin URLs se usa un archivo SQLite temporal (aiosqlite para la versión asíncrona).
+Con SQLite ambas versiones terminan serializadas por el archivo; el beneficio real
+se observa contra MySQL con latencia de red.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DB_USER", "bench")
+os.environ.setdefault("DB_PASSWORD", "bench")
+os.environ.setdefault("DB_HOST", "localhost")
+os.environ.setdefault("DB_PORT", "3306")
+os.environ.setdefault("DB_NAME", "bench")
+os.environ.setdefault("JWT_SECRET", "bench")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.database import Base, registrar_modelos
+from app.models.cita import Cita
+from app.models.empleado import Empleado
+from app.models.medico import Medico
+from app.models.paciente import Paciente
+from app.services.cita_service import list_citas, list_citas_async
+
+registrar_modelos()
+
+
+def poblar(SessionSync, citas: int):
+    db = SessionSync()
+    try:
+        empleado = Empleado(nombre="Bench", apellido="Medico", cedula=1, cargo="Medico")
+        db.add(empleado)
+        db.flush()
+        medico = Medico(nombre="Bench", apellido="Medico", cedula=1, empleado_id=empleado.id, especialidad="General")
+        pacientes = [
+            Paciente(nombre=f"P{i}", apellido="Bench", cedula=1000 + i)
+            for i in range(50)
+        ]
+        db.add(medico)
+        db.add_all(pacientes)
+        db.flush()
+        inicio = datetime(2024, 1, 1, 8, 0)
+        db.add_all(
+            Cita(
+                fecha=inicio + timedelta(minutes=30 * i),
+                paciente_id=pacientes[i % len(pacientes)].id,
+                medico_id=medico.id,
+                estado="programada"
+            )
+            for i in range(citas)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def consulta_sync(SessionSync, limite: int) -> int:
+    db = SessionSync()
+    try:
+        return len(list_citas(db, limit=limite))
+    finally:
+        db.close()
+
+
+async def consulta_async(SessionAsync, limite: int) -> int:
+    async with SessionAsync() as db:
+        return len(await list_citas_async(db, limit=limite))
+
+
+async def medir_sync(SessionSync, peticiones: int, hilos: int, limite: int) -> float:
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        inicio = time.perf_counter()
+        await asyncio.gather(*(
+            loop.run_in_executor(pool, consulta_sync, SessionSync, limite)
+            for _ in range(peticiones)
+        ))
+        return time.perf_counter() - inicio
+
+
+async def medir_async(SessionAsync, peticiones: int, concurrencia: int, limite: int) -> float:
+    semaforo = asyncio.Semaphore(concurrencia)
+
+    async def una():
+        async with semaforo:
+            await consulta_async(SessionAsync, limite)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(una() for _ in range(peticiones)))
+    return time.perf_counter() - inicio
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sync-url", help="URL SQLAlchemy síncrona (por defecto SQLite temporal)")
+    parser.add_argument("--async-url", help="URL SQLAlchemy asíncrona (por defecto SQLite temporal con aiosqlite)")
+    parser.add_argument("--peticiones", type=int, default=1000)
+    parser.add_argument("--concurrencia", type=int, default=100, help="Peticiones simultáneas en la versión async")
+    parser.add_argument("--hilos", type=int, default=40, help="Hilos del pool síncrono (threadpool de FastAPI: 40)")
+    parser.add_argument("--limite", type=int, default=50, help="Filas por listado")
+    parser.add_argument("--citas", type=int, default=5000, help="Citas de prueba a crear en SQLite")
+    args = parser.parse_args()
+
+    archivo = None
+    if not args.sync_url or not args.async_url:
+        archivo = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+        args.sync_url = f"sqlite:///{archivo}"
+        args.async_url = f"sqlite+aiosqlite:///{archivo}"
+
+    # Pool explícito: con SQLite en archivo SQLAlchemy usaría NullPool por defecto
+    engine = create_engine(
+        args.sync_url, poolclass=QueuePool, pool_size=args.hilos, max_overflow=0,
+        connect_args={"check_same_thread": False} if archivo else {}
+    )
+    async_engine = create_async_engine(
+        args.async_url, poolclass=AsyncAdaptedQueuePool, pool_size=args.concurrencia, max_overflow=0
+    )
+    SessionSync = sessionmaker(bind=engine, autoflush=False)
+    SessionAsync = sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+    try:
+        if archivo:
+            Base.metadata.create_all(bind=engine)
+            poblar(SessionSync, args.citas)
+
+        # Calentamiento: abrir conexiones de ambos pools
+        await medir_sync(SessionSync, args.hilos, args.hilos, args.limite)
+        await medir_async(SessionAsync, args.concurrencia, args.concurrencia, args.limite)
+
+        t_sync = await medir_sync(SessionSync, args.peticiones, args.hilos, args.limite)
+        t_async = await medir_async(SessionAsync, args.peticiones, args.concurrencia, args.limite)
+
+        print(f"Peticiones: {args.peticiones}, filas por listado: {args.limite}")
+        print(f"sync  ({args.hilos} hilos):        {t_sync:7.2f} s  {args.peticiones / t_sync:8.1f} req/s")
+        print(f"async ({args.concurrencia} concurrentes): {t_async:7.2f} s  {args.peticiones / t_async:8.1f} req/s")
+    finally:
+        await async_engine.dispose()
+        engine.dispose()
+        if archivo:
+            os.remove(archivo)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
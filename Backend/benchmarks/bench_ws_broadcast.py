@@ -0,0 +1,134 @@
+"""
+Benchmark: CPU por broadcast WebSocket según el número de clientes conectados
+
+Compara dos formas de repartir la misma notificación a N conexiones:
+- por_destinatario: send_json(mensaje) en cada conexión, como hacía el manager
+  antes (json.dumps una vez por cliente)
+- una_vez: ConnectionManager.broadcast, que serializa una vez y encola la misma
+  trama a todas las conexiones; incluye el vaciado de las colas de salida
+
+Los sockets son simulados (no escriben a la red), así que se mide solo el
+trabajo del servidor: serializar, encolar y, con --compresion, comprimir.
+
+Uso (desde Backend/):
+    python -m benchmarks.bench_ws_broadcast
+    python -m benchmarks.bench_ws_broadcast --clientes 10 100 1000 5000 --broadcasts 50 --compresion
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("DB_USER", "bench")
+os.environ.setdefault("DB_PASSWORD", "bench")
+os.environ.setdefault("DB_HOST", "localhost")
+os.environ.setdefault("DB_PORT", "3306")
+os.environ.setdefault("DB_NAME", "bench")
+os.environ.setdefault("JWT_SECRET", "bench")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.backplane import Backplane
+from app.core.websocket import ConnectionManager, codificar, orjson
+
+
+class SocketSimulado:
+    """WebSocket que acepta todo sin escribir a la red"""
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, mensaje: dict):
+        # Lo mismo que hace Starlette antes de enviar
+        json.dumps(mensaje, separators=(",", ":"))
+
+    async def send_text(self, texto: str):
+        pass
+
+    async def send_bytes(self, datos: bytes):
+        pass
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        pass
+
+
+def notificacion(eventos: int) -> dict:
+    """Un lote de notificaciones del dispatcher, de tamaño parecido a uno real"""
+    return {
+        "type": "lote",
+        "mensajes": [
+            {
+                "type": "notificacion_farmacia",
+                "title": "Nueva receta",
+                "message": f"Receta #{i} pendiente de dispensar para el paciente {i * 7}",
+                "data": {"receta_id": i, "paciente_id": i * 7, "medicamentos": "Ibuprofeno 400 mg c/8h x 5 días"},
+            }
+            for i in range(eventos)
+        ],
+    }
+
+
+async def medir_por_destinatario(sockets, mensaje: dict, broadcasts: int) -> float:
+    inicio = time.process_time()
+    for _ in range(broadcasts):
+        for socket in sockets:
+            await socket.send_json(mensaje)
+    return (time.process_time() - inicio) / broadcasts
+
+
+async def medir_una_vez(clientes: int, mensaje: dict, broadcasts: int, compresion: bool) -> float:
+    manager = ConnectionManager(Backplane())
+    for i in range(clientes):
+        await manager.connect(SocketSimulado(), i, "Farmaceutico", comprime=compresion)
+    # Primer envío fuera de la medición: arranca las tareas de envío
+    await manager.broadcast(mensaje)
+    await esperar_envios(manager, clientes)
+
+    inicio = time.process_time()
+    for i in range(broadcasts):
+        await manager.broadcast(mensaje)
+        await esperar_envios(manager, clientes * (i + 2))
+    transcurrido = (time.process_time() - inicio) / broadcasts
+    await manager.detener()
+    return transcurrido
+
+
+async def esperar_envios(manager: ConnectionManager, total: int):
+    """Hasta que las tareas de envío hayan escrito `total` mensajes en total"""
+    while manager.metricas.enviados < total:
+        await asyncio.sleep(0)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clientes", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--broadcasts", type=int, default=20, help="Broadcasts medidos por cada N")
+    parser.add_argument("--eventos", type=int, default=10, help="Notificaciones agrupadas en cada mensaje")
+    parser.add_argument("--compresion", action="store_true", help="Clientes con compresion=deflate")
+    args = parser.parse_args()
+
+    # Sin prints de conexión/desconexión durante la medición
+    sys.stdout, salida = open(os.devnull, "w"), sys.stdout
+    mensaje = notificacion(args.eventos)
+    filas = []
+    try:
+        for clientes in args.clientes:
+            sockets = [SocketSimulado() for _ in range(clientes)]
+            antes = await medir_por_destinatario(sockets, mensaje, args.broadcasts)
+            ahora = await medir_una_vez(clientes, mensaje, args.broadcasts, args.compresion)
+            filas.append((clientes, antes, ahora))
+    finally:
+        sys.stdout.close()
+        sys.stdout = salida
+
+    print(f"Mensaje: {len(codificar(mensaje))} bytes, codificador: {'orjson' if orjson else 'json'}, "
+          f"compresión: {'deflate' if args.compresion else 'no'}")
+    print(f"{'clientes':>9} {'por_destinatario':>17} {'una_vez':>10} {'µs/cliente antes':>17} {'µs/cliente ahora':>17}")
+    for clientes, antes, ahora in filas:
+        print(f"{clientes:>9} {antes * 1000:>14.2f} ms {ahora * 1000:>7.2f} ms "
+              f"{antes / clientes * 1e6:>17.2f} {ahora / clientes * 1e6:>17.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
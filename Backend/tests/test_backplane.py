@@ -0,0 +1,125 @@
+"""
+Backplane en memoria: dos ConnectionManager que simulan dos workers
+Un envío en un worker debe llegar a los clientes del otro, el propio worker no
+debe recibir de vuelta lo que publicó, y las invalidaciones de caché deben
+aplicarse solo en los demás workers.
+Uso (desde Backend/):
+    python -m pytest -q tests/test_backplane.py
+"""
+import asyncio
+import json
+import os
+import sys
+
+os.environ.setdefault("DB_USER", "test")
+os.environ.setdefault("DB_PASSWORD", "test")
+os.environ.setdefault("DB_HOST", "localhost")
+os.environ.setdefault("DB_PORT", "3306")
+os.environ.setdefault("DB_NAME", "test")
+os.environ.setdefault("JWT_SECRET", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.backplane import BackplaneMemoria, CanalMemoria
+from app.core.websocket import ConnectionManager
+
+
+class SocketFalso:
+    """Guarda los mensajes que el manager escribe en la conexión"""
+
+    def __init__(self):
+        self.mensajes = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, texto: str):
+        self.mensajes.append(json.loads(texto))
+
+    async def send_bytes(self, datos: bytes):
+        raise AssertionError("La conexión no pidió compresión")
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        pass
+
+
+async def _vaciar_colas():
+    # Cada conexión escribe desde su propia tarea: se le cede el turno
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+async def _dos_workers():
+    canal = CanalMemoria()
+    a = ConnectionManager(BackplaneMemoria(canal))
+    b = ConnectionManager(BackplaneMemoria(canal))
+    await a.iniciar()
+    await b.iniciar()
+    return canal, a, b
+
+
+async def _detener(*managers):
+    for manager in managers:
+        await manager.detener()
+
+
+def test_entrega_entre_workers_sin_eco():
+    async def escenario():
+        canal, a, b = await _dos_workers()
+        socket_a, socket_b, medico_b = SocketFalso(), SocketFalso(), SocketFalso()
+        await a.connect(socket_a, 1, "Administrador")
+        await b.connect(socket_b, 1, "Administrador")
+        await b.connect(medico_b, 2, "Medico")
+
+        await a.send_personal_message({"type": "aviso", "n": 1}, 1)
+        await a.send_to_role({"type": "aviso", "n": 2}, "Medico")
+        await b.broadcast({"type": "aviso", "n": 3})
+        await _vaciar_colas()
+
+        # El usuario 1 está en los dos workers: una copia en cada uno
+        assert [m["n"] for m in socket_a.mensajes] == [1, 3]
+        assert [m["n"] for m in socket_b.mensajes] == [1, 3]
+        assert [m["n"] for m in medico_b.mensajes] == [2, 3]
+        assert a.backplane.publicados == 2 and a.backplane.recibidos == 1
+        assert b.backplane.publicados == 1 and b.backplane.recibidos == 2
+
+        await _detener(a, b)
+        assert canal.suscritos == []
+        assert a.get_total_connections() == b.get_total_connections() == 0
+
+    asyncio.run(escenario())
+
+
+def test_sin_propagar_solo_entrega_local():
+    async def escenario():
+        _, a, b = await _dos_workers()
+        socket_a, socket_b = SocketFalso(), SocketFalso()
+        await a.connect(socket_a, 1, "Medico")
+        await b.connect(socket_b, 1, "Medico")
+
+        await a.send_personal_message({"type": "contadores"}, 1, propagar=False)
+        await _vaciar_colas()
+
+        assert len(socket_a.mensajes) == 1
+        assert socket_b.mensajes == []
+        assert a.backplane.publicados == 0
+        await _detener(a, b)
+
+    asyncio.run(escenario())
+
+
+def test_invalidacion_se_aplica_solo_en_los_demas_workers():
+    async def escenario():
+        _, a, b = await _dos_workers()
+        aplicadas_a, aplicadas_b = [], []
+        a.al_invalidar("tokens", aplicadas_a.append)
+        b.al_invalidar("tokens", aplicadas_b.append)
+
+        await a.publicar_invalidacion("tokens", {"usuario": "7", "instante": 1.5})
+        # Una caché sin manejador en el receptor se ignora
+        await a.publicar_invalidacion("desconocida", {})
+
+        assert aplicadas_a == []
+        assert aplicadas_b == [{"usuario": "7", "instante": 1.5}]
+        await _detener(a, b)
+
+    asyncio.run(escenario())
@@ -0,0 +1,112 @@
+"""
+Índice de búsqueda de pacientes: cambios durante una (re)construcción
+Un alta, modificación o baja que llega mientras se lee la tabla no debe
+perderse al publicar el índice nuevo, ni en la carga inicial ni en las
+recargas por TTL.
+Uso (desde Backend/):
+    python -m pytest -q tests/test_busqueda.py
+"""
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("DB_USER", "test")
+os.environ.setdefault("DB_PASSWORD", "test")
+os.environ.setdefault("DB_HOST", "localhost")
+os.environ.setdefault("DB_PORT", "3306")
+os.environ.setdefault("DB_NAME", "test")
+os.environ.setdefault("JWT_SECRET", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base, registrar_modelos
+from app.models.paciente import Paciente
+from app.services.busqueda_service import IndicePacientes
+
+registrar_modelos()
+
+
+class LecturaFija:
+    """Resultado de db.query ya leído; al recorrerlo llegan cambios de otras peticiones"""
+
+    def __init__(self, filas, al_leer):
+        self._filas = filas
+        self._al_leer = al_leer
+
+    def yield_per(self, _):
+        return self
+
+    def __iter__(self):
+        yield from self._filas
+        self._al_leer()
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([
+        Paciente(nombre="Ana", apellido="Pérez", cedula=1),
+        Paciente(nombre="Luis", apellido="Gómez", cedula=2),
+    ])
+    db.commit()
+    yield db
+    db.close()
+    engine.dispose()
+
+
+def cargar_con_cambios(monkeypatch, db, indice, cambios):
+    """Carga el índice aplicando `cambios` después de leer la tabla y antes de publicar"""
+    leer = db.query
+
+    def query(*columnas):
+        return LecturaFija(leer(*columnas).all(), cambios)
+
+    monkeypatch.setattr(db, "query", query)
+    indice.cargar(db)
+    monkeypatch.setattr(db, "query", leer)
+
+
+def ids(indice, consulta):
+    return [paciente_id for paciente_id, _ in indice.buscar(consulta, 10)]
+
+
+def cambios_de_marta_y_luis(indice, db):
+    luis = db.query(Paciente).filter(Paciente.cedula == 2).one()
+
+    def aplicar():
+        indice.registrar(Paciente(id=99, nombre="Marta", apellido="Ríos", cedula=3))
+        indice.remover(luis.id)
+
+    return aplicar
+
+
+@pytest.mark.parametrize("cargado", [False, True])
+def test_cambios_durante_la_carga_no_se_pierden(monkeypatch, db, cargado):
+    indice = IndicePacientes()
+    if cargado:
+        indice.cargar(db)
+
+    cargar_con_cambios(monkeypatch, db, indice, cambios_de_marta_y_luis(indice, db))
+
+    assert ids(indice, "marta") == [99]
+    assert ids(indice, "luis") == []
+    assert ids(indice, "ana") != []
+    assert indice._cambios is None
+
+
+def test_sin_construccion_en_curso_no_se_anotan_cambios(db):
+    indice = IndicePacientes()
+    indice.cargar(db)
+
+    indice.registrar(Paciente(id=99, nombre="Marta", apellido="Ríos", cedula=3))
+
+    assert ids(indice, "marta") == [99]
+    assert indice._cambios is None
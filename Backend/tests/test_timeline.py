@@ -0,0 +1,138 @@
+"""
+Línea de tiempo del paciente: número fijo de consultas SQL por página
+Cada página debe costar una consulta por tipo solicitado, sin importar cuántos
+eventos haya ni en qué página se esté (sin N+1 por las relaciones).
+Uso (desde Backend/):
+    python -m pytest -q tests/test_timeline.py
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+os.environ.setdefault("DB_USER", "test")
+os.environ.setdefault("DB_PASSWORD", "test")
+os.environ.setdefault("DB_HOST", "localhost")
+os.environ.setdefault("DB_PORT", "3306")
+os.environ.setdefault("DB_NAME", "test")
+os.environ.setdefault("JWT_SECRET", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base, registrar_modelos
+from app.models.cita import Cita
+from app.models.consulta import Consulta
+from app.models.empleado import Empleado
+from app.models.encuesta import EncuestaSatisfaccion
+from app.models.medico import Medico
+from app.models.paciente import Paciente
+from app.models.receta import Receta
+from app.services.timeline_service import TIPOS_TIMELINE, timeline_paciente
+
+registrar_modelos()
+
+
+class ContadorConsultas:
+    """Cuenta las sentencias que llegan al motor"""
+
+    def __init__(self, engine):
+        self.total = 0
+        event.listen(engine, "before_cursor_execute", self._contar)
+
+    def _contar(self, conn, cursor, statement, parameters, context, executemany):
+        self.total += 1
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def poblar(engine, eventos_por_tipo: int) -> int:
+    """Un paciente con `eventos_por_tipo` eventos de cada tipo, cada uno con su profesional"""
+    db = sessionmaker(bind=engine)()
+    paciente = Paciente(nombre="Ana", apellido="Pérez", cedula=1)
+    otro = Paciente(nombre="Luis", apellido="Gómez", cedula=2)
+    db.add_all([paciente, otro])
+    db.flush()
+    inicio = datetime(2024, 1, 1, 8, 0)
+    for i in range(eventos_por_tipo):
+        # Profesionales distintos por evento: una carga perezosa costaría una consulta cada uno
+        empleado = Empleado(nombre=f"E{i}", apellido="X", cedula=1000 + i, cargo="Medico")
+        farmaceutico = Empleado(nombre=f"F{i}", apellido="X", cedula=5000 + i, cargo="Farmaceutico")
+        medico = Medico(nombre=f"M{i}", apellido="X", cedula=9000 + i)
+        db.add_all([empleado, farmaceutico, medico])
+        db.flush()
+        # Fechas repetidas entre tipos para ejercitar el desempate del cursor
+        fecha = inicio + timedelta(hours=i // 2)
+        for dueno in (paciente, otro):
+            cita = Cita(fecha=fecha, paciente_id=dueno.id, medico_id=medico.id, motivo=f"Control {i}")
+            db.add(cita)
+            db.flush()
+            consulta = Consulta(
+                cita_id=cita.id, paciente_id=dueno.id, medico_id=empleado.id,
+                fecha_consulta=fecha, diagnostico=f"Diagnóstico {i}"
+            )
+            db.add(consulta)
+            db.flush()
+            db.add(Receta(
+                consulta_id=consulta.id, medico_id=empleado.id, paciente_id=dueno.id,
+                fecha_emision=fecha, medicamentos="Ibuprofeno", dispensada_por=farmaceutico.id
+            ))
+            db.add(EncuestaSatisfaccion(paciente_id=dueno.id, cita_id=cita.id, fecha=fecha, satisfaccion_general=5))
+    db.commit()
+    paciente_id = paciente.id
+    db.close()
+    return paciente_id
+
+
+def recorrer(engine, paciente_id: int, tipos, limite: int):
+    """Todas las páginas de la línea de tiempo con las consultas que costó cada una"""
+    contador = ContadorConsultas(engine)
+    db = sessionmaker(bind=engine)()
+    # Abre la transacción antes de medir para contar solo las lecturas
+    db.connection()
+    paginas, cursor = [], None
+    while True:
+        antes = contador.total
+        eventos, cursor = timeline_paciente(db, paciente_id, tipos, cursor, limite)
+        paginas.append((eventos, contador.total - antes))
+        if cursor is None:
+            break
+    db.close()
+    return paginas
+
+
+@pytest.mark.parametrize("eventos_por_tipo", [3, 30])
+@pytest.mark.parametrize("tipos", [TIPOS_TIMELINE, ("receta",), ("cita", "consulta")])
+def test_consultas_constantes_por_pagina(engine, eventos_por_tipo, tipos):
+    paciente_id = poblar(engine, eventos_por_tipo)
+
+    paginas = recorrer(engine, paciente_id, tipos, limite=7)
+
+    assert [consultas for _, consultas in paginas] == [len(tipos)] * len(paginas)
+    eventos = [evento for pagina, _ in paginas for evento in pagina]
+    assert len(eventos) == eventos_por_tipo * len(tipos)
+    assert len({(e["tipo"], e["id"]) for e in eventos}) == len(eventos)
+    claves = [(e["fecha"], TIPOS_TIMELINE.index(e["tipo"]), e["id"]) for e in eventos]
+    assert claves == sorted(claves, reverse=True)
+
+
+def test_relaciones_cargadas_en_la_misma_consulta(engine):
+    paciente_id = poblar(engine, 10)
+
+    (eventos, consultas), *_ = recorrer(engine, paciente_id, TIPOS_TIMELINE, limite=40)
+
+    assert consultas == len(TIPOS_TIMELINE)
+    recetas = [e for e in eventos if e["tipo"] == "receta"]
+    assert recetas and all(e["profesional"] and e["datos"]["dispensada_por"] for e in recetas)
+    assert all(e["profesional"] for e in eventos if e["tipo"] in ("cita", "consulta"))
@@ -28,8 +28,7 @@ const NotificationDropdown = ({ isOpen, onClose }) => {
       if (user?.cargo === 'Enfermero' || user?.cargo === 'Enfermera') {
         // Cargar citas confirmadas del día (pacientes en espera)
         try {
-          const citasResponse = await citaService.listar({ fecha: hoy, estado: 'confirmada' })
-          const citasConfirmadas = citasResponse.data || []
+          const citasConfirmadas = await citaService.listarTodas({ fecha: hoy, estado: 'confirmada' })
           
           if (citasConfirmadas.length > 0) {
             notifs.push({
@@ -64,12 +63,11 @@ const NotificationDropdown = ({ isOpen, onClose }) => {
       if (user?.cargo === 'Medico' || user?.cargo === 'Médico') {
         // Cargar pacientes listos para consulta (estado en_consulta)
         try {
-          const citasResponse = await citaService.listar({ 
+          const pacientesListos = await citaService.listarTodas({ 
             fecha: hoy, 
             estado: 'en_consulta',
             medico_id: user.id 
           })
-          const pacientesListos = citasResponse.data || []
           
           if (pacientesListos.length > 0) {
             notifs.push({
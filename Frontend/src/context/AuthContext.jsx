@@ -1,5 +1,5 @@
 import React, { createContext, useState, useContext } from 'react'
-import { loginService } from '../services/authService'
+import { loginService, logoutService } from '../services/authService'
 import toast from 'react-hot-toast'
 
 const AuthContext = createContext()
@@ -21,6 +21,8 @@ export const AuthProvider = ({ children }) => {
   }
 
   const logout = () => {
+    const token = localStorage.getItem('token')
+    if (token) logoutService(token).catch(() => {})
     localStorage.clear()
     setUser(null)
     toast('Sesión cerrada')
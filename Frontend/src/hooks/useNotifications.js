@@ -1,8 +1,9 @@
 import { useState, useEffect } from 'react'
 import { useAuth } from '../context/AuthContext'
-import citaService from '../services/citaService'
-import recetaService from '../services/recetaService'
-import { getMedicamentos } from '../services/medicamentoService'
+import notificacionService from '../services/notificacionService'
+
+// Los contadores llegan por WebSocket cuando cambian; el sondeo es solo un respaldo
+const POLL_INTERVAL = 5 * 60 * 1000
 
 export const useNotifications = () => {
   const { user } = useAuth()
@@ -14,38 +15,8 @@ export const useNotifications = () => {
 
     setLoading(true)
     try {
-      const hoy = new Date().toISOString().split('T')[0]
-      let count = 0
-
-      if (user?.cargo === 'Enfermero' || user?.cargo === 'Enfermera') {
-        // Contar citas confirmadas del día
-        const citasResponse = await citaService.listar({ fecha: hoy, estado: 'confirmada' })
-        count = (citasResponse.data || []).length
-      }
-
-      if (user?.cargo === 'Medico' || user?.cargo === 'Médico') {
-        // Contar pacientes listos para consulta
-        const citasResponse = await citaService.listar({ 
-          fecha: hoy, 
-          estado: 'en_consulta',
-          medico_id: user.id 
-        })
-        count = (citasResponse.data || []).length
-      }
-
-      if (user?.cargo === 'Farmaceutico' || user?.cargo === 'Farmacéutico') {
-        // Contar recetas pendientes
-        const recetasResponse = await recetaService.listarRecetas({ estado: 'pendiente' })
-        const recetasPendientes = (recetasResponse.data || []).length
-
-        // Contar medicamentos sin stock
-        const medicamentos = await getMedicamentos()
-        const stockAgotado = medicamentos.filter(m => m.stock === 0).length
-
-        count = recetasPendientes + stockAgotado
-      }
-
-      setUnreadCount(count)
+      const contadores = await notificacionService.getContadores()
+      setUnreadCount(contadores.total || 0)
     } catch (error) {
       console.error('Error fetching notification count:', error)
     } finally {
@@ -56,11 +27,17 @@ export const useNotifications = () => {
   useEffect(() => {
     if (user) {
       fetchNotificationCount()
-      
-      // Actualizar cada 30 segundos
-      const interval = setInterval(fetchNotificationCount, 30000)
-      
-      return () => clearInterval(interval)
+
+      // Actualización en tiempo real publicada por useWebSocket
+      const onContadores = (event) => setUnreadCount(event.detail?.total || 0)
+      window.addEventListener('contadores', onContadores)
+
+      const interval = setInterval(fetchNotificationCount, POLL_INTERVAL)
+
+      return () => {
+        clearInterval(interval)
+        window.removeEventListener('contadores', onContadores)
+      }
     }
   }, [user])
 
@@ -2,6 +2,17 @@ import { useEffect, useRef, useState } from 'react'
 import { useAuth } from '../context/AuthContext'
 import toast from 'react-hot-toast'
 
+// DecompressionStream existe antes que su formato 'deflate-raw' (Chromium 80-102):
+// solo se pide compresión si el constructor acepta ese formato
+const admiteDeflateRaw = () => {
+  try {
+    new DecompressionStream('deflate-raw')
+    return true
+  } catch {
+    return false
+  }
+}
+
 const useWebSocket = () => {
   const { user } = useAuth()
   const [isConnected, setIsConnected] = useState(false)
@@ -18,61 +29,101 @@ const useWebSocket = () => {
     const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:'
     const wsUrl = import.meta.env.VITE_WS_URL || `${protocol}//${window.location.hostname}:8000/ws`
     
+    // Los mensajes largos llegan comprimidos si el navegador sabe descomprimirlos
+    const compresion = admiteDeflateRaw() ? '&compresion=deflate' : ''
+
     // Conectar al WebSocket
-    ws.current = new WebSocket(`${wsUrl}?token=${token}`)
+    ws.current = new WebSocket(`${wsUrl}?token=${token}${compresion}`)
+    ws.current.binaryType = 'arraybuffer'
 
     ws.current.onopen = () => {
       console.log('✅ WebSocket conectado')
       setIsConnected(true)
     }
 
+    const handleMessage = (data) => {
+      // Los contadores no son notificaciones visibles: se reenvían a useNotifications
+      if (data.type === 'contadores') {
+        window.dispatchEvent(new CustomEvent('contadores', { detail: data.data }))
+        return
+      }
+
+      // Agregar a notificaciones
+      setNotifications(prev => [...prev, data])
+
+      // Mostrar toast según el tipo de mensaje
+      switch (data.type) {
+        case 'connection_established':
+          toast.success(data.message)
+          break
+        
+        case 'llamada_paciente':
+          toast.success(data.title + ': ' + data.message, {
+            duration: 10000,
+            icon: '👨‍⚕️'
+          })
+          // Reproducir sonido si está disponible
+          playNotificationSound()
+          break
+        
+        case 'cita_actualizada':
+        case 'citas_agendadas':
+          toast.info(data.title + ': ' + data.message, {
+            duration: 5000,
+            icon: '📅'
+          })
+          break
+        
+        case 'receta_lista':
+          toast.success(data.title + ': ' + data.message, {
+            duration: 7000,
+            icon: '💊'
+          })
+          break
+        
+        case 'notificacion_medico':
+        case 'notificacion_farmacia':
+          toast(data.message, {
+            duration: 5000,
+            icon: '🔔'
+          })
+          break
+        
+        default:
+          console.log('Mensaje no manejado:', data)
+      }
+    }
+
+    // Trama binaria: JSON comprimido con deflate sin cabecera
+    const leerTexto = async (datos) => {
+      if (typeof datos === 'string') return datos
+      const stream = new Blob([datos]).stream().pipeThrough(new DecompressionStream('deflate-raw'))
+      return new Response(stream).text()
+    }
+
+    // Las tramas se procesan en orden aunque descomprimir sea asíncrono
+    let pendientes = Promise.resolve()
     ws.current.onmessage = (event) => {
+      pendientes = pendientes.then(() => procesarMensaje(event.data))
+    }
+
+    const procesarMensaje = async (datos) => {
       try {
-        const data = JSON.parse(event.data)
+        const data = JSON.parse(await leerTexto(datos))
+
+        // Latido del servidor: sin respuesta, cierra la conexión por inactiva
+        if (data.type === 'ping') {
+          if (ws.current.readyState === WebSocket.OPEN) ws.current.send(JSON.stringify({ type: 'pong' }))
+          return
+        }
+
         console.log('📨 Mensaje WebSocket:', data)
 
-        // Agregar a notificaciones
-        setNotifications(prev => [...prev, data])
-
-        // Mostrar toast según el tipo de mensaje
-        switch (data.type) {
-          case 'connection_established':
-            toast.success(data.message)
-            break
-          
-          case 'llamada_paciente':
-            toast.success(data.title + ': ' + data.message, {
-              duration: 10000,
-              icon: '👨‍⚕️'
-            })
-            // Reproducir sonido si está disponible
-            playNotificationSound()
-            break
-          
-          case 'cita_actualizada':
-            toast.info(data.title + ': ' + data.message, {
-              duration: 5000,
-              icon: '📅'
-            })
-            break
-          
-          case 'receta_lista':
-            toast.success(data.title + ': ' + data.message, {
-              duration: 7000,
-              icon: '💊'
-            })
-            break
-          
-          case 'notificacion_medico':
-          case 'notificacion_farmacia':
-            toast(data.message, {
-              duration: 5000,
-              icon: '🔔'
-            })
-            break
-          
-          default:
-            console.log('Mensaje no manejado:', data)
+        // El servidor agrupa en un lote los eventos de un mismo destinatario
+        if (data.type === 'lote') {
+          data.mensajes.forEach(handleMessage)
+        } else {
+          handleMessage(data)
         }
       } catch (error) {
         console.error('Error procesando mensaje WebSocket:', error)
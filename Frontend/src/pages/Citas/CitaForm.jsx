@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react'
 import { createCita } from '../../services/citaService'
-import { getPacientes } from '../../services/pacienteService'
+import { buscarPacientes } from '../../services/pacienteService'
 import { getMedicos } from '../../services/medicoService'
 import { useNavigate } from 'react-router-dom'
 import { Calendar, User, Stethoscope, FileText, Clock, Save, X, Search } from 'lucide-react'
@@ -14,7 +14,7 @@ const CitaForm = () => {
     motivo: '',
     estado: 'programada'
   })
-  const [pacientes, setPacientes] = useState([])
+  const [filteredPacientes, setFilteredPacientes] = useState([])
   const [medicos, setMedicos] = useState([])
   const [searchPaciente, setSearchPaciente] = useState('')
   const [showPacienteSuggestions, setShowPacienteSuggestions] = useState(false)
@@ -28,11 +28,7 @@ const CitaForm = () => {
 
   const loadData = async () => {
     try {
-      const [pacientesData, medicosData] = await Promise.all([
-        getPacientes(),
-        getMedicos()
-      ])
-      setPacientes(pacientesData)
+      const medicosData = await getMedicos()
       setMedicos(medicosData)
     } catch (error) {
       console.error('Error loading data:', error)
@@ -40,13 +36,27 @@ const CitaForm = () => {
     }
   }
 
-  const filteredPacientes = pacientes.filter(p => 
-    searchPaciente && (
-      p.nombre?.toLowerCase().includes(searchPaciente.toLowerCase()) ||
-      p.apellido?.toLowerCase().includes(searchPaciente.toLowerCase()) ||
-      p.cedula?.toString().includes(searchPaciente)
-    )
-  )
+  // Sugerencias desde el índice de búsqueda del servidor, sin descargar todos los pacientes
+  useEffect(() => {
+    const q = searchPaciente.trim()
+    if (!q || selectedPaciente) {
+      setFilteredPacientes([])
+      return
+    }
+    let vigente = true
+    const timer = setTimeout(async () => {
+      try {
+        const data = await buscarPacientes(q, 10)
+        if (vigente) setFilteredPacientes(data)
+      } catch (error) {
+        console.error('Error searching patients:', error)
+      }
+    }, 250)
+    return () => {
+      vigente = false
+      clearTimeout(timer)
+    }
+  }, [searchPaciente, selectedPaciente])
 
   const handlePacienteSelect = (paciente) => {
     setSelectedPaciente(paciente)
@@ -141,6 +151,8 @@ const CitaForm = () => {
                 value={searchPaciente}
                 onChange={(e) => {
                   setSearchPaciente(e.target.value)
+                  setSelectedPaciente(null)
+                  setForm({ ...form, paciente_id: '' })
                   setShowPacienteSuggestions(true)
                 }}
                 onFocus={() => setShowPacienteSuggestions(true)}
@@ -1,15 +1,21 @@
 import React, { useEffect, useState } from 'react'
-import { getCitas, deleteCita, updateCita } from '../../services/citaService'
+import { getCitas, contar, deleteCita, updateCita } from '../../services/citaService'
 import { Link, useNavigate } from 'react-router-dom'
 import { Calendar, Plus, Search, Clock, User, Stethoscope, Edit, Trash2, CheckCircle, XCircle } from 'lucide-react'
 import toast from 'react-hot-toast'
 import { useAuth } from '../../context/AuthContext'
 
+const hoy = () => new Date().toISOString().split('T')[0]
+
 const CitaList = () => {
   const [citas, setCitas] = useState([])
+  const [siguiente, setSiguiente] = useState(null)
+  const [totales, setTotales] = useState({ total: 0, completada: 0, programada: 0, cancelada: 0 })
   const [searchTerm, setSearchTerm] = useState('')
   const [filterStatus, setFilterStatus] = useState('todas')
+  const [desde, setDesde] = useState(hoy())
   const [loading, setLoading] = useState(true)
+  const [loadingMore, setLoadingMore] = useState(false)
   const navigate = useNavigate()
   const { user } = useAuth()
   
@@ -17,12 +23,26 @@ const CitaList = () => {
 
   useEffect(() => {
     loadCitas()
-  }, [])
+  }, [desde, filterStatus])
+
+  // Filtros que se aplican en el servidor; la lista se carga por páginas
+  const filtros = () => ({
+    fecha_desde: desde || undefined,
+    estado: filterStatus !== 'todas' ? filterStatus : undefined
+  })
 
   const loadCitas = async () => {
     try {
-      const data = await getCitas()
-      setCitas(data)
+      const [pagina, total, completada, programada, cancelada] = await Promise.all([
+        getCitas(filtros()),
+        contar({ fecha_desde: desde }),
+        contar({ fecha_desde: desde, estado: 'completada' }),
+        contar({ fecha_desde: desde, estado: 'programada' }),
+        contar({ fecha_desde: desde, estado: 'cancelada' })
+      ])
+      setCitas(pagina.citas)
+      setSiguiente(pagina.siguiente)
+      setTotales({ total, completada, programada, cancelada })
     } catch (error) {
       console.error('Error loading appointments:', error)
       toast.error('Error al cargar citas')
@@ -31,6 +51,20 @@ const CitaList = () => {
     }
   }
 
+  const loadMore = async () => {
+    setLoadingMore(true)
+    try {
+      const pagina = await getCitas({ ...filtros(), cursor: siguiente })
+      setCitas(prev => [...prev, ...pagina.citas])
+      setSiguiente(pagina.siguiente)
+    } catch (error) {
+      console.error('Error loading appointments:', error)
+      toast.error('Error al cargar citas')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const handleDelete = async (id) => {
     if (window.confirm('¿Estás seguro de eliminar esta cita?')) {
       try {
@@ -77,11 +111,7 @@ const CitaList = () => {
     )
   }
 
-  const filteredCitas = citas.filter(c => {
-    const matchesSearch = c.id?.toString().includes(searchTerm)
-    const matchesStatus = filterStatus === 'todas' || c.estado === filterStatus
-    return matchesSearch && matchesStatus
-  })
+  const filteredCitas = citas.filter(c => c.id?.toString().includes(searchTerm))
 
   if (loading) {
     return (
@@ -136,6 +166,13 @@ const CitaList = () => {
             <option value="completada">Completadas</option>
             <option value="cancelada">Canceladas</option>
           </select>
+          <input
+            type="date"
+            value={desde}
+            onChange={(e) => setDesde(e.target.value)}
+            title="Citas desde esta fecha"
+            className="px-4 py-3 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-primary-500 bg-white"
+          />
         </div>
       </div>
 
@@ -143,24 +180,24 @@ const CitaList = () => {
       <div className="grid grid-cols-1 md:grid-cols-4 gap-4">
         <div className="bg-white rounded-lg p-4 shadow-sm border-l-4 border-blue-500">
           <p className="text-sm text-gray-600">Total Citas</p>
-          <p className="text-2xl font-bold text-gray-800">{citas.length}</p>
+          <p className="text-2xl font-bold text-gray-800">{totales.total}</p>
         </div>
         <div className="bg-white rounded-lg p-4 shadow-sm border-l-4 border-green-500">
           <p className="text-sm text-gray-600">Completadas</p>
           <p className="text-2xl font-bold text-green-600">
-            {citas.filter(c => c.estado === 'completada').length}
+            {totales.completada}
           </p>
         </div>
         <div className="bg-white rounded-lg p-4 shadow-sm border-l-4 border-purple-500">
           <p className="text-sm text-gray-600">Programadas</p>
           <p className="text-2xl font-bold text-purple-600">
-            {citas.filter(c => c.estado === 'programada').length}
+            {totales.programada}
           </p>
         </div>
         <div className="bg-white rounded-lg p-4 shadow-sm border-l-4 border-red-500">
           <p className="text-sm text-gray-600">Canceladas</p>
           <p className="text-2xl font-bold text-red-600">
-            {citas.filter(c => c.estado === 'cancelada').length}
+            {totales.cancelada}
           </p>
         </div>
       </div>
@@ -289,6 +326,17 @@ const CitaList = () => {
             </tbody>
           </table>
         </div>
+        {siguiente && (
+          <div className="p-4 border-t border-gray-200 text-center">
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="px-6 py-2 text-sm font-medium text-purple-700 bg-purple-50 rounded-lg hover:bg-purple-100 transition-colors disabled:opacity-50"
+            >
+              {loadingMore ? 'Cargando...' : 'Cargar más'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   )
@@ -49,12 +49,12 @@ const ConsultaMedica = () => {
     setLoading(true);
     try {
       const hoy = new Date().toISOString().split('T')[0];
-      const response = await citaService.listar({
+      const citas = await citaService.listarTodas({
         fecha: hoy,
         medico_id: user.id,
         estado: 'en_consulta'
       });
-      setPacientesEnCola(response.data || []);
+      setPacientesEnCola(citas);
     } catch (error) {
       console.error('Error al cargar pacientes:', error);
       toast.error('Error al cargar la cola de pacientes');
@@ -67,18 +67,18 @@ const ConsultaMedica = () => {
     setCitaSeleccionada(cita);
     setVistaActiva('consulta');
     
-    // Buscar si ya existe una consulta iniciada
+    // Buscar si ya existe una consulta iniciada hoy (la lista viene de la más reciente a la más antigua)
     try {
+      const hoy = new Date().toISOString().split('T')[0];
       const response = await consultaService.listar({
         paciente_id: cita.paciente_id,
-        medico_id: user.id
+        medico_id: user.id,
+        fecha_desde: hoy,
+        fecha_hasta: hoy,
+        limit: 1
       });
       
-      const consultasHoy = response.data.filter(c => {
-        const fechaConsulta = new Date(c.fecha_consulta).toDateString();
-        const hoy = new Date().toDateString();
-        return fechaConsulta === hoy;
-      });
+      const consultasHoy = response.data;
 
       if (consultasHoy.length > 0) {
         const consulta = consultasHoy[0];
@@ -14,8 +14,8 @@ import {
 } from 'lucide-react'
 import { Link } from 'react-router-dom'
 import { useAuth } from '../context/AuthContext'
-import { getPacientes } from '../services/pacienteService'
-import { getCitas } from '../services/citaService'
+import { contarPacientes } from '../services/pacienteService'
+import { getCitas, contar as contarCitas } from '../services/citaService'
 import { getMedicos } from '../services/medicoService'
 import { getMedicamentos } from '../services/medicamentoService'
 
@@ -43,11 +43,23 @@ const Dashboard = () => {
   const loadStats = async () => {
     try {
       // Cargar datos según el rol
-      let pacientes = [], citas = [], medicos = [], medicamentos = []
+      let medicos = [], medicamentos = []
+      let totalPacientes = 0, totalCitas = 0, citasHoy = 0, proximasCitas = []
 
       if (isAdmin || isMedic || isNurse) {
-        pacientes = await getPacientes()
-        citas = await getCitas()
+        const hoy = new Date().toISOString().split('T')[0]
+        totalPacientes = await contarPacientes()
+        // Conteos y una página de próximas citas; nunca la tabla completa
+        const [total, programadasHoy, proximas] = await Promise.all([
+          contarCitas(),
+          contarCitas({ fecha: hoy, estado: 'programada' }),
+          getCitas({ fecha_desde: hoy, estado: 'programada', limit: 20 })
+        ])
+        totalCitas = total
+        citasHoy = programadasHoy
+        proximasCitas = proximas.citas
+          .filter(c => new Date(c.fecha) >= new Date())
+          .slice(0, 4)
         medicos = await getMedicos()
       }
 
@@ -55,23 +67,10 @@ const Dashboard = () => {
         medicamentos = await getMedicamentos()
       }
 
-      // Filtrar citas de hoy
-      const hoy = new Date().toDateString()
-      const citasHoy = citas.filter(cita => {
-        const citaDate = new Date(cita.fecha).toDateString()
-        return citaDate === hoy && cita.estado === 'programada'
-      })
-
-      // Obtener próximas citas (ordenadas por fecha)
-      const proximasCitas = citas
-        .filter(c => c.estado === 'programada' && new Date(c.fecha) >= new Date())
-        .sort((a, b) => new Date(a.fecha) - new Date(b.fecha))
-        .slice(0, 4)
-
       setStats({
-        pacientes: pacientes.length,
-        citas: citas.length,
-        citasHoy: citasHoy.length,
+        pacientes: totalPacientes,
+        citas: totalCitas,
+        citasHoy,
         medicos: medicos.length,
         medicamentos: medicamentos.length
       })
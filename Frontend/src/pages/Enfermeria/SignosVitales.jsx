@@ -33,11 +33,11 @@ const SignosVitales = () => {
     setLoading(true);
     try {
       const hoy = new Date().toISOString().split('T')[0];
-      const response = await citaService.listar({
+      const citas = await citaService.listarTodas({
         fecha: hoy,
         estado: 'confirmada'
       });
-      setPacientesEnEspera(response.data || []);
+      setPacientesEnEspera(citas);
     } catch (error) {
       console.error('Error al cargar pacientes:', error);
       toast.error('Error al cargar la lista de pacientes');
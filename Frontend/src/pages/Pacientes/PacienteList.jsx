@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react'
-import { getPacientes, deletePaciente } from '../../services/pacienteService'
+import { getPacientes, contarPacientes, buscarPacientes, deletePaciente } from '../../services/pacienteService'
 import { Link, useNavigate } from 'react-router-dom'
 import { Users, Plus, Search, Edit, Trash2, Eye, Phone, Mail } from 'lucide-react'
 import toast from 'react-hot-toast'
@@ -7,7 +7,11 @@ import { useAuth } from '../../context/AuthContext'
 
 const PacienteList = () => {
   const [pacientes, setPacientes] = useState([])
+  const [siguiente, setSiguiente] = useState(null)
+  const [total, setTotal] = useState(0)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [searchTerm, setSearchTerm] = useState('')
+  const [resultados, setResultados] = useState(null)
   const [loading, setLoading] = useState(true)
   const navigate = useNavigate()
   const { user } = useAuth()
@@ -18,10 +22,34 @@ const PacienteList = () => {
     loadPacientes()
   }, [])
 
+  // La búsqueda se resuelve en el servidor (prefijo, sin tildes, tolerante a errores)
+  useEffect(() => {
+    const q = searchTerm.trim()
+    if (!q) {
+      setResultados(null)
+      return
+    }
+    let vigente = true
+    const timer = setTimeout(async () => {
+      try {
+        const data = await buscarPacientes(q)
+        if (vigente) setResultados(data)
+      } catch (error) {
+        console.error('Error searching patients:', error)
+      }
+    }, 250)
+    return () => {
+      vigente = false
+      clearTimeout(timer)
+    }
+  }, [searchTerm])
+
   const loadPacientes = async () => {
     try {
-      const data = await getPacientes()
-      setPacientes(data)
+      const [pagina, cantidad] = await Promise.all([getPacientes(), contarPacientes()])
+      setPacientes(pagina.pacientes)
+      setSiguiente(pagina.siguiente)
+      setTotal(cantidad)
     } catch (error) {
       console.error('Error loading patients:', error)
       toast.error('Error al cargar pacientes')
@@ -30,6 +58,20 @@ const PacienteList = () => {
     }
   }
 
+  const loadMore = async () => {
+    setLoadingMore(true)
+    try {
+      const pagina = await getPacientes({ cursor: siguiente })
+      setPacientes(prev => [...prev, ...pagina.pacientes])
+      setSiguiente(pagina.siguiente)
+    } catch (error) {
+      console.error('Error loading patients:', error)
+      toast.error('Error al cargar pacientes')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const handleDelete = async (id, nombre) => {
     if (window.confirm(`¿Estás seguro de eliminar al paciente ${nombre}?`)) {
       try {
@@ -55,11 +97,7 @@ const PacienteList = () => {
     navigate(`/pacientes/${id}`)
   }
 
-  const filteredPacientes = pacientes.filter(p =>
-    p.nombre?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    p.apellido?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    p.cedula?.toString().includes(searchTerm)
-  )
+  const filteredPacientes = searchTerm.trim() ? (resultados ?? []) : pacientes
 
   if (loading) {
     return (
@@ -114,7 +152,7 @@ const PacienteList = () => {
       <div className="grid grid-cols-1 md:grid-cols-3 gap-4">
         <div className="bg-white rounded-lg p-4 shadow-sm">
           <p className="text-sm text-gray-600">Total Pacientes</p>
-          <p className="text-2xl font-bold text-gray-800">{pacientes.length}</p>
+          <p className="text-2xl font-bold text-gray-800">{total}</p>
         </div>
         <div className="bg-white rounded-lg p-4 shadow-sm">
           <p className="text-sm text-gray-600">Nuevos (Este mes)</p>
@@ -238,6 +276,17 @@ const PacienteList = () => {
             </tbody>
           </table>
         </div>
+        {siguiente && !searchTerm.trim() && (
+          <div className="p-4 border-t border-gray-200 text-center">
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="px-6 py-2 text-sm font-medium text-blue-700 bg-blue-50 rounded-lg hover:bg-blue-100 transition-colors disabled:opacity-50"
+            >
+              {loadingMore ? 'Cargando...' : 'Cargar más'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   )
@@ -4,3 +4,8 @@ export const loginService = async (email, password) => {
   const res = await api.post('/auth/login', { email, password })
   return res.data
 }
+
+export const logoutService = async (token) => {
+  // El token se pasa explícito: el interceptor corre después de limpiar localStorage
+  await api.post('/auth/logout', null, { headers: { Authorization: `Bearer ${token}` } })
+}
@@ -1,19 +1,48 @@
 import api from './api'
 
-export const listar = async (filtros = {}) => {
+const parametros = (filtros = {}) => {
   const params = new URLSearchParams();
   if (filtros.fecha) params.append('fecha', filtros.fecha);
+  if (filtros.fecha_desde) params.append('fecha_desde', filtros.fecha_desde);
+  if (filtros.fecha_hasta) params.append('fecha_hasta', filtros.fecha_hasta);
   if (filtros.estado) params.append('estado', filtros.estado);
   if (filtros.paciente_id) params.append('paciente_id', filtros.paciente_id);
   if (filtros.medico_id) params.append('medico_id', filtros.medico_id);
+  return params;
+}
+
+// Una página de citas ordenadas por fecha; la siguiente se pide con el cursor de X-Next-Cursor
+export const listar = async (filtros = {}) => {
+  const params = parametros(filtros);
+  if (filtros.cursor) params.append('cursor', filtros.cursor);
+  if (filtros.limit) params.append('limit', filtros.limit);
   
   const res = await api.get(`/citas/?${params.toString()}`);
   return res;
 }
 
-export const getCitas = async () => {
-  const res = await api.get('/citas/')
-  return res.data
+// Todas las citas de un rango acotado (p. ej. un día), recorriendo las páginas
+export const listarTodas = async (filtros = {}) => {
+  const citas = []
+  let cursor = null
+  do {
+    const res = await listar({ ...filtros, cursor })
+    citas.push(...res.data)
+    cursor = res.headers['x-next-cursor'] || null
+  } while (cursor)
+  return citas
+}
+
+export const contar = async (filtros = {}) => {
+  const params = parametros(filtros);
+  params.append('count_only', 'true');
+  const res = await api.get(`/citas/?${params.toString()}`);
+  return res.data.total;
+}
+
+export const getCitas = async ({ cursor, limit = 50, ...filtros } = {}) => {
+  const res = await listar({ ...filtros, cursor, limit })
+  return { citas: res.data, siguiente: res.headers['x-next-cursor'] || null }
 }
 
 export const getCita = async (id) => {
@@ -43,6 +72,8 @@ export const deleteCita = async (id) => {
 
 export default {
   listar,
+  listarTodas,
+  contar,
   getCitas,
   getCita,
   createCita,
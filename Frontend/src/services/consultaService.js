@@ -13,10 +13,24 @@ const consultaService = {
     if (filtros.medico_id) params.append('medico_id', filtros.medico_id);
     if (filtros.fecha_desde) params.append('fecha_desde', filtros.fecha_desde);
     if (filtros.fecha_hasta) params.append('fecha_hasta', filtros.fecha_hasta);
+    if (filtros.cursor) params.append('cursor', filtros.cursor);
+    if (filtros.limit) params.append('limit', filtros.limit);
     
     return await api.get(`/consultas/?${params.toString()}`);
   },
 
+  // Contar consultas con los mismos filtros, sin cargarlas
+  contar: async (filtros = {}) => {
+    const params = new URLSearchParams({ count_only: 'true' });
+    if (filtros.paciente_id) params.append('paciente_id', filtros.paciente_id);
+    if (filtros.medico_id) params.append('medico_id', filtros.medico_id);
+    if (filtros.fecha_desde) params.append('fecha_desde', filtros.fecha_desde);
+    if (filtros.fecha_hasta) params.append('fecha_hasta', filtros.fecha_hasta);
+
+    const response = await api.get(`/consultas/?${params.toString()}`);
+    return response.data.total;
+  },
+
   // Obtener consulta por ID
   obtenerPorId: async (id) => {
     return await api.get(`/consultas/${id}`);
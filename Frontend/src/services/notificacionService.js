@@ -0,0 +1,10 @@
+import api from './api'
+
+export const getContadores = async () => {
+  const res = await api.get('/notificaciones/contadores')
+  return res.data
+}
+
+export default {
+  getContadores
+}
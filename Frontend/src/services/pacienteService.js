@@ -1,7 +1,18 @@
 import api from './api'
 
-export const getPacientes = async () => {
-  const res = await api.get('/pacientes')
+// Una página de pacientes; `siguiente` es el cursor de la próxima (null en la última)
+export const getPacientes = async ({ cursor, limit = 50, orden } = {}) => {
+  const res = await api.get('/pacientes', { params: { cursor, limit, orden } })
+  return { pacientes: res.data, siguiente: res.headers['x-next-cursor'] || null }
+}
+
+export const contarPacientes = async () => {
+  const res = await api.get('/pacientes', { params: { count_only: true } })
+  return res.data.total
+}
+
+export const buscarPacientes = async (q, limit = 50) => {
+  const res = await api.get('/pacientes/buscar', { params: { q, limit } })
   return res.data
 }
 
@@ -10,6 +21,11 @@ export const getPaciente = async (id) => {
   return res.data
 }
 
+export const getTimeline = async (id, { tipos, cursor, limit = 50 } = {}) => {
+  const res = await api.get(`/pacientes/${id}/timeline`, { params: { tipos, cursor, limit } })
+  return { eventos: res.data, siguiente: res.headers['x-next-cursor'] || null }
+}
+
 export const createPaciente = async (data) => {
   const res = await api.post('/pacientes', data)
   return res.data
@@ -24,3 +40,15 @@ export const deletePaciente = async (id) => {
   const res = await api.delete(`/pacientes/${id}`)
   return res.data
 }
+
+export const importarPacientes = async (archivo) => {
+  const datos = new FormData()
+  datos.append('archivo', archivo)
+  const res = await api.post('/pacientes/importar', datos)
+  return res.data
+}
+
+export const getImportacion = async (id) => {
+  const res = await api.get(`/pacientes/importar/${id}`)
+  return res.data
+}